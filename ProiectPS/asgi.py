@@ -3,6 +3,9 @@ ASGI config for ProiectPS project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this application (e.g. ``uvicorn ProiectPS.asgi:application``)
+so that the live status stream at ``/pi/status/stream/`` can keep connections open.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -60,6 +60,50 @@ ROOT_URLCONF = 'ProiectPS.urls'
 MQTT_BROKER_HOST = "broker.hivemq.com"  # Sau IP-ul brokerului tău (ex: localhost dacă rulezi Mosquitto pe laptop)
 MQTT_BROKER_PORT = 1883
 MQTT_COMMAND_TOPIC = "usa/inteligenta/comanda"
+MQTT_STATUS_TOPIC = "usa/inteligenta/status"  # Statusurile vin pe <topic>/<device_id> (manage.py mqtt_status_subscriber)
+PI_DEFAULT_DEVICE_ID = "door-1"  # Folosit când Pi-ul nu trimite "device_id" în payload
+# Starea ușilor: LocalStateStore (un singur proces) sau DatabaseStateStore (comună mai multor workeri)
+PI_STATE_STORE = "pi_listener.state_store.LocalStateStore"
+# Limitele endpoint-ului update_status/bulk/
+PI_BULK_MAX_EVENTS = 5000
+PI_BULK_MAX_BYTES = 1024 * 1024  # După decomprimare
+# Jurnalul de acces: evenimentele se scriu în loturi de un thread de fundal
+ACCESS_LOG_BACKGROUND_FLUSH = True
+ACCESS_LOG_BATCH_SIZE = 200
+ACCESS_LOG_FLUSH_INTERVAL = 1.0  # Secunde
+ACCESS_LOG_MAX_BUFFER = 10000  # Evenimente păstrate în memorie dacă baza de date nu ține pasul
+# Metrici Prometheus la /pi/metrics/; False = nu mai sunt colectate (endpoint 404)
+PI_METRICS_ENABLED = True
+# Logging pentru pi_listener: coadă neblocantă scrisă de un thread, mesajele repetate limitate
+# (clasele din Raspberry_code/log_utils.py, aceleași ca pe Pi)
+PI_LOG_LEVEL = "INFO"  # "DEBUG" afișează și fiecare status primit
+PI_LOG_RATE_LIMIT_BURST = 5  # Mesaje identice (WARNING+) permise...
+PI_LOG_RATE_LIMIT_PERIOD = 60.0  # ...în această fereastră, în secunde
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'rate_limit': {
+            '()': 'Raspberry_code.log_utils.RateLimitFilter',
+            'burst': PI_LOG_RATE_LIMIT_BURST,
+            'period': PI_LOG_RATE_LIMIT_PERIOD,
+        },
+    },
+    'formatters': {
+        'key_value': {'()': 'Raspberry_code.log_utils.KeyValueFormatter'},
+    },
+    'handlers': {
+        'async_console': {
+            '()': 'Raspberry_code.log_utils.QueueLogHandler',
+            'maxsize': 10000,
+            'formatter': 'key_value',
+            'filters': ['rate_limit'],
+        },
+    },
+    'loggers': {
+        'pi_listener': {'handlers': ['async_console'], 'level': PI_LOG_LEVEL, 'propagate': False},
+    },
+}
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -86,6 +130,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # WAL: citirile (dashboard, interogări) nu mai blochează scrierile jurnalului de acces
+        'OPTIONS': {
+            'init_command': "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+            'transaction_mode': "IMMEDIATE",
+        },
+    }
+}
+
+# Cache-ul secțiunii de status (cheie: ușă + versiunea stării). Cu mai mulți workeri
+# se poate folosi un cache comun (ex. django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pi-listener',
     }
 }
 
@@ -0,0 +1,72 @@
+"""Controler adaptiv pentru scara de detecție, pe baza timpului măsurat per frame.
+
+Detecția HOG costă aproximativ proporțional cu numărul de pixeli, deci
+micșorarea frame-ului de 2x o face de ~4x mai rapidă. Controlerul urmărește o
+medie exponențială a timpului per frame și trece la o scară mai grosieră când
+bugetul de latență este depășit, respectiv la una mai fină când există
+rezervă. Encodarea se face mereu pe crop-ul feței la rezoluție completă, deci
+doar detecția își pierde din precizie.
+"""
+import time
+
+
+class AdaptiveScaler:
+    def __init__(self, target_frame_time=0.2, levels=(1.0, 1.5, 2.0, 2.5, 3.0), initial_level=0,
+                 smoothing=0.2, upper_margin=1.1, lower_margin=0.6, cooldown=1.0,
+                 upsample=1, num_jitters=1, encoding_model='small', enabled=True):
+        self.target_frame_time = target_frame_time
+        self.levels = tuple(levels)
+        self.level = min(max(initial_level, 0), len(self.levels) - 1)
+        self.smoothing = smoothing
+        self.upper_margin = upper_margin
+        self.lower_margin = lower_margin
+        self.cooldown = cooldown
+        self.enabled = enabled
+        # Parametri de detecție/encodare, reglabili din configurație
+        self.upsample = upsample
+        self.num_jitters = num_jitters
+        self.encoding_model = encoding_model
+
+        self.frame_time = None
+        self.detect_time = None
+        self._last_change = 0.0
+
+    @property
+    def scale(self):
+        return self.levels[self.level]
+
+    def _ema(self, previous, value):
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def observe(self, frame_time, detect_time=None, now=None):
+        """Înregistrează durata unui frame și ajustează scara dacă e nevoie.
+
+        Returnează True dacă scara s-a schimbat.
+        """
+        self.frame_time = self._ema(self.frame_time, frame_time)
+        if detect_time is not None:
+            self.detect_time = self._ema(self.detect_time, detect_time)
+        if not self.enabled:
+            return False
+
+        now = time.monotonic() if now is None else now
+        if now - self._last_change < self.cooldown:
+            return False
+        if self.frame_time > self.target_frame_time * self.upper_margin and self.level < len(self.levels) - 1:
+            self.level += 1
+        elif self.frame_time < self.target_frame_time * self.lower_margin and self.level > 0:
+            self.level -= 1
+        else:
+            return False
+        self._last_change = now
+        # Media veche nu mai e reprezentativă pentru noua scară
+        self.frame_time = None
+        return True
+
+    def describe(self):
+        frame_ms = (self.frame_time or 0.0) * 1000.0
+        detect_ms = (self.detect_time or 0.0) * 1000.0
+        return (f"scale 1/{self.scale:g} (frame {frame_ms:.0f}ms, detect {detect_ms:.0f}ms, "
+                f"target {self.target_frame_time * 1000.0:.0f}ms)")
@@ -0,0 +1,112 @@
+"""Benchmark recall/latență pentru indecșii galeriei față de căutarea exactă.
+
+Exemple::
+
+    python bench_index.py --gallery encodings.gallery --probe 1 2 4 8
+    python bench_index.py --synthetic 5000 --people 1000 --lists 64 --json results.json
+
+Interogările sunt encodări din galerie perturbate cu zgomot gaussian (ca o
+nouă poză a aceleiași persoane). Recall-ul se raportează în două feluri:
+``recall@1`` (același rând ca la căutarea exactă) și ``decision`` (aceeași
+decizie finală: același nume sau "Unknown" la toleranța dată).
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from face_matcher import DEFAULT_TOLERANCE
+from gallery_index import BruteForceIndex, IVFIndex, load_gallery_file
+
+
+def synthetic_gallery(n_encodings, n_people, dim=128, seed=0):
+    """Galerie artificială: câteva encodări per persoană în jurul unui centru."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0.0, 0.1, size=(n_people, dim)).astype(np.float32)
+    owners = rng.integers(0, n_people, size=n_encodings)
+    matrix = centers[owners] + rng.normal(0.0, 0.02, size=(n_encodings, dim)).astype(np.float32)
+    names = [f"person_{i}" for i in owners]
+    return matrix.astype(np.float32), names
+
+
+def make_queries(matrix, n_queries, noise, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(matrix), size=n_queries)
+    return (matrix[rows] + rng.normal(0.0, noise, size=(n_queries, matrix.shape[1]))).astype(np.float32)
+
+
+def time_search(index, queries, batch):
+    latencies = []
+    results_idx, results_dist = [], []
+    for start in range(0, len(queries), batch):
+        chunk = queries[start:start + batch]
+        t0 = time.perf_counter()
+        idx, dist = index.search(chunk)
+        latencies.append((time.perf_counter() - t0) / len(chunk))
+        results_idx.append(idx)
+        results_dist.append(dist)
+    return np.concatenate(results_idx), np.concatenate(results_dist), np.array(latencies) * 1000.0
+
+
+def decisions(names, idx, dist, tolerance):
+    return [names[i] if d <= tolerance else "Unknown" for i, d in zip(idx.tolist(), dist.tolist())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--gallery", default=None, help="encodings.gallery (or legacy .pickle) to benchmark")
+    source.add_argument("--synthetic", type=int, default=5000, help="number of synthetic encodings")
+    parser.add_argument("--people", type=int, default=1000, help="people in the synthetic gallery")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.02, help="std-dev of query perturbation")
+    parser.add_argument("--batch", type=int, default=1, help="faces per search call (faces per frame)")
+    parser.add_argument("--lists", type=int, nargs="+", default=[None], help="IVF bucket counts to try")
+    parser.add_argument("--probe", type=int, nargs="+", default=[1, 2, 4, 8], help="n_probe values to try")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.gallery:
+        matrix, names = load_gallery_file(args.gallery)
+    else:
+        matrix, names = synthetic_gallery(args.synthetic, args.people)
+    queries = make_queries(matrix, args.queries, args.noise)
+
+    exact = BruteForceIndex(matrix)
+    exact_idx, exact_dist, exact_lat = time_search(exact, queries, args.batch)
+    exact_decisions = decisions(names, exact_idx, exact_dist, args.tolerance)
+
+    rows = [{"kind": "brute", "lists": None, "probe": None, "recall_at_1": 1.0, "decision_agreement": 1.0,
+             "mean_ms": float(exact_lat.mean()), "p95_ms": float(np.percentile(exact_lat, 95)), "build_s": 0.0}]
+    for n_lists in args.lists:
+        t0 = time.perf_counter()
+        ivf = IVFIndex.build(matrix, n_lists=n_lists)
+        build_s = time.perf_counter() - t0
+        for probe in args.probe:
+            ivf.n_probe = max(1, min(probe, len(ivf.centroids)))
+            idx, dist, lat = time_search(ivf, queries, args.batch)
+            agree = np.mean([a == b for a, b in zip(decisions(names, idx, dist, args.tolerance), exact_decisions)])
+            rows.append({"kind": "ivf", "lists": len(ivf.centroids), "probe": ivf.n_probe,
+                         "recall_at_1": float(np.mean(idx == exact_idx)), "decision_agreement": float(agree),
+                         "mean_ms": float(lat.mean()), "p95_ms": float(np.percentile(lat, 95)),
+                         "build_s": build_s})
+
+    print(f"Gallery: {len(names)} encodings, {len(set(names))} people, {len(queries)} queries, "
+          f"tolerance {args.tolerance}")
+    print(f"{'kind':<6}{'lists':>7}{'probe':>7}{'recall@1':>10}{'decision':>10}{'mean ms':>10}{'p95 ms':>10}")
+    for r in rows:
+        print(f"{r['kind']:<6}{str(r['lists'] or '-'):>7}{str(r['probe'] or '-'):>7}"
+              f"{r['recall_at_1']:>10.3f}{r['decision_agreement']:>10.3f}{r['mean_ms']:>10.3f}{r['p95_ms']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"gallery_size": len(names), "queries": len(queries), "tolerance": args.tolerance,
+                       "results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
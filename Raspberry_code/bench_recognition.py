@@ -0,0 +1,200 @@
+"""Benchmark offline al căii de recunoaștere, pe clipuri înregistrate și etichetate.
+
+Exemple::
+
+    python bench_recognition.py clips/intrare_zi clips/intrare_noapte.mp4
+    python bench_recognition.py clips/* --no-tracking --scale 1.0 --json results.json
+    python bench_recognition.py clips/* --no-tracking --no-encoding-cache
+    python bench_recognition.py clips/* --detector hog haar dnn cascade --no-motion-gate
+
+Fiecare sursă (director de imagini sau fișier video, vezi ``frame_sources.py``)
+trece prin același ``Recognizer`` ca în ``main.py``; statusurile merg la un
+``RecordingStatusPublisher`` prin ``StatusReporter``, deci nu este nevoie de
+cameră, GPIO, MQTT sau server. Se raportează latența per etapă (gate, detect,
+encode, match, publish), FPS-ul și acuratețea față de etichete (detecție -
+față prezentă sau nu -, status și persoană, doar pe frame-urile etichetate),
+plus rata de hit a cache-ului de encodări.
+Cu mai multe valori la ``--detector``, fiecare clip rulează cu fiecare detector.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from adaptive import AdaptiveScaler
+from detectors import DETECTOR_BACKENDS, DNN_CONFIG_PATH, DNN_MODEL_PATH, build_detector
+from encoding_cache import EncodingCache
+from face_matcher import DEFAULT_TOLERANCE, FaceMatcher
+from face_tracker import FaceTracker
+from frame_sources import open_source
+from gallery_store import DEFAULT_ENCODING_MODEL
+from motion_gate import MotionGate
+from recognizer import STAGES, Recognizer
+from status_publisher import RecordingStatusPublisher, StatusReporter
+
+DEFAULT_SCALE_LEVELS = (1.0, 1.5, 2.0, 2.5, 3.0)
+
+
+def stage_summary(samples):
+    """mean/p50/p95 în ms pentru o listă de durate în secunde."""
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None}
+    values = np.array(samples) * 1000.0
+    return {"count": len(values), "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)), "p95_ms": float(np.percentile(values, 95))}
+
+
+class ClipResult:
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.processed = 0
+        self.elapsed = 0.0
+        self.stages = {stage: [] for stage in STAGES + ("publish", "total")}
+        self.labeled = 0
+        self.detection_correct = 0
+        self.status_correct = 0
+        self.person_correct = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, result, label, publish_time, total_time):
+        self.frames += 1
+        self.processed += int(result.processed)
+        for stage, seconds in result.timings.items():
+            self.stages[stage].append(seconds)
+        self.stages["publish"].append(publish_time)
+        self.stages["total"].append(total_time)
+        if label is not None:
+            person, status = label
+            self.labeled += 1
+            self.detection_correct += int(bool(result.locations) == (status != "no_face"))
+            self.status_correct += int(result.status == status)
+            self.person_correct += int(result.person == person)
+
+    def merge(self, other):
+        for name in ("frames", "processed", "elapsed", "labeled", "detection_correct", "status_correct",
+                     "person_correct", "cache_hits", "cache_misses"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for stage, samples in other.stages.items():
+            self.stages[stage].extend(samples)
+
+    def as_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "name": self.name,
+            "frames": self.frames,
+            "processed": self.processed,
+            "fps": self.frames / self.elapsed if self.elapsed else None,
+            "labeled": self.labeled,
+            "detection_accuracy": self.detection_correct / self.labeled if self.labeled else None,
+            "status_accuracy": self.status_correct / self.labeled if self.labeled else None,
+            "person_accuracy": self.person_correct / self.labeled if self.labeled else None,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else None,
+            "stages": {stage: stage_summary(samples) for stage, samples in self.stages.items()},
+        }
+
+
+def build_recognizer(matcher, args, detector):
+    if args.scale is not None:
+        scaler = AdaptiveScaler(levels=(args.scale,), enabled=False)
+    else:
+        scaler = AdaptiveScaler(args.target_frame_time, DEFAULT_SCALE_LEVELS, enabled=not args.no_adaptive)
+    tracker = None if args.no_tracking else FaceTracker()
+    motion_gate = None if args.no_motion_gate else MotionGate()
+    encoding_cache = None if args.no_encoding_cache else EncodingCache()
+    return Recognizer(matcher, scaler, tracker, motion_gate, detector, encoding_cache)
+
+
+def run_clip(source, recognizer, reporter, max_frames=None):
+    clip = ClipResult(source.name)
+    started = time.perf_counter()
+    for frame, label in source:
+        frame_start = time.perf_counter()
+        result = recognizer.process(frame)
+        publish_start = time.perf_counter()
+        reporter.report(result.person, result.status)
+        publish_end = time.perf_counter()
+        clip.add(result, label, publish_end - publish_start, publish_end - frame_start)
+        if max_frames and clip.frames >= max_frames:
+            break
+    clip.elapsed = time.perf_counter() - started
+    if recognizer.encoding_cache is not None:
+        clip.cache_hits, clip.cache_misses = recognizer.encoding_cache.hits, recognizer.encoding_cache.misses
+    source.stop()
+    return clip
+
+
+def format_row(clip):
+    fmt = lambda value, spec: format(value, spec) if value is not None else "-"
+    row = f"{clip['name'][:32]:<32}{clip['frames']:>7}{fmt(clip['fps'], '.2f'):>8}" \
+          f"{fmt(clip['detection_accuracy'], '.3f'):>9}{fmt(clip['status_accuracy'], '.3f'):>9}" \
+          f"{fmt(clip['person_accuracy'], '.3f'):>9}{fmt(clip['cache_hit_rate'], '.3f'):>9}"
+    for stage in STAGES + ("publish", "total"):
+        row += f"{fmt(clip['stages'][stage]['p50_ms'], '.1f'):>9}"
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="image directories or video files (with label files)")
+    parser.add_argument("--gallery", default="encodings.gallery", help="gallery file (or legacy encodings.pickle)")
+    parser.add_argument("--authorized", nargs="*", default=["Abel Caluseri", "Alexandra Anghel"])
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--size", type=int, nargs=2, default=(640, 480), metavar=("W", "H"),
+                        help="frames are resized to the camera resolution")
+    parser.add_argument("--detector", nargs="+", choices=DETECTOR_BACKENDS, default=["hog"],
+                        help="detector backends to compare")
+    parser.add_argument("--proposer", choices=("haar", "lbp", "dnn"), default="haar", help="for --detector cascade")
+    parser.add_argument("--confirmer", choices=("hog", "dnn"), default="hog", help="for --detector cascade")
+    parser.add_argument("--cascade-path", default=None, help="Haar/LBP cascade XML (default: OpenCV Haar)")
+    parser.add_argument("--dnn-model", default=DNN_MODEL_PATH)
+    parser.add_argument("--dnn-config", default=DNN_CONFIG_PATH)
+    parser.add_argument("--scale", type=float, default=None, help="fixed detection scale (disables adaptive)")
+    parser.add_argument("--target-frame-time", type=float, default=0.2)
+    parser.add_argument("--no-adaptive", action="store_true")
+    parser.add_argument("--no-tracking", action="store_true")
+    parser.add_argument("--no-motion-gate", action="store_true")
+    parser.add_argument("--no-encoding-cache", action="store_true")
+    parser.add_argument("--max-frames", type=int, default=None, help="per source")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    matcher = FaceMatcher.from_file(args.gallery, set(args.authorized), tolerance=args.tolerance,
+                                    encoding_model=DEFAULT_ENCODING_MODEL)
+    clips, totals = [], []
+    for backend in args.detector:
+        try:
+            detector = build_detector(backend, cascade_path=args.cascade_path, dnn_model_path=args.dnn_model,
+                                      dnn_config_path=args.dnn_config, proposer=args.proposer,
+                                      confirmer=args.confirmer)
+        except FileNotFoundError as e:
+            parser.error(f"detector '{backend}': {e}")
+        total = ClipResult(f"TOTAL [{detector.name}]")
+        for path in args.sources:
+            # Stare nouă per clip: tracker-ul și filtrul de mișcare nu trec dintr-un clip în altul
+            recognizer = build_recognizer(matcher, args, detector)
+            reporter = StatusReporter(RecordingStatusPublisher(), "bench")
+            clip = run_clip(open_source(path, size=args.size), recognizer, reporter, args.max_frames)
+            clip.name = f"{clip.name} [{detector.name}]"
+            total.merge(clip)
+            clips.append(clip.as_dict())
+        totals.append(total.as_dict())
+
+    print(f"Gallery: {len(matcher)} encodings, tolerance {args.tolerance}; p50 ms per stage")
+    header = f"{'clip':<32}{'frames':>7}{'fps':>8}{'detect':>9}{'status':>9}{'person':>9}{'cache':>9}"
+    header += "".join(f"{stage:>9}" for stage in STAGES + ("publish", "total"))
+    print(header)
+    for clip in clips + totals:
+        print(format_row(clip))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "clips": clips, "totals": totals}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
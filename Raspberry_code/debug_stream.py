@@ -0,0 +1,169 @@
+"""Stream MJPEG de depanare pentru modul headless (fără monitor).
+
+``DebugStreamServer`` servește pe HTTP:
+
+* ``/stream.mjpg`` - frame-uri adnotate, ``multipart/x-mixed-replace``, cel
+  mult ``max_fps`` pe secundă;
+* ``/snapshot.jpg`` - un singur frame adnotat.
+
+Bucla principală apelează ``offer(frame, locations, names)`` la fiecare frame.
+Fără clienți conectați apelul se oprește la o comparație; altfel păstrează
+doar referința la ultimul frame (cel mult ``max_fps`` pe secundă).
+Adnotarea (pe o copie) și encodarea JPEG se fac pe thread-ul clientului, nu
+în bucla de recunoaștere, o singură dată per frame: ceilalți clienți așteaptă
+și primesc același JPEG.
+"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = "frame"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "DoorDebugStream/1.0"
+
+    def log_message(self, format, *args):
+        pass # Fără un rând de log per cerere
+
+    def do_GET(self):
+        stream = self.server.debug_stream
+        path = self.path.split("?", 1)[0]
+        if path == "/stream.mjpg":
+            self._send_stream(stream)
+        elif path == "/snapshot.jpg":
+            self._send_snapshot(stream)
+        else:
+            self.send_error(404)
+
+    def _send_snapshot(self, stream):
+        jpeg = stream.next_jpeg(timeout=5.0)
+        if jpeg is None:
+            self.send_error(503, "No frame available")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def _send_stream(self, stream):
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            while not stream.stopped:
+                jpeg = stream.next_jpeg(timeout=1.0)
+                if jpeg is None:
+                    continue
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Clientul a închis conexiunea
+
+
+class DebugStreamServer:
+    def __init__(self, port=8081, host="0.0.0.0", max_fps=2.0, jpeg_quality=70, annotate=None):
+        self.host = host
+        self.port = port
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.jpeg_quality = jpeg_quality
+        self.annotate = annotate
+
+        self._cond = threading.Condition()
+        self._clients = 0
+        self._latest = None # (frame, locations, names), încă neencodat
+        self._seq = 0
+        self._offered_at = 0.0
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._encoding_seq = 0 # Frame-ul pe care îl encodează acum un client
+        self.stopped = False
+        self.encoded = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def clients(self):
+        return self._clients
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.debug_stream = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="debug-stream", daemon=True)
+        self._thread.start()
+        logger.info("Debug stream on http://%s:%s/stream.mjpg", self.host, self.port)
+        return self
+
+    def stop(self):
+        self.stopped = True
+        with self._cond:
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def offer(self, frame, locations=(), names=()):
+        """Apelat din bucla principală; ieftin când nu e nimeni conectat."""
+        if not self._clients:
+            return
+        now = time.monotonic()
+        if now - self._offered_at < self.min_interval:
+            return
+        self._offered_at = now
+        with self._cond:
+            self._latest = (frame, list(locations), list(names))
+            self._seq += 1
+            self._cond.notify_all()
+
+    def next_jpeg(self, timeout=1.0):
+        """JPEG-ul următorului frame oferit (rulează pe thread-ul clientului)."""
+        with self._cond:
+            self._clients += 1
+            try:
+                seen = self._jpeg_seq
+                if not self._cond.wait_for(lambda: self._seq > seen or self.stopped, timeout):
+                    return None
+                if self.stopped:
+                    return None
+                seq = self._seq
+                if self._encoding_seq == seq:
+                    # Alt client îl encodează acum: îi așteptăm rezultatul
+                    self._cond.wait_for(lambda: self._jpeg_seq >= seq or self._encoding_seq != seq or self.stopped,
+                                        timeout)
+                    return self._jpeg if self._jpeg_seq >= seq else None
+                if self._jpeg_seq == seq:
+                    return self._jpeg # Alt client l-a encodat deja
+                self._encoding_seq = seq
+                frame, locations, names = self._latest
+            finally:
+                self._clients -= 1
+        jpeg = None
+        try:
+            image = frame.copy()
+            if self.annotate is not None:
+                image = self.annotate(image, locations, names)
+            ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok:
+                jpeg = buffer.tobytes()
+        finally:
+            with self._cond:
+                if jpeg is not None:
+                    if seq > self._jpeg_seq:
+                        self._jpeg, self._jpeg_seq = jpeg, seq
+                    self.encoded += 1
+                if self._encoding_seq == seq:
+                    self._encoding_seq = 0
+                self._cond.notify_all()
+        return jpeg
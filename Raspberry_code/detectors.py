@@ -0,0 +1,166 @@
+"""Detectoare de fețe interschimbabile, alese din configurație (``build_detector``).
+
+Toate au ``detect(rgb) -> [(top, right, bottom, left), ...]``, cu casetele în
+coordonatele imaginii primite (ca ``face_recognition.face_locations``):
+
+* ``HOGDetector`` - detectorul HOG din dlib (comportamentul inițial);
+* ``CascadeDetector`` - cascadă Haar sau LBP din OpenCV, mult mai rapidă pe ARM
+  dar cu mai multe detecții false;
+* ``DNNDetector`` - rețeaua SSD ResNet-10 din OpenCV (``cv2.dnn``, pe CPU);
+* ``CascadedDetector`` - un detector ieftin propune regiuni, iar cel scump
+  confirmă doar în crop-urile din jurul lor.
+
+Detectoarele sunt trimise către procesele din pipeline (pickle), deci nu țin
+modelele OpenCV ca atribute: acestea sunt încărcate o singură dată per proces,
+în ``_MODEL_CACHE``.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from face_tracker import iou
+
+HAAR_CASCADE_PATH = os.path.join(getattr(getattr(cv2, "data", None), "haarcascades", ""),
+                                 "haarcascade_frontalface_default.xml")
+LBP_CASCADE_PATH = "models/lbpcascade_frontalface_improved.xml"
+DNN_CONFIG_PATH = "models/deploy.prototxt"
+DNN_MODEL_PATH = "models/res10_300x300_ssd_iter_140000.caffemodel"
+
+_MODEL_CACHE = {}
+
+
+def _require(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Detector model not found: {path}")
+    return path
+
+
+def _cached_model(key, loader):
+    model = _MODEL_CACHE.get(key)
+    if model is None:
+        model = _MODEL_CACHE[key] = loader()
+    return model
+
+
+def _clip(box, shape):
+    h, w = shape[:2]
+    top, right, bottom, left = box
+    return max(int(top), 0), min(int(right), w), min(int(bottom), h), max(int(left), 0)
+
+
+class HOGDetector:
+    name = "hog"
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+
+    def detect(self, rgb):
+        import face_recognition
+
+        return face_recognition.face_locations(rgb, number_of_times_to_upsample=self.upsample, model='hog')
+
+
+class CascadeDetector:
+    """Cascadă OpenCV (``kind`` "haar" sau "lbp") pe imaginea în tonuri de gri."""
+
+    def __init__(self, kind="haar", cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        self.name = kind
+        self.cascade_path = _require(cascade_path or (HAAR_CASCADE_PATH if kind == "haar" else LBP_CASCADE_PATH))
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+
+    def detect(self, rgb):
+        classifier = _cached_model(("cascade", self.cascade_path), lambda: cv2.CascadeClassifier(self.cascade_path))
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        rects = classifier.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                            minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in rects]
+
+
+class DNNDetector:
+    """SSD ResNet-10 (Caffe, 300x300); intrarea RGB este convertită la BGR în blob."""
+
+    name = "dnn"
+
+    def __init__(self, model_path=DNN_MODEL_PATH, config_path=DNN_CONFIG_PATH, confidence=0.5, input_size=(300, 300)):
+        self.model_path = _require(model_path)
+        self.config_path = _require(config_path)
+        self.confidence = confidence
+        self.input_size = tuple(input_size)
+
+    def detect(self, rgb):
+        net = _cached_model(("dnn", self.model_path, self.config_path),
+                            lambda: cv2.dnn.readNetFromCaffe(self.config_path, self.model_path))
+        h, w = rgb.shape[:2]
+        blob = cv2.dnn.blobFromImage(rgb, 1.0, self.input_size, (104.0, 177.0, 123.0), swapRB=True)
+        net.setInput(blob)
+        detections = net.forward().reshape(-1, 7)
+        boxes = []
+        for confidence, x0, y0, x1, y1 in detections[:, 2:7]:
+            if confidence < self.confidence:
+                continue
+            box = _clip((y0 * h, x1 * w, y1 * h, x0 * w), rgb.shape)
+            if box[2] > box[0] and box[1] > box[3]:
+                boxes.append(box)
+        return boxes
+
+
+class CascadedDetector:
+    """``proposer`` (ieftin) pe tot frame-ul, ``confirmer`` (scump) doar în jurul propunerilor.
+
+    Crop-urile sunt mărite cu ``margin`` din latura casetei și, dacă sunt mai
+    mici de ``min_crop`` pixeli, scalate în sus ca detectorul scump să vadă
+    fața la o dimensiune utilizabilă.
+    """
+
+    def __init__(self, proposer, confirmer, margin=0.5, min_crop=120, merge_iou=0.3):
+        self.proposer = proposer
+        self.confirmer = confirmer
+        self.margin = margin
+        self.min_crop = min_crop
+        self.merge_iou = merge_iou
+        self.name = f"{proposer.name}+{confirmer.name}"
+
+    def detect(self, rgb):
+        boxes = []
+        for top, right, bottom, left in self.proposer.detect(rgb):
+            pad_y, pad_x = int((bottom - top) * self.margin), int((right - left) * self.margin)
+            y0, x1, y1, x0 = _clip((top - pad_y, right + pad_x, bottom + pad_y, left - pad_x), rgb.shape)
+            crop = rgb[y0:y1, x0:x1]
+            if crop.size == 0:
+                continue
+            zoom = max(1.0, self.min_crop / float(min(crop.shape[:2])))
+            if zoom > 1.0:
+                crop = cv2.resize(crop, (0, 0), fx=zoom, fy=zoom, interpolation=cv2.INTER_LINEAR)
+            for c_top, c_right, c_bottom, c_left in self.confirmer.detect(np.ascontiguousarray(crop)):
+                box = _clip((y0 + c_top / zoom, x0 + c_right / zoom, y0 + c_bottom / zoom, x0 + c_left / zoom),
+                            rgb.shape)
+                # Propuneri suprapuse pot confirma aceeași față de două ori
+                if all(iou(box, other) < self.merge_iou for other in boxes):
+                    boxes.append(box)
+        return boxes
+
+
+DETECTOR_BACKENDS = ("hog", "haar", "lbp", "dnn", "cascade")
+
+
+def build_detector(backend="hog", upsample=1, cascade_path=None, dnn_model_path=DNN_MODEL_PATH,
+                   dnn_config_path=DNN_CONFIG_PATH, dnn_confidence=0.5, proposer="haar", confirmer="hog"):
+    """Detectorul ales prin ``backend``; ``cascade`` combină ``proposer`` și ``confirmer``.
+
+    Aruncă ``FileNotFoundError`` dacă fișierele modelului lipsesc.
+    """
+    def single(kind):
+        if kind == "hog":
+            return HOGDetector(upsample)
+        if kind in ("haar", "lbp"):
+            return CascadeDetector(kind, cascade_path)
+        if kind == "dnn":
+            return DNNDetector(dnn_model_path, dnn_config_path, dnn_confidence)
+        raise ValueError(f"Unknown detector backend: {kind!r}")
+
+    if backend == "cascade":
+        return CascadedDetector(single(proposer), single(confirmer))
+    return single(backend)
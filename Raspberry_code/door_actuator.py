@@ -0,0 +1,115 @@
+"""Controlul ușii (LED-uri + servo) pe un thread dedicat, cu închidere automată temporizată.
+
+Comenzile (``open``/``close``) pot veni din orice thread - callback-ul MQTT,
+bucla de recunoaștere - și doar sunt puse într-o coadă. Thread-ul
+``DoorActuator`` este singurul care atinge pinii și starea ușii, deci nu
+există curse între thread-ul de rețea paho și bucla principală.
+
+Închiderea automată nu mai depinde de FPS-ul buclei de recunoaștere: thread-ul
+așteaptă în coadă exact până la termenul de închidere (``queue.get`` cu
+timeout), așa că ușa se încuie la ``auto_close_delay`` secunde după ultima
+deschidere, indiferent cât durează un frame.
+
+Pinii sunt creați cu ``pin_factory`` (ex. ``MockFactory`` din gpiozero la
+rularea offline sau în teste).
+"""
+import logging
+import queue
+import threading
+import time
+
+from gpiozero import LED, Servo
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class DoorActuator(threading.Thread):
+    def __init__(self, green_pin, red_pin, servo_pin, pin_factory=None, locked_value=-0.8, unlocked_value=0.2,
+                 auto_close_delay=5.0, min_pulse_width=0.0005, max_pulse_width=0.0025):
+        super().__init__(name="door-actuator", daemon=True)
+        self.locked_value = locked_value
+        self.unlocked_value = unlocked_value
+        self.auto_close_delay = auto_close_delay
+        self.green_led = LED(green_pin, pin_factory=pin_factory)
+        self.red_led = LED(red_pin, pin_factory=pin_factory)
+        self.servo = Servo(servo_pin, initial_value=locked_value, min_pulse_width=min_pulse_width,
+                           max_pulse_width=max_pulse_width, pin_factory=pin_factory)
+
+        self._commands = queue.Queue()
+        self._close_at = None # time.monotonic() la care ușa se încuie automat
+        self.is_open = False
+        self.opened = 0
+        self.auto_closed = 0
+        self._lock_outputs() # Ușa pornește încuiată
+
+    # --- API thread-safe (doar pune comanda în coadă) ---
+    def open(self, source="mqtt"):
+        """Deschide ușa; dacă e deja deschisă, repornește termenul de închidere automată."""
+        self._commands.put(("open", source))
+
+    def close(self, source="mqtt"):
+        self._commands.put(("close", source))
+
+    def stop(self, timeout=None):
+        """Oprește thread-ul, încuie ușa și eliberează pinii."""
+        self._commands.put((_STOP, None))
+        if self.is_alive():
+            self.join(timeout)
+        self._lock_outputs()
+        for device in (self.servo, self.green_led, self.red_led):
+            device.close()
+
+    @property
+    def seconds_until_close(self):
+        close_at = self._close_at
+        return None if close_at is None else max(0.0, close_at - time.monotonic())
+
+    # --- Thread-ul actuatorului ---
+    def _lock_outputs(self):
+        self.servo.value = self.locked_value
+        self.green_led.off()
+        self.red_led.on()
+
+    def _open(self, source):
+        if not self.is_open:
+            logger.info("Opening door...", extra={"source": source})
+            self.green_led.on()
+            self.red_led.off()
+            self.servo.value = self.unlocked_value
+            self.is_open = True
+            self.opened += 1
+            logger.info("Door opened. Will auto-close in %ss if not closed manually.", self.auto_close_delay)
+        else:
+            # La deschiderea din recunoaștere se repetă la fiecare frame, deci doar DEBUG
+            logger.debug("Door is already open. Resetting auto-close timer.", extra={"source": source})
+        self._close_at = time.monotonic() + self.auto_close_delay
+
+    def _close(self, source):
+        self._close_at = None
+        if not self.is_open:
+            logger.info("Door is already closed.", extra={"source": source})
+            return
+        logger.info("Closing door...", extra={"source": source})
+        self._lock_outputs()
+        self.is_open = False
+        logger.info("Door closed.")
+
+    def run(self):
+        while True:
+            close_at = self._close_at
+            timeout = None if close_at is None else max(0.0, close_at - time.monotonic())
+            try:
+                command, source = self._commands.get(timeout=timeout)
+            except queue.Empty:
+                logger.info("Auto-closing door due to timeout.")
+                self.auto_closed += 1
+                self._close("auto")
+                continue
+            if command is _STOP:
+                break
+            if command == "open":
+                self._open(source)
+            elif command == "close":
+                self._close(source)
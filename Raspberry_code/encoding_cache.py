@@ -0,0 +1,146 @@
+"""Cache de encodări pentru fețe care nu s-au schimbat între frame-uri.
+
+O persoană care așteaptă la ușă dă crop-uri aproape identice de la un frame
+la altul, iar ``face_encodings`` ar rula din nou pe fiecare. ``EncodingCache``
+păstrează ultimele ``max_entries`` encodări (LRU), fiecare cu rezultatul
+potrivirii, cheiate pe un hash perceptual (dHash) al feței și pe casetă. O
+față nouă reutilizează o intrare dacă hash-urile diferă în cel mult
+``max_distance`` biți și casetele se suprapun (IoU cel puțin ``min_iou``).
+
+Intrările expiră la ``ttl`` secunde de la encodare (un hit nu le
+prelungește), deci o identitate greșită nu persistă mai mult de atât.
+Rezultatele potrivirii depind de galerie: la schimbarea ei cache-ul se golește
+(``clear``, apelat din ``Recognizer.snapshot``).
+
+Cache-ul este folosit dintr-un singur thread (bucla serială sau etapa de
+encodare a pipeline-ului), ca ``FaceTracker``.
+"""
+import collections
+import time
+
+import cv2
+import numpy as np
+
+from face_tracker import iou
+from metrics import registry
+
+
+def face_hash(crop, location, hash_size=8):
+    """dHash pe ``hash_size`` x ``hash_size`` biți al feței ``location`` din crop (RGB)."""
+    top, right, bottom, left = location
+    face = crop[max(top, 0):bottom, max(left, 0):right]
+    if face.size == 0:
+        return 0
+    gray = cv2.cvtColor(face, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    """Numărul de biți diferiți dintre două hash-uri (``int.bit_count`` cere Python 3.10)."""
+    return bin(a ^ b).count("1")
+
+
+class CacheEntry:
+    __slots__ = ("phash", "box", "encoding", "match", "created")
+
+    def __init__(self, phash, box, encoding, match, created):
+        self.phash = phash
+        self.box = box
+        self.encoding = encoding
+        self.match = match
+        self.created = created
+
+
+class EncodingCache:
+    def __init__(self, max_entries=16, ttl=2.0, max_distance=6, min_iou=0.5, hash_size=8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.min_iou = min_iou
+        self.hash_size = hash_size
+        self._entries = collections.OrderedDict() # (hash, casetă) -> CacheEntry, cea mai veche prima
+        self._encode_seconds = None # Media mobilă a duratei unei encodări (per față)
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._hits = registry.counter("encoding_cache_hits_total")
+        self._misses = registry.counter("encoding_cache_misses_total")
+        self._saved = registry.counter("encoding_cache_saved_seconds_total")
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, crops, boxes, now=None):
+        """Caută fiecare față (perechi din ``crop_faces`` și casetele lor în frame).
+
+        Returnează ``(chei, intrări)``; intrarea este None pentru fețele care
+        trebuie encodate, iar cheile se dau apoi lui ``fill``.
+        """
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        keys, entries = [], []
+        for (crop, location), box in zip(crops, boxes):
+            key = (face_hash(crop, location, self.hash_size), tuple(box))
+            entry = self._find(key)
+            if entry is None:
+                self.misses += 1
+                self._misses.inc()
+            else:
+                self._entries.move_to_end((entry.phash, entry.box))
+                self.hits += 1
+                self._hits.inc()
+                if self._encode_seconds is not None:
+                    self.saved_seconds += self._encode_seconds
+                    self._saved.inc(self._encode_seconds)
+            keys.append(key)
+            entries.append(entry)
+        return keys, entries
+
+    def fill(self, keys, entries, encodings, matches, encode_seconds=None, now=None):
+        """Memorează encodările noi și returnează potrivirile pentru toate fețele, în ordine.
+
+        ``encodings``/``matches`` corespund, în ordine, intrărilor None din
+        ``lookup``; ``encode_seconds`` (durata encodării lor) estimează timpul
+        economisit de hit-urile următoare.
+        """
+        now = time.monotonic() if now is None else now
+        if encode_seconds is not None and encodings:
+            per_face = encode_seconds / len(encodings)
+            previous = self._encode_seconds
+            self._encode_seconds = per_face if previous is None else 0.8 * previous + 0.2 * per_face
+        fresh = iter(zip(encodings, matches))
+        results = []
+        for key, entry in zip(keys, entries):
+            if entry is None:
+                encoding, match = next(fresh)
+                self._entries[key] = CacheEntry(key[0], key[1], encoding, match, now)
+                self._entries.move_to_end(key)
+                results.append(match)
+            else:
+                results.append(entry.match)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return results
+
+    def clear(self):
+        self._entries.clear()
+
+    def _expire(self, now):
+        for key in [key for key, entry in self._entries.items() if now - entry.created >= self.ttl]:
+            del self._entries[key]
+
+    def _find(self, key):
+        phash, box = key
+        best, best_distance = None, self.max_distance + 1
+        for entry in self._entries.values():
+            distance = hamming_distance(phash, entry.phash)
+            if distance < best_distance and iou(box, entry.box) >= self.min_iou:
+                best, best_distance = entry, distance
+        return best
@@ -0,0 +1,188 @@
+"""Construirea galeriei de fețe (``encodings.gallery``) din directorul ``dataset``.
+
+Exemple::
+
+    python enroll.py build dataset --output encodings.gallery --workers 4
+    python enroll.py import encodings.pickle
+    python enroll.py info encodings.gallery
+
+``build`` parcurge ``dataset/<nume persoană>/*.jpg`` și encodează imaginile
+într-un pool de procese, câte una per nucleu. Construcția este incrementală:
+fiecare imagine este identificată prin hash-ul SHA-256 al conținutului, iar
+encodările imaginilor deja prezente în galeria existentă (cu aceiași parametri
+de encodare) sunt refolosite. Doar imaginile noi sau modificate ajung la dlib;
+cele șterse din ``dataset`` dispar din galerie. ``import`` convertește un
+``encodings.pickle`` vechi, fără a re-encoda nimic.
+"""
+import argparse
+import datetime
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gallery_store import DEFAULT_ENCODING_MODEL, load_gallery, read_gallery_header, write_gallery
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_dataset(root):
+    """Lista (cale relativă, nume persoană) pentru toate imaginile, în ordine stabilă."""
+    images = []
+    for person in sorted(os.listdir(root)):
+        person_dir = os.path.join(root, person)
+        if not os.path.isdir(person_dir):
+            continue
+        for dirpath, dirnames, filenames in os.walk(person_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append((os.path.relpath(os.path.join(dirpath, filename), root), person))
+    return images
+
+
+def encode_image(path, detection_model="hog", upsample=1, num_jitters=1, encoding_model=DEFAULT_ENCODING_MODEL):
+    """Encodările tuturor fețelor din imagine (matrice float32, posibil fără rânduri).
+
+    Rulează în procesele din pool, deci importă ``face_recognition`` local.
+    """
+    import face_recognition
+
+    image = face_recognition.load_image_file(path)
+    boxes = face_recognition.face_locations(image, number_of_times_to_upsample=upsample, model=detection_model)
+    encodings = face_recognition.face_encodings(image, boxes, num_jitters=num_jitters, model=encoding_model)
+    return np.asarray(encodings, dtype=np.float32).reshape(len(encodings), 128)
+
+
+def _encode_job(job):
+    path, params = job
+    try:
+        return encode_image(path, **params), None
+    except Exception as e:
+        return None, str(e)
+
+
+def previous_encodings(path, params):
+    """Encodările din galeria existentă, pe hash de imagine (gol dacă parametrii diferă)."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        matrix, _, metadata = load_gallery(path)
+    except (ValueError, OSError) as e:
+        print(f"[WARNING] Ignoring existing gallery {path}: {e}")
+        return {}
+    if metadata.get("params") != params:
+        print("[INFO] Encoding parameters changed, re-encoding every image.")
+        return {}
+    return {image["sha256"]: np.array(matrix[image["start"]:image["start"] + image["count"]])
+            for image in metadata.get("images", ())}
+
+
+def build_gallery(dataset, output, params, workers=None, full=False):
+    started = time.perf_counter()
+    images = scan_dataset(dataset)
+    hashes = [file_sha256(os.path.join(dataset, rel_path)) for rel_path, _ in images]
+    cache = {} if full else previous_encodings(output, params)
+
+    to_encode = sorted({h: rel_path for (rel_path, _), h in zip(images, hashes) if h not in cache}.items())
+    print(f"[INFO] {len(images)} images, {sum(h in cache for h in hashes)} unchanged, {len(to_encode)} to encode "
+          f"with {workers or os.cpu_count()} workers.")
+    encoded = {}
+    failed = set()
+    if to_encode:
+        jobs = [(os.path.join(dataset, rel_path), params) for _, rel_path in to_encode]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_encode_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count()))))
+            for done, ((h, rel_path), (encodings, error)) in enumerate(zip(to_encode, results), 1):
+                if error is not None:
+                    print(f"[ERROR] Could not encode {rel_path}: {error}")
+                    failed.add(h)
+                    continue
+                encoded[h] = encodings
+                if len(encodings) == 0:
+                    print(f"[WARNING] No face found in {rel_path}")
+                if done % 50 == 0 or done == len(jobs):
+                    print(f"[INFO] Encoded {done}/{len(jobs)} images")
+
+    blocks, names, entries = [], [], []
+    row = 0
+    for (rel_path, person), h in zip(images, hashes):
+        if h in failed:
+            continue # Reîncercată la următoarea rulare
+        encodings = cache[h] if h in cache else encoded[h]
+        entries.append({"path": rel_path, "sha256": h, "name": person, "start": row, "count": len(encodings)})
+        blocks.append(encodings)
+        names.extend([person] * len(encodings))
+        row += len(encodings)
+
+    matrix = np.concatenate(blocks) if blocks else np.zeros((0, 128), dtype=np.float32)
+    metadata = {
+        "created_at": datetime.datetime.now().isoformat(),
+        "source": os.path.abspath(dataset),
+        "params": params,
+        "images": entries,
+    }
+    write_gallery(output, matrix, names, metadata)
+    print(f"[INFO] Wrote {len(names)} encodings of {len(set(names))} people to {output} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return len(names)
+
+
+def import_pickle(path, output):
+    from gallery_index import load_gallery_pickle
+
+    matrix, names = load_gallery_pickle(path)
+    write_gallery(output, matrix, names, {"created_at": datetime.datetime.now().isoformat(),
+                                          "source": os.path.abspath(path), "params": None, "images": []})
+    print(f"[INFO] Imported {len(names)} encodings from {path} -> {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="encode new/changed images and write the gallery")
+    build.add_argument("dataset", nargs="?", default="dataset")
+    build.add_argument("--output", default="encodings.gallery")
+    build.add_argument("--workers", type=int, default=None, help="encoding processes (default: all cores)")
+    build.add_argument("--full", action="store_true", help="re-encode every image")
+    build.add_argument("--detection-model", choices=("hog", "cnn"), default="hog")
+    build.add_argument("--upsample", type=int, default=1)
+    build.add_argument("--jitters", type=int, default=1)
+    build.add_argument("--encoding-model", choices=("large", "small"), default=DEFAULT_ENCODING_MODEL,
+                       help="must match ENCODING_MODEL in main.py")
+    convert = sub.add_parser("import", help="convert a legacy encodings.pickle")
+    convert.add_argument("pickle", nargs="?", default="encodings.pickle")
+    convert.add_argument("--output", default="encodings.gallery")
+    info = sub.add_parser("info", help="describe a gallery file")
+    info.add_argument("gallery", nargs="?", default="encodings.gallery")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        params = {"detection_model": args.detection_model, "upsample": args.upsample,
+                  "num_jitters": args.jitters, "encoding_model": args.encoding_model}
+        build_gallery(args.dataset, args.output, params, workers=args.workers, full=args.full)
+    elif args.command == "import":
+        import_pickle(args.pickle, args.output)
+    else:
+        dim, rows, metadata, _ = read_gallery_header(args.gallery)
+        people = sorted(set(metadata["names"]))
+        print(f"{args.gallery}: {rows} encodings x {dim}, {len(people)} people, "
+              f"{len(metadata.get('images', ()))} images, created {metadata.get('created_at')}")
+        print(f"params: {metadata.get('params')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Potrivire vectorizată a fețelor detectate cu galeria de encodări cunoscute.
+
+Galeria este încărcată o singură dată într-o matrice float32 contiguă, cu
+normele la pătrat precalculate, astfel încât toate fețele dintr-un frame sunt
+comparate cu toate persoanele cunoscute printr-o singură operație NumPy.
+Căutarea propriu-zisă este delegată unui index din ``gallery_index``.
+"""
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from gallery_index import BruteForceIndex, default_index_path, load_gallery_file, load_index
+from gallery_store import gallery_encoding_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE = 0.55
+UNKNOWN_NAME = "Unknown"
+
+MatchResult = namedtuple("MatchResult", ["name", "distance", "authorized"])
+
+
+def check_encoding_model(path, encoding_model):
+    gallery_model = gallery_encoding_model(path)
+    if gallery_model is None:
+        logger.warning("%s does not record its encoding model, assuming '%s'.", path, encoding_model)
+    elif gallery_model != encoding_model:
+        raise ValueError(f"{path} was encoded with the '{gallery_model}' model but recognition uses "
+                         f"'{encoding_model}'. Rebuild it with 'python enroll.py build --full "
+                         f"--encoding-model {encoding_model}'.")
+
+
+class FaceMatcher:
+    """Compară encodări de 128 de dimensiuni cu galeria cunoscută."""
+
+    def __init__(self, encodings, names, authorized_names=(), tolerance=DEFAULT_TOLERANCE, index=None):
+        names = list(names)
+        matrix = np.asarray(encodings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.zeros((0, 128), dtype=np.float32)
+        matrix = np.ascontiguousarray(matrix.reshape(len(names), matrix.shape[-1]))
+
+        self.encodings = matrix
+        self.names = names
+        self.tolerance = float(tolerance)
+        self.index = index if index is not None else BruteForceIndex(matrix)
+        self.authorized_names = frozenset(authorized_names)
+        # Masca de autorizare per rând din galerie (în loc de căutare în listă)
+        self.authorized_mask = np.fromiter(
+            (name in self.authorized_names for name in names), dtype=bool, count=len(names)
+        )
+
+    @classmethod
+    def from_file(cls, path, authorized_names=(), tolerance=DEFAULT_TOLERANCE, index_path=None, encoding_model=None):
+        """Încarcă galeria (``.gallery`` sau ``.pickle``); folosește indexul salvat lângă ea, dacă există.
+
+        Cu ``encoding_model`` (modelul folosit la rulare), refuză (ValueError) o galerie encodată cu alt model.
+        """
+        if encoding_model is not None:
+            check_encoding_model(path, encoding_model)
+        matrix, names = load_gallery_file(path)
+        index_path = index_path or default_index_path(path)
+        index = None
+        if os.path.exists(index_path):
+            try:
+                index = load_index(index_path, matrix)
+                logger.info("Using %s index from %s", index.kind, index_path)
+            except (ValueError, KeyError, OSError) as e:
+                logger.warning("Ignoring index %s: %s", index_path, e)
+        return cls(matrix, names, authorized_names, tolerance, index=index)
+
+    from_pickle = from_file
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, face_encodings):
+        """Returnează câte un MatchResult pentru fiecare encodare primită."""
+        if len(face_encodings) == 0:
+            return []
+        if len(self.names) == 0:
+            return [MatchResult(UNKNOWN_NAME, float("inf"), False) for _ in face_encodings]
+
+        best_idx, best_dist = self.index.search(face_encodings)
+        matched = best_dist <= self.tolerance
+        authorized = matched & self.authorized_mask[best_idx]
+
+        results = []
+        for idx, d, ok, auth in zip(best_idx.tolist(), best_dist.tolist(), matched.tolist(), authorized.tolist()):
+            name = self.names[idx] if ok else UNKNOWN_NAME
+            results.append(MatchResult(name, d, auth))
+        return results
+
+    def is_authorized(self, name):
+        return name in self.authorized_names
@@ -0,0 +1,116 @@
+"""Urmărirea fețelor între frame-uri, ca să nu re-encodăm aceeași persoană.
+
+Fiecare față detectată este asociată (după IoU) cu un track din frame-ul
+anterior. Track-ul păstrează identitatea și autorizarea obținute la ultima
+encodare; o nouă encodare se cere doar pentru track-uri noi, după
+``refresh_interval`` secunde, sau când caseta s-a deplasat mult față de
+frame-ul anterior (IoU sub ``min_confident_iou``).
+"""
+import itertools
+import time
+
+
+def iou(a, b):
+    """IoU pentru casete (top, right, bottom, left), ca la face_recognition."""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    __slots__ = ("track_id", "box", "match", "last_encoded", "misses", "needs_encoding", "confidence")
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.match = None
+        self.last_encoded = None
+        self.misses = 0
+        self.needs_encoding = True
+        self.confidence = 0.0
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, min_confident_iou=0.6, refresh_interval=1.0, max_missed=2):
+        self.iou_threshold = iou_threshold
+        self.min_confident_iou = min_confident_iou
+        self.refresh_interval = refresh_interval
+        self.max_missed = max_missed
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self.encoded = 0
+        self.reused = 0
+
+    def update(self, locations, now=None):
+        """Asociază detecțiile cu track-urile existente.
+
+        Returnează lista de track-uri aliniată cu ``locations``; ``needs_encoding``
+        este setat pe track-urile pentru care trebuie calculată o encodare nouă.
+        """
+        now = time.monotonic() if now is None else now
+        pairs = sorted(
+            ((iou(track.box, box), ti, li) for ti, track in enumerate(self.tracks) for li, box in enumerate(locations)),
+            reverse=True,
+        )
+        assigned = [None] * len(locations)
+        used_tracks = set()
+        for score, ti, li in pairs:
+            if score < self.iou_threshold:
+                break
+            if ti in used_tracks or assigned[li] is not None:
+                continue
+            track = self.tracks[ti]
+            track.box = locations[li]
+            track.misses = 0
+            track.confidence = score
+            track.needs_encoding = (
+                track.match is None
+                or score < self.min_confident_iou
+                or now - track.last_encoded >= self.refresh_interval
+            )
+            assigned[li] = track
+            used_tracks.add(ti)
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                track.misses += 1
+                if track.misses > self.max_missed:
+                    continue
+            survivors.append(track)
+
+        for li, box in enumerate(locations):
+            if assigned[li] is None:
+                track = Track(next(self._ids), box)
+                assigned[li] = track
+                survivors.append(track)
+
+        self.tracks = survivors
+        for track in assigned:
+            if track.needs_encoding:
+                self.encoded += 1
+            else:
+                self.reused += 1
+        return assigned
+
+    def assign(self, tracks, matches, now=None):
+        """Memorează rezultatul potrivirii pentru track-urile re-encodate."""
+        now = time.monotonic() if now is None else now
+        for track, match in zip(tracks, matches):
+            track.match = match
+            track.last_encoded = now
+            track.needs_encoding = False
+
+    def invalidate(self):
+        """Uită identitățile memorate (ex. după schimbarea galeriei); fețele se re-encodează la următorul frame."""
+        for track in self.tracks:
+            track.match = None
+            track.needs_encoding = True
+
+    def reset(self):
+        self.tracks = []
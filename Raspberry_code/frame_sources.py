@@ -0,0 +1,193 @@
+"""Surse de frame-uri înregistrate, cu aceeași interfață ca Picamera2.
+
+``ImageDirectorySource`` (un director de imagini, în ordinea numelor) și
+``VideoFileSource`` (orice fișier citit de OpenCV) oferă ``start()``,
+``stop()`` și ``capture_array()``, deci pot înlocui camera în ``main.py``
+(``--source``) și în ``bench_recognition.py``. Frame-urile sunt BGR, ca cele
+de la cameră.
+
+Etichetele unui clip stau într-un fișier JSON alăturat (``<director>/labels.json``
+sau ``<video>.labels.json``), ca listă de segmente pe indexul frame-ului::
+
+    [{"start": 0, "end": 45, "person": "Abel Caluseri", "status": "authorized"},
+     {"start": 46, "end": 90, "person": "N/A", "status": "no_face"}]
+
+``end`` este inclusiv; frame-urile neacoperite nu intră în calculul acurateței.
+"""
+import json
+import logging
+import os
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class EndOfSource(EOFError):
+    """Sursa nu mai are frame-uri."""
+
+
+def load_labels(path):
+    """Segmentele de etichete, sortate după ``start``; ``[]`` dacă fișierul lipsește."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        segments = json.load(f)
+    for segment in segments:
+        if not {"start", "end", "status"} <= segment.keys():
+            raise ValueError(f"Label segment needs 'start', 'end' and 'status': {segment}")
+        segment.setdefault("person", "N/A" if segment["status"] == "no_face" else "Unknown")
+    return sorted(segments, key=lambda segment: segment["start"])
+
+
+def label_for(segments, index):
+    """Eticheta (persoană, status) a frame-ului, sau None."""
+    for segment in segments:
+        if segment["start"] <= index <= segment["end"]:
+            return segment["person"], segment["status"]
+        if segment["start"] > index:
+            break
+    return None
+
+
+class FrameSource:
+    def __init__(self, path, labels_path=None, size=None, fps=None, loop=False):
+        self.path = path
+        self.labels = load_labels(labels_path or self.default_labels_path(path))
+        self.size = size
+        self.fps = fps
+        self.loop = loop
+        self.index = -1
+        self._next_frame_at = None
+
+    @staticmethod
+    def default_labels_path(path):
+        return f"{path}.labels.json"
+
+    @property
+    def name(self):
+        return os.path.basename(os.path.normpath(self.path))
+
+    @property
+    def label(self):
+        """Eticheta ultimului frame returnat."""
+        return label_for(self.labels, self.index)
+
+    def start(self):
+        self.index = -1
+        self._next_frame_at = None
+
+    def stop(self):
+        pass
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError
+
+    def capture_array(self):
+        frame = self._read()
+        if frame is None and self.loop:
+            self._rewind()
+            self.index = -1
+            frame = self._read()
+        if frame is None:
+            raise EndOfSource(self.path)
+        if self.fps:
+            # Ritmul unei camere reale, pentru modul pipeline
+            now = time.monotonic()
+            if self._next_frame_at is not None and self._next_frame_at > now:
+                time.sleep(self._next_frame_at - now)
+            self._next_frame_at = max(now, self._next_frame_at or now) + 1.0 / self.fps
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+        self.index += 1
+        return frame
+
+    def __iter__(self):
+        """Perechi (frame, etichetă) până la sfârșitul sursei (ignoră ``loop``)."""
+        loop, self.loop = self.loop, False
+        try:
+            self.start()
+            while True:
+                try:
+                    frame = self.capture_array()
+                except EndOfSource:
+                    return
+                yield frame, self.label
+        finally:
+            self.loop = loop
+
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, path, labels_path=None, size=None, fps=None, loop=False):
+        super().__init__(path, labels_path, size, fps, loop)
+        self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise ValueError(f"No images found in {path}")
+        self._position = 0
+
+    @staticmethod
+    def default_labels_path(path):
+        return os.path.join(path, "labels.json")
+
+    def start(self):
+        super().start()
+        self._position = 0
+
+    def _rewind(self):
+        self._position = 0
+
+    def _read(self):
+        while self._position < len(self.files):
+            path = self.files[self._position]
+            self._position += 1
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return frame
+            logger.warning("Could not read image %s, skipping.", path)
+        return None
+
+    def __len__(self):
+        return len(self.files)
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, labels_path=None, size=None, fps=None, loop=False):
+        super().__init__(path, labels_path, size, fps, loop)
+        self._capture = None
+
+    def start(self):
+        super().start()
+        self.stop()
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            raise ValueError(f"Could not open video {self.path}")
+
+    def stop(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def _rewind(self):
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _read(self):
+        if self._capture is None:
+            self.start()
+        ok, frame = self._capture.read()
+        return frame if ok else None
+
+
+def open_source(path, labels_path=None, size=None, fps=None, loop=False):
+    """Director -> imagini, altfel fișier video."""
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, labels_path, size, fps, loop)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return VideoFileSource(path, labels_path, size, fps, loop)
@@ -0,0 +1,246 @@
+"""Indecși pentru căutarea celui mai apropiat vecin în galeria de fețe.
+
+Două backend-uri cu aceeași interfață ``search(queries) -> (indices, distances)``:
+
+* ``BruteForceIndex`` - căutare exactă, un singur produs matriceal;
+* ``IVFIndex`` - aproximativ: galeria este împărțită în bucket-uri k-means,
+  iar o interogare este comparată doar cu encodările din cele mai apropiate
+  ``n_probe`` bucket-uri. Distanțele returnate sunt exacte, deci toleranța
+  (0.55) are același sens ca la căutarea exhaustivă.
+
+Indexul se construiește offline din galerie (``encodings.gallery`` sau un
+``encodings.pickle`` vechi) și se salvează lângă ea (``encodings.index.npz``)::
+
+    python gallery_index.py build encodings.gallery --kind ivf --lists 64 --probe 4
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from gallery_store import GALLERY_EXTENSION, load_gallery
+
+INDEX_FORMAT_VERSION = 1
+
+
+def _as_matrix(encodings):
+    matrix = np.asarray(encodings, dtype=np.float32)
+    if matrix.size == 0:
+        return np.zeros((0, 128), dtype=np.float32)
+    return np.ascontiguousarray(matrix.reshape(-1, matrix.shape[-1]))
+
+
+def _sq_norms(matrix):
+    return np.einsum("ij,ij->i", matrix, matrix)
+
+
+def pairwise_distances(queries, matrix, matrix_sq_norms=None):
+    """Distanțe euclidiene (interogări x galerie), calculate vectorizat."""
+    if matrix_sq_norms is None:
+        matrix_sq_norms = _sq_norms(matrix)
+    q_sq = _sq_norms(queries)
+    d2 = q_sq[:, None] + matrix_sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+    np.maximum(d2, 0.0, out=d2)
+    return np.sqrt(d2, out=d2)
+
+
+def gallery_fingerprint(matrix):
+    """Amprentă a galeriei, pentru a detecta un index construit pe alte date."""
+    return hashlib.sha1(np.ascontiguousarray(matrix, dtype=np.float32).tobytes()).hexdigest()
+
+
+class BruteForceIndex:
+    """Căutare exactă în toată galeria."""
+
+    kind = "brute"
+
+    def __init__(self, matrix):
+        self.matrix = _as_matrix(matrix)
+        self.sq_norms = _sq_norms(self.matrix)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def search(self, queries):
+        queries = _as_matrix(queries)
+        if len(queries) == 0 or len(self) == 0:
+            return np.zeros(len(queries), dtype=np.int64), np.full(len(queries), np.inf, dtype=np.float32)
+        dist = pairwise_distances(queries, self.matrix, self.sq_norms)
+        best = np.argmin(dist, axis=1)
+        return best, dist[np.arange(len(best)), best]
+
+    def state(self):
+        return {}
+
+
+class IVFIndex:
+    """Index aproximativ de tip IVF (liste inversate peste centroizi k-means).
+
+    Encodările sunt rearanjate astfel încât fiecare bucket să fie un bloc
+    contiguu (``offsets[i]:offsets[i + 1]``), iar ``order`` păstrează
+    corespondența cu rândurile originale ale galeriei.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, matrix, centroids, order, offsets, n_probe=4):
+        matrix = _as_matrix(matrix)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq_norms = _sq_norms(self.centroids)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n_probe = max(1, min(int(n_probe), len(self.centroids)))
+        self.matrix = np.ascontiguousarray(matrix[self.order])
+        self.sq_norms = _sq_norms(self.matrix)
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, n_probe=4, n_iter=20, seed=0):
+        matrix = _as_matrix(matrix)
+        n = matrix.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(round(np.sqrt(n))))
+        n_lists = max(1, min(int(n_lists), n))
+        centroids, assignment = kmeans(matrix, n_lists, n_iter=n_iter, seed=seed)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_lists)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        return cls(matrix, centroids, order, offsets, n_probe=n_probe)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def search(self, queries):
+        queries = _as_matrix(queries)
+        best_idx = np.zeros(len(queries), dtype=np.int64)
+        best_dist = np.full(len(queries), np.inf, dtype=np.float32)
+        if len(queries) == 0 or len(self) == 0:
+            return best_idx, best_dist
+
+        centroid_dist = pairwise_distances(queries, self.centroids, self.centroid_sq_norms)
+        probes = np.argsort(centroid_dist, axis=1)[:, :self.n_probe]
+        for qi, lists in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+            if rows.size == 0:
+                continue
+            dist = pairwise_distances(queries[qi:qi + 1], self.matrix[rows], self.sq_norms[rows])[0]
+            j = int(np.argmin(dist))
+            best_idx[qi] = self.order[rows[j]]
+            best_dist[qi] = dist[j]
+        return best_idx, best_dist
+
+    def state(self):
+        return {"centroids": self.centroids, "order": self.order, "offsets": self.offsets,
+                "n_probe": np.int64(self.n_probe)}
+
+
+def kmeans(matrix, k, n_iter=20, seed=0):
+    """Algoritmul Lloyd, în NumPy pur. Returnează (centroizi, atribuiri)."""
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    centroids = matrix[rng.choice(n, size=k, replace=False)].copy()
+    sq_norms = _sq_norms(matrix)
+    assignment = np.zeros(n, dtype=np.int64)
+    for _ in range(n_iter):
+        dist = pairwise_distances(centroids, matrix, sq_norms)  # (k, n)
+        new_assignment = np.argmin(dist, axis=0)
+        counts = np.bincount(new_assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, new_assignment, matrix)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+        # Bucket-urile goale primesc puncte aleatoare, altfel rămân nefolosite
+        empty = np.flatnonzero(~nonempty)
+        if empty.size:
+            centroids[empty] = matrix[rng.choice(n, size=empty.size, replace=False)]
+        if np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+    return centroids, assignment
+
+
+INDEX_KINDS = {
+    BruteForceIndex.kind: BruteForceIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def build_index(matrix, kind="brute", **params):
+    if kind == BruteForceIndex.kind:
+        return BruteForceIndex(matrix)
+    if kind == IVFIndex.kind:
+        return IVFIndex.build(matrix, **params)
+    raise ValueError(f"Unknown index kind: {kind!r}")
+
+
+def default_index_path(gallery_path):
+    root, _ = os.path.splitext(gallery_path)
+    return root + ".index.npz"
+
+
+def save_index(index, path, matrix):
+    np.savez(path, format_version=np.int64(INDEX_FORMAT_VERSION), kind=np.str_(index.kind),
+             fingerprint=np.str_(gallery_fingerprint(matrix)), **index.state())
+
+
+def load_index(path, matrix, n_probe=None):
+    """Încarcă un index salvat pentru ``matrix``.
+
+    Dacă indexul a fost construit pe o altă galerie se aruncă ``ValueError``;
+    apelantul poate reveni la ``BruteForceIndex``.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["format_version"]) != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version in {path}")
+        if str(data["fingerprint"]) != gallery_fingerprint(_as_matrix(matrix)):
+            raise ValueError(f"Index {path} was built for a different gallery")
+        kind = str(data["kind"])
+        if kind == BruteForceIndex.kind:
+            return BruteForceIndex(matrix)
+        if kind == IVFIndex.kind:
+            probe = int(data["n_probe"]) if n_probe is None else n_probe
+            return IVFIndex(matrix, data["centroids"], data["order"], data["offsets"], n_probe=probe)
+    raise ValueError(f"Unknown index kind {kind!r} in {path}")
+
+
+def load_gallery_pickle(path):
+    with open(path, "rb") as f:
+        data = pickle.loads(f.read())
+    return _as_matrix(data["encodings"]), list(data["names"])
+
+
+def load_gallery_file(path):
+    """(matrice, nume) din ``.gallery`` (mapat în memorie) sau din ``.pickle``."""
+    if path.endswith(GALLERY_EXTENSION):
+        matrix, names, _ = load_gallery(path)
+        return matrix, names
+    return load_gallery_pickle(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a nearest-neighbour index for the face gallery.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build an index next to the encodings file")
+    build.add_argument("gallery", nargs="?", default="encodings.gallery")
+    build.add_argument("--kind", choices=sorted(INDEX_KINDS), default=IVFIndex.kind)
+    build.add_argument("--lists", type=int, default=None, help="number of IVF buckets (default: sqrt(N))")
+    build.add_argument("--probe", type=int, default=4, help="buckets visited per query")
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    matrix, names = load_gallery_file(args.gallery)
+    params = {}
+    if args.kind == IVFIndex.kind:
+        params = {"n_lists": args.lists, "n_probe": args.probe, "seed": args.seed}
+    index = build_index(matrix, args.kind, **params)
+    output = args.output or default_index_path(args.gallery)
+    save_index(index, output, matrix)
+    print(f"[INFO] Built {args.kind} index over {len(names)} encodings -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Reîncărcarea galeriei și a listei de persoane autorizate, fără repornire.
+
+``GalleryReloader`` urmărește (prin ``os.stat``, la ``poll_interval`` secunde)
+galeria, indexul de lângă ea și fișierul cu persoanele autorizate. La o
+schimbare, sau la ``request_reload()`` (ex. mesajul MQTT "reload"), construiește
+un ``FaceMatcher`` complet nou pe thread-ul propriu și îl predă prin
+``on_swap`` (``Recognizer.swap_matcher``). Bucla principală nu se oprește: până
+la schimbarea referinței folosește galeria veche, apoi pe cea nouă.
+
+Dacă noile fișiere nu pot fi citite (ex. JSON invalid), galeria curentă rămâne
+activă și eroarea este afișată.
+
+Cu ``fallback_path`` (ex. ``encodings.pickle`` vechi), acesta este folosit doar
+cât timp ``gallery_path`` nu există; o galerie scrisă ulterior de ``enroll.py``
+este preluată la următoarea verificare.
+"""
+import json
+import logging
+import os
+import threading
+
+from face_matcher import DEFAULT_TOLERANCE, FaceMatcher
+from gallery_index import default_index_path
+
+logger = logging.getLogger(__name__)
+
+
+def load_authorized_names(path, default=()):
+    """Lista JSON de nume din ``path``; ``default`` dacă fișierul lipsește."""
+    if not path or not os.path.exists(path):
+        return frozenset(default)
+    with open(path, "r", encoding="utf-8") as f:
+        names = json.load(f)
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"{path} must contain a JSON list of names")
+    return frozenset(names)
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, TypeError):
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class GalleryReloader(threading.Thread):
+    def __init__(self, gallery_path, authorized_path=None, default_authorized=(), tolerance=DEFAULT_TOLERANCE,
+                 on_swap=None, poll_interval=2.0, encoding_model=None, fallback_path=None):
+        super().__init__(name="gallery-reloader", daemon=True)
+        self.gallery_path = gallery_path
+        self.fallback_path = fallback_path
+        self.loaded_path = None
+        self.authorized_path = authorized_path
+        self.default_authorized = frozenset(default_authorized)
+        self.tolerance = tolerance
+        self.encoding_model = encoding_model
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+
+        self._reload_requested = threading.Event()
+        self._stop_event = threading.Event()
+        self._signature = None
+        self.reloads = 0
+        self.failures = 0
+
+    def current_path(self):
+        """Galeria de încărcat acum: ``gallery_path``, sau ``fallback_path`` cât timp aceasta lipsește."""
+        if self.fallback_path and not os.path.exists(self.gallery_path) and os.path.exists(self.fallback_path):
+            return self.fallback_path
+        return self.gallery_path
+
+    def _signatures(self):
+        path = self.current_path()
+        return tuple(_file_signature(p) for p in
+                     (self.gallery_path, path, default_index_path(path), self.authorized_path))
+
+    def load(self):
+        """Construiește un matcher nou din fișierele curente (excepțiile ajung la apelant)."""
+        signature = self._signatures()
+        path = self.current_path()
+        authorized = load_authorized_names(self.authorized_path, self.default_authorized)
+        matcher = FaceMatcher.from_file(path, authorized, tolerance=self.tolerance,
+                                        encoding_model=self.encoding_model)
+        self._signature = signature
+        self.loaded_path = path
+        return matcher
+
+    def changed(self):
+        return self._signatures() != self._signature
+
+    def request_reload(self):
+        """Cere o reîncărcare (thread-safe, ex. din callback-ul MQTT)."""
+        self._reload_requested.set()
+
+    def reload(self):
+        """Reîncarcă acum; returnează noul matcher sau None dacă a eșuat."""
+        try:
+            matcher = self.load()
+        except Exception as e:
+            # Nu reîncercăm până la următoarea modificare a fișierelor
+            self._signature = self._signatures()
+            self.failures += 1
+            logger.error("Gallery reload failed, keeping the current gallery: %s", e)
+            return None
+        if self.on_swap is not None:
+            self.on_swap(matcher)
+        self.reloads += 1
+        logger.info("Gallery reloaded from %s: %d known faces, %d authorized people.",
+                    self.loaded_path, len(matcher), len(matcher.authorized_names))
+        return matcher
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self._reload_requested.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            requested = self._reload_requested.wait(self.poll_interval)
+            if self._stop_event.is_set():
+                break
+            self._reload_requested.clear()
+            if requested or self.changed():
+                self.reload()
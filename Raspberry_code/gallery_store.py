@@ -0,0 +1,113 @@
+"""Formatul binar al galeriei de fețe (``encodings.gallery``).
+
+Fișierul este scris de ``enroll.py`` și citit la pornire prin ``np.memmap``,
+fără ``pickle``: doar antetul și tabela de nume sunt parsate, iar matricea de
+encodări rămâne pe disc până când paginile ei sunt atinse. Structura::
+
+    antet fix (24 octeți): magic "FGAL", versiune u32, dim u32, rânduri u64,
+                           lungimea metadatelor u32
+    metadate JSON (UTF-8): "names" (un nume per rând) și restul informațiilor
+                           scrise de enroll.py (parametri, imagini sursă, dată)
+    padding până la multiplu de 64 octeți
+    matrice float32 little-endian (rânduri x dim), C-contiguă
+
+Scrierea se face într-un fișier temporar urmat de ``os.replace``, deci un
+proces care are deja galeria mapată în memorie își păstrează vechea versiune
+până la reîncărcare.
+"""
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+GALLERY_MAGIC = b"FGAL"
+GALLERY_FORMAT_VERSION = 1
+GALLERY_EXTENSION = ".gallery"
+# Modelul dlib de encodare implicit, la construcție (enroll.py) și la rulare (main.py);
+# distanțele dintre encodări făcute cu modele diferite nu au sens
+DEFAULT_ENCODING_MODEL = "small"
+_HEADER = struct.Struct("<4sIIQI")
+_ALIGNMENT = 64
+
+
+def default_gallery_path(path):
+    root, _ = os.path.splitext(path)
+    return root + GALLERY_EXTENSION
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_gallery(path, matrix, names, metadata=None):
+    """Scrie galeria atomic. ``metadata`` se păstrează alături de nume."""
+    names = list(names)
+    matrix = np.asarray(matrix, dtype="<f4")
+    if matrix.size == 0:
+        matrix = np.zeros((0, 128), dtype="<f4")
+    matrix = np.ascontiguousarray(matrix.reshape(-1, matrix.shape[-1]))
+    if len(names) != matrix.shape[0]:
+        raise ValueError(f"{len(names)} names for {matrix.shape[0]} encodings")
+
+    meta = dict(metadata or {})
+    meta["names"] = names
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header = _HEADER.pack(GALLERY_MAGIC, GALLERY_FORMAT_VERSION, matrix.shape[1], matrix.shape[0], len(meta_bytes))
+    data_offset = _aligned(len(header) + len(meta_bytes))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".gallery-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(meta_bytes)
+            f.write(b"\0" * (data_offset - len(header) - len(meta_bytes)))
+            f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def gallery_encoding_model(path):
+    """Modelul de encodare din parametrii galeriei, sau None dacă nu e înregistrat (ex. galerii importate)."""
+    if not path.endswith(GALLERY_EXTENSION):
+        return None
+    _, _, metadata, _ = read_gallery_header(path)
+    return (metadata.get("params") or {}).get("encoding_model")
+
+
+def read_gallery_header(path):
+    """(dim, rânduri, metadate, offset-ul matricei), fără să citească encodările."""
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise ValueError(f"{path} is too short to be a gallery file")
+        magic, version, dim, rows, meta_len = _HEADER.unpack(raw)
+        if magic != GALLERY_MAGIC:
+            raise ValueError(f"{path} is not a gallery file")
+        if version != GALLERY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported gallery format version {version} in {path}")
+        metadata = json.loads(f.read(meta_len).decode("utf-8"))
+    if len(metadata.get("names", ())) != rows:
+        raise ValueError(f"Gallery {path} has {rows} rows but {len(metadata.get('names', ()))} names")
+    return dim, rows, metadata, _aligned(_HEADER.size + meta_len)
+
+
+def load_gallery(path):
+    """(matrice float32 mapată read-only, nume, metadate)."""
+    dim, rows, metadata, offset = read_gallery_header(path)
+    expected = offset + rows * dim * 4
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"Gallery {path} is truncated")
+    if rows == 0:
+        matrix = np.zeros((0, dim), dtype=np.float32)
+    else:
+        matrix = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(rows, dim))
+    names = metadata.pop("names")
+    return matrix, names, metadata
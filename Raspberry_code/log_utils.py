@@ -0,0 +1,181 @@
+"""Logging structurat și asincron pentru căile fierbinți: bucla de recunoaștere,
+callback-urile MQTT și request-urile serverului.
+
+* ``QueueLogHandler`` doar pune înregistrarea într-o coadă mărginită
+  (``put_nowait``); formatarea și scrierea pe stream se fac pe thread-ul unui
+  ``QueueListener``. Cu coada plină înregistrarea este aruncată și numărată
+  (``dropped=N`` pe următorul mesaj scris), bucla nu așteaptă niciodată după
+  stdout/journald.
+* ``RateLimitFilter`` lasă să treacă cel mult ``burst`` mesaje cu același
+  șablon (logger, nivel, ``msg`` înainte de ``%``) pe ``period`` secunde; cele
+  în plus sunt numărate, iar numărul apare ca ``suppressed=N`` la următorul
+  mesaj care trece. Așa o eroare repetată la fiecare frame (ex. serverul sau
+  brokerul căzut) produce câteva rânduri pe minut, nu câte unul per frame.
+  Apelurile folosesc argumente ``%s``, nu f-string-uri, ca mesajele repetate
+  să aibă același șablon.
+* ``KeyValueFormatter`` adaugă câmpurile din ``extra={...}`` ca ``cheie=valoare``
+  (sau, cu ``json_lines=True``, scrie câte un obiect JSON pe rând).
+
+``main.py`` apelează ``configure_logging`` o dată, la pornire. Serverul
+folosește același modul, ca ``Raspberry_code.log_utils`` (vezi
+``settings.LOGGING``), deci modulul depinde doar de biblioteca standard.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+# Atributele standard ale unui LogRecord; orice altceva a venit prin ``extra``
+_RESERVED_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+def record_fields(record):
+    """Câmpurile structurate (din ``extra``) ale înregistrării, în ordinea adăugării."""
+    return {key: value for key, value in record.__dict__.items() if key not in _RESERVED_ATTRS}
+
+
+def _format_field(value):
+    text = str(value)
+    if not text or any(ch.isspace() for ch in text) or '"' in text or "=" in text:
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    def __init__(self, fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s", datefmt=None, json_lines=False):
+        super().__init__(fmt, datefmt)
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = record_fields(record)
+        if self.json_lines:
+            record.message = record.getMessage()
+            entry = {"time": self.formatTime(record, self.datefmt), "level": record.levelname,
+                     "logger": record.name, "message": record.message, **fields}
+            if record.exc_info:
+                entry["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str, ensure_ascii=False)
+        text = super().format(record)
+        if fields:
+            pairs = " ".join(f"{key}={_format_field(value)}" for key, value in fields.items())
+            # Traceback-ul (dacă există) rămâne ultimul
+            head, sep, tail = text.partition("\n")
+            text = f"{head} {pairs}{sep}{tail}"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """Limitează mesajele repetate de nivel cel puțin ``min_level``.
+
+    Cu ``sample_every = N`` (N > 0), unul din fiecare N mesaje suprimate trece
+    totuși, ca eșantion, cu numărul celor suprimate până atunci.
+    """
+
+    def __init__(self, burst=5, period=60.0, min_level=logging.WARNING, sample_every=0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.min_level = min_level if isinstance(min_level, int) else logging.getLevelName(min_level)
+        self.sample_every = sample_every
+        self._lock = threading.Lock()
+        self._windows = {} # șablon -> [începutul ferestrei, mesaje trecute, mesaje suprimate]
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                if not self.sample_every or window[2] % self.sample_every:
+                    return False
+                suppressed = window[2]
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # La oprire așteptăm loc în coadă, ca mesajele deja primite să fie scrise
+        self.queue.put(self._sentinel)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Handler neblocant: coadă mărginită golită de un thread care scrie pe ``stream``."""
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._direct = False
+        self.target = logging.StreamHandler(stream)
+        self._listener = _Listener(self.queue, self.target)
+        self._listener.start()
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            # Un proces copil (fork) nu are thread-ul listener-ului: scrie direct
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._direct = True
+
+    def setFormatter(self, fmt):
+        # Formatarea se face pe thread-ul listener-ului
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Argumentele pot fi modificate de apelant după return, deci mesajul se construiește acum
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        dropped = self.dropped
+        if dropped:
+            record.dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            # Numărul aruncat apare o singură dată, pe primul mesaj care încape
+            self.dropped -= dropped
+
+    def emit(self, record):
+        if self._direct:
+            self.target.handle(record)
+            return
+        super().emit(record)
+
+    def close(self):
+        listener, self._listener = self._listener, None
+        if listener is not None and not self._direct:
+            listener.stop()
+        super().close()
+
+
+def configure_logging(level="INFO", stream=None, queue_size=10000, burst=5, period=60.0, sample_every=0,
+                      json_lines=False):
+    """Înlocuiește handler-ele logger-ului rădăcină cu un ``QueueLogHandler`` limitat."""
+    handler = QueueLogHandler(stream, maxsize=queue_size)
+    handler.setFormatter(KeyValueFormatter(json_lines=json_lines))
+    handler.addFilter(RateLimitFilter(burst, period, sample_every=sample_every))
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
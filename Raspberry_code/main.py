@@ -1,252 +1,356 @@
-import face_recognition
 import cv2
-import numpy as np
-from picamera2 import Picamera2
+import os
 import time
-import pickle
-import requests
-import datetime
+import argparse
 import json
-
-from gpiozero import LED, Servo
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from gpiozero.pins.mock import MockFactory, MockPWMPin
 from gpiozero.pins.pigpio import PiGPIOFactory
 import paho.mqtt.client as mqtt
 
+from adaptive import AdaptiveScaler
+from gallery_reload import GalleryReloader
+from gallery_store import DEFAULT_ENCODING_MODEL
+from log_utils import configure_logging
+from debug_stream import DebugStreamServer
+from detectors import HOGDetector, build_detector
+from door_actuator import DoorActuator
+from encoding_cache import EncodingCache
+from face_tracker import FaceTracker
+from frame_sources import EndOfSource, open_source
+from metrics import MetricsReporter, format_summary, registry as metrics_registry
+from motion_gate import MotionGate
+from pipeline import CaptureStage, Pipeline, PoolStage, Stage
+from recognition import crop_faces, detect_faces, downscale, encode_crops, summarize_matches, to_rgb, warm_up
+from recognizer import Recognizer
+from startup import StartupTimeline, process_start_monotonic, start_tasks, wait_for_tasks
+from status_publisher import MQTTStatusPublisher, RecordingStatusPublisher, StatusPublisher, StatusReporter
+
+# --- Argumente din linia de comandă ---
+parser = argparse.ArgumentParser(description="Recunoaștere facială și control al ușii.")
+parser.add_argument("--pipeline", action="store_true", help="Etapele rulează în paralel (thread-uri/procese)")
+parser.add_argument("--source", help="Director de imagini sau fișier video, în locul camerei")
+parser.add_argument("--source-fps", type=float, default=None, help="Ritmul de redare al sursei (implicit: maxim)")
+parser.add_argument("--offline", action="store_true",
+                    help="GPIO simulat, fără MQTT, statusurile doar înregistrate local (nu trimise)")
+parser.add_argument("--detector", default=None, help="Detectorul de fețe (implicit DETECTOR_BACKEND)")
+parser.add_argument("--headless", action="store_true", help="Fără fereastră: nici adnotare, nici afișare")
+parser.add_argument("--debug-stream", type=int, default=None, metavar="PORT",
+                    help="În modul headless, stream MJPEG de depanare pe acest port")
+parser.add_argument("--log-level", default=None, choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                    help="Nivelul minim al mesajelor (implicit LOG_LEVEL)")
+args = parser.parse_args()
+
+# --- Logging: coadă neblocantă, scrisă de un thread; erorile repetate sunt limitate ---
+LOG_LEVEL = args.log_level or "INFO"
+LOG_QUEUE_SIZE = 1000 # Mesaje în așteptare; peste această limită sunt aruncate (și numărate)
+LOG_RATE_LIMIT_BURST = 5 # Mesaje identice (WARNING+) permise...
+LOG_RATE_LIMIT_PERIOD = 60.0 # ...în această fereastră, în secunde
+LOG_JSON = False # True = un obiect JSON pe rând (pentru journald/colectoare de loguri)
+configure_logging(LOG_LEVEL, queue_size=LOG_QUEUE_SIZE, burst=LOG_RATE_LIMIT_BURST,
+                  period=LOG_RATE_LIMIT_PERIOD, json_lines=LOG_JSON)
+log = logging.getLogger("door")
+mqtt_log = logging.getLogger("door.mqtt")
+
 # --- Configurare GPIO ---
 GREEN_LED_PIN = 17
 RED_LED_PIN = 27
 SERVO_PIN = 18
 
-try:
-    factory = PiGPIOFactory()
-except OSError:
-    print("[ERROR] pigpiod daemon not running.")
-    factory = None
-
-green_led = LED(GREEN_LED_PIN)
-red_led = LED(RED_LED_PIN)
-
 SERVO_LOCKED_VALUE = -0.8
 SERVO_UNLOCKED_VALUE = 0.2
-
-if factory:
-    servo = Servo(SERVO_PIN, initial_value=SERVO_LOCKED_VALUE, min_pulse_width=0.0005, max_pulse_width=0.0025, pin_factory=factory)
-else:
-    servo = Servo(SERVO_PIN, initial_value=SERVO_LOCKED_VALUE, min_pulse_width=0.0005, max_pulse_width=0.0025)
-
-print("[INFO] GPIO components initialized.")
-green_led.off()
-red_led.on() # Ușa pornește încuiată
-servo.value = SERVO_LOCKED_VALUE
-time.sleep(0.5)
+AUTO_CLOSE_DELAY = 5.0 # Secunde după care ușa se închide automat (temporizat, independent de FPS)
+AUTO_OPEN_ON_RECOGNITION = False # True = un frame "authorized" deschide ușa (altfel doar comenzile MQTT)
 # ------------------------
 
 # --- Configurare Conexiune HTTP către Laptop (Django) ---
 LAPTOP_IP_ADDRESS = "192.168.151.252"
 LAPTOP_HTTP_URL = f"http://{LAPTOP_IP_ADDRESS}:8000/pi/update_status/"
+LAPTOP_BULK_URL = f"http://{LAPTOP_IP_ADDRESS}:8000/pi/update_status/bulk/" # Restanțele după o pană pleacă în loturi
+STATUS_BULK_SIZE = 500
+DEVICE_ID = "door-1" # Identifică ușa pe server (stare, jurnal de acces, topic de comenzi)
+STATUS_HTTP_TIMEOUT = 3.0
+STATUS_COALESCE_INTERVAL = 0.5 # Secunde; dintr-un interval se trimite doar ultimul status
+STATUS_QUEUE_SIZE = 200 # Evenimente păstrate în memorie cât timp serverul e indisponibil
+STATUS_SPOOL_PATH = "status_spool.jsonl" # None = fără spool pe disc (evenimentele în plus se pierd)
 # ------------------------------------------------------
 
 # --- Configurare MQTT (pentru a primi comenzi de la Django) ---
 MQTT_BROKER_HOST = "broker.hivemq.com"
 MQTT_BROKER_PORT = 1883
 MQTT_COMMAND_TOPIC = "usa/inteligenta/comanda"
+# Ușa implicită a serverului (PI_DEFAULT_DEVICE_ID) ascultă pe topicul de bază, celelalte pe <topic>/<DEVICE_ID>
+MQTT_DEVICE_COMMAND_TOPIC = MQTT_COMMAND_TOPIC if DEVICE_ID == "door-1" else f"{MQTT_COMMAND_TOPIC}/{DEVICE_ID}"
 MQTT_CLIENT_ID_PI_LISTENER = "raspberrypi_door_ctrl_listener" # Nume client unic
+MQTT_STATUS_TOPIC = f"usa/inteligenta/status/{DEVICE_ID}" # Citit pe server de `manage.py mqtt_status_subscriber`
+# "http" = POST către LAPTOP_HTTP_URL; "mqtt" = mesaj retained pe MQTT_STATUS_TOPIC, prin clientul de comenzi
+STATUS_TRANSPORT = "http"
+# Doar declanșează recitirea fișierelor locale; lista de autorizați nu vine niciodată prin MQTT
+MQTT_CONTROL_TOPIC = f"usa/inteligenta/control/{DEVICE_ID}"
+MQTT_METRICS_TOPIC = f"usa/inteligenta/metrics/{DEVICE_ID}" # Snapshot-uri JSON retained, la METRICS_INTERVAL
+METRICS_ENABLED = True # False = fără colectare (fiecare măsurătoare devine o verificare de bool)
+METRICS_INTERVAL = 60.0 # Secunde între snapshot-uri
 # -------------------------------------------------------------
 
-# Load pre-trained face encodings
-print("[INFO] loading encodings...")
-try:
-    with open("encodings.pickle", "rb") as f:
-        data = pickle.loads(f.read())
-    known_face_encodings = data["encodings"]
-    known_face_names = data["names"]
-    print(f"[INFO] Loaded {len(known_face_names)} known faces.")
-except FileNotFoundError:
-     print("[ERROR] encodings.pickle not found!")
-     exit()
-except Exception as e:
-     print(f"[ERROR] Failed to load encodings: {e}")
-     exit()
-
-# Initialize the camera
-print("[INFO] Initializing camera...")
-picam2 = Picamera2()
-config = picam2.create_preview_configuration(main={"format": 'XRGB8888', "size": (640, 480)})
-picam2.configure(config)
-picam2.start()
-time.sleep(1.0)
-print("[INFO] Camera started.")
+authorized_names = {"Abel Caluseri", "Alexandra Anghel"} # Folosită doar dacă AUTHORIZED_NAMES_PATH lipsește
+AUTHORIZED_NAMES_PATH = "authorized_names.json" # Listă JSON de nume, recitită la modificare
+GALLERY_RELOAD_INTERVAL = 2.0 # Secunde între verificările fișierelor galeriei
+
+# Galeria construită de enroll.py (mapată în memorie); encodings.pickle doar ca rezervă
+GALLERY_PATH = "encodings.gallery"
+LEGACY_ENCODINGS_PATH = "encodings.pickle"
+
+CAMERA_RESOLUTION = (640, 480) # Encodarea folosește crop-uri la această rezoluție; detecția rulează la scară
+CAMERA_SETTLE_TIME = 1.0 # Secunde lăsate camerei pentru expunere/balansul de alb, pe thread-ul ei de pornire
+
+# --- Pornire ---
+# Ușa devine utilizabilă (încuiată, comenzi MQTT) înaintea vederii; camera, galeria și modelele
+# dlib se inițializează în paralel. Dacă vederea nu poate porni, agentul rămâne doar cu comenzi MQTT.
+COMMAND_ONLY_ON_VISION_FAILURE = True # False = ieșire, ca înainte (systemd repornește procesul)
 
 # Initialize variables
-cv_scaler = 1
+cv_scaler = 1 # Scara inițială de detecție (fixă dacă ADAPTIVE_SCALING = False)
 face_locations = []
-face_encodings = []
 face_names_display = []
-last_sent_status_tuple = None
-status_change_time = 0
-SEND_INTERVAL = 5.0
-authorized_names = ["Abel Caluseri", "Alexandra Anghel"]
-
-# --- Variabile pentru starea ușii controlată de MQTT ---
-is_door_currently_open = False # Indică dacă ușa este fizic deschisă (servo la UNLOCKED)
-door_open_start_time = 0
-AUTO_CLOSE_DELAY = 5.0 # Secunde după care ușa se închide automat
-# ----------------------------------------------------
+SEND_INTERVAL = 5.0 # Secunde după care același status este retrimis
+
+# --- Mod headless (unitățile de la uși nu au monitor) ---
+# Fără DISPLAY, cv2.imshow ar eșua oricum
+HEADLESS = args.headless or not os.environ.get("DISPLAY")
+HEADLESS_REPORT_INTERVAL = 30.0 # Secunde între rapoartele de FPS în modul headless
+DEBUG_STREAM_PORT = args.debug_stream # None = fără stream de depanare
+DEBUG_STREAM_MAX_FPS = 2.0 # Frame-uri encodate pe secundă, doar cât timp un client e conectat
+DEBUG_STREAM_JPEG_QUALITY = 70
+
+# --- Scara de detecție adaptivă și parametrii dlib ---
+ADAPTIVE_SCALING = True
+TARGET_FRAME_TIME = 0.2 # Secunde; bugetul de latență per frame
+DETECTION_SCALE_LEVELS = (1.0, 1.5, 2.0, 2.5, 3.0) # Factori de micșorare pentru detecția HOG
+DETECTION_UPSAMPLE = 1 # number_of_times_to_upsample pentru face_locations
+ENCODING_JITTERS = 1 # num_jitters pentru face_encodings
+ENCODING_MODEL = DEFAULT_ENCODING_MODEL # 'small'; galeria trebuie construită cu același model (enroll.py)
+
+# --- Modul pipeline (python main.py --pipeline) ---
+PIPELINE_MODE = args.pipeline
+PIPELINE_WORKERS = 3 # Procese pentru HOG/encodare; un nucleu rămâne pentru captură și afișare
+PIPELINE_MAX_FRAME_AGE = 1.0 # Secunde; frame-urile mai vechi sunt aruncate
+PIPELINE_REPORT_INTERVAL = 10.0 # Secunde între rapoartele cu timpii per etapă
+
+# --- Filtru de mișcare înainte de detecția HOG ---
+MOTION_GATE_ENABLED = True
+MOTION_THRESHOLD = 25 # Diferența minimă de intensitate (0-255) pentru un pixel "schimbat"
+MOTION_MIN_CHANGED_FRACTION = 0.01 # Fracțiunea de pixeli schimbați care înseamnă mișcare
+MOTION_FORCE_INTERVAL = 2.0 # Secunde; o trecere completă forțată chiar dacă scena e statică
+
+# --- Urmărirea fețelor între frame-uri (evită re-encodarea aceleiași persoane) ---
+TRACKING_ENABLED = True
+TRACK_IOU_THRESHOLD = 0.3 # IoU minim pentru a asocia o detecție cu un track existent
+TRACK_MIN_CONFIDENT_IOU = 0.6 # Sub acest IoU caseta s-a mișcat mult, deci re-encodăm
+TRACK_REFRESH_INTERVAL = 1.0 # Secunde după care identitatea unui track este re-verificată
+TRACK_MAX_MISSED = 2 # Frame-uri fără detecție după care track-ul este șters
+
+# --- Cache de encodări (fețe aproape identice între frame-uri nu mai trec prin dlib) ---
+ENCODING_CACHE_ENABLED = True
+ENCODING_CACHE_SIZE = 16 # Encodări păstrate (LRU)
+ENCODING_CACHE_TTL = 2.0 # Secunde de la encodare după care intrarea expiră
+ENCODING_CACHE_MAX_DISTANCE = 6 # Biți diferiți (din 64) în hash-ul perceptual al feței
+ENCODING_CACHE_MIN_IOU = 0.5 # Suprapunerea minimă a casetelor
+
+# --- Detectorul de fețe ---
+# "hog" (dlib), "haar"/"lbp" (cascade OpenCV), "dnn" (SSD OpenCV) sau "cascade":
+# DETECTOR_PROPOSER propune regiuni, DETECTOR_CONFIRMER confirmă doar în jurul lor
+DETECTOR_BACKEND = args.detector or "hog"
+DETECTOR_PROPOSER = "haar"
+DETECTOR_CONFIRMER = "hog"
+CASCADE_MODEL_PATH = None # None = cascada Haar din OpenCV; pentru "lbp", calea către lbpcascade_frontalface_improved.xml
+DNN_MODEL_PATH = "models/res10_300x300_ssd_iter_140000.caffemodel"
+DNN_CONFIG_PATH = "models/deploy.prototxt"
+DNN_CONFIDENCE = 0.5
+
+metrics_registry.enabled = METRICS_ENABLED
+startup_timeline = StartupTimeline(process_start_monotonic(), metrics_registry)
+
+# --- GPIO: ușa pornește încuiată, înainte de orice altceva ---
+factory = None
+if args.offline:
+    # Pini simulați (gpiozero): logica ușii rulează la fel, fără hardware
+    factory = MockFactory(pin_class=MockPWMPin)
+else:
+    try:
+        factory = PiGPIOFactory()
+    except OSError:
+        log.error("pigpiod daemon not running.")
+
+# LED-urile și servo-ul sunt comandate doar de thread-ul actuatorului (comenzile vin printr-o coadă)
+door_actuator = DoorActuator(GREEN_LED_PIN, RED_LED_PIN, SERVO_PIN, pin_factory=factory,
+                             locked_value=SERVO_LOCKED_VALUE, unlocked_value=SERVO_UNLOCKED_VALUE,
+                             auto_close_delay=AUTO_CLOSE_DELAY)
+door_actuator.start()
+log.info("GPIO components initialized.")
+startup_timeline.mark("gpio")
+
+# Setate când vederea e gata; până atunci comenzile MQTT funcționază, recunoașterea nu
+gallery_reloader = None
+recognizer = None
+camera = None
 
 # --- Funcții Callback MQTT ---
 def on_mqtt_connect(client, userdata, flags, rc, properties=None):
     if rc == 0:
-        print(f"[MQTT] Connected to Broker: {MQTT_BROKER_HOST}")
-        client.subscribe(MQTT_COMMAND_TOPIC)
-        print(f"[MQTT] Subscribed to command topic: {MQTT_COMMAND_TOPIC}")
-    else:
-        print(f"[MQTT] Failed to connect to broker, return code {rc}")
-
-def open_door_sequence():
-    """Secvența de deschidere a ușii."""
-    global is_door_currently_open, door_open_start_time
-    if not is_door_currently_open:
-        print("[ACTION_MQTT] Opening door...")
-        green_led.on()
-        red_led.off()
-        servo.value = SERVO_UNLOCKED_VALUE
-        is_door_currently_open = True
-        door_open_start_time = time.time()
-        print(f"[INFO] Door opened. Will auto-close in {AUTO_CLOSE_DELAY}s if not closed manually.")
+        mqtt_log.info("Connected to broker: %s", MQTT_BROKER_HOST)
+        client.subscribe(MQTT_DEVICE_COMMAND_TOPIC)
+        client.subscribe(MQTT_CONTROL_TOPIC)
+        mqtt_log.info("Subscribed to command topic: %s, control topic: %s", MQTT_DEVICE_COMMAND_TOPIC, MQTT_CONTROL_TOPIC)
+        startup_timeline.mark("mqtt_ready")
     else:
-        print("[INFO_MQTT] Door is already open. Resetting auto-close timer.")
-        door_open_start_time = time.time() # Resetăm timer-ul
-
-def close_door_sequence():
-    """Secvența de închidere a ușii."""
-    global is_door_currently_open
-    if is_door_currently_open:
-        print("[ACTION_MQTT] Closing door...")
-        servo.value = SERVO_LOCKED_VALUE
-        green_led.off()
-        red_led.on()
-        is_door_currently_open = False
-        print("[INFO] Door closed.")
-    else:
-        print("[INFO_MQTT] Door is already closed.")
+        mqtt_log.error("Failed to connect to broker, return code %s", rc)
 
 def on_mqtt_message(client, userdata, msg):
     payload = msg.payload.decode().lower()
-    print(f"[MQTT] Received command on '{msg.topic}': {payload}")
-
-    if payload == "deschide":
-        open_door_sequence()
+    mqtt_log.info("Received command on '%s': %s", msg.topic, payload)
+
+    if msg.topic == MQTT_CONTROL_TOPIC:
+        if payload == "reload":
+            if gallery_reloader is not None:
+                gallery_reloader.request_reload()
+            else:
+                mqtt_log.info("Gallery not loaded yet, ignoring reload.")
+        else:
+            mqtt_log.warning("Unknown control message received: %s", payload)
+    elif payload == "deschide":
+        door_actuator.open("mqtt")
+        startup_timeline.mark("first_command")
     elif payload == "inchide":
-        close_door_sequence()
+        door_actuator.close("mqtt")
+        startup_timeline.mark("first_command")
     else:
-        print(f"[MQTT_COMMAND] Unknown command received: {payload}")
+        mqtt_log.warning("Unknown command received: %s", payload)
 
 # --- Inițializare Client MQTT ---
-mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=MQTT_CLIENT_ID_PI_LISTENER)
-mqtt_client.on_connect = on_mqtt_connect
-mqtt_client.on_message = on_mqtt_message
-try:
-    mqtt_client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
-    mqtt_client.loop_start()
-except Exception as e:
-    print(f"[MQTT ERROR] Could not connect to MQTT broker: {e}")
-    mqtt_client = None
+# connect_async: conexiunea (și reconectările) se fac pe thread-ul paho, fără să blocheze pornirea
+mqtt_client = None
+if not args.offline:
+    mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=MQTT_CLIENT_ID_PI_LISTENER)
+    mqtt_client.on_connect = on_mqtt_connect
+    mqtt_client.on_message = on_mqtt_message
+    try:
+        mqtt_client.connect_async(MQTT_BROKER_HOST, MQTT_BROKER_PORT, 60)
+        mqtt_client.loop_start()
+    except Exception as e:
+        mqtt_log.error("Could not connect to MQTT broker: %s", e)
+        mqtt_client = None
 # --------------------------------
 
-# --- Funcție pentru a trimite statusul HTTP către laptop ---
-def send_status_to_laptop(person_name, status_msg):
-    # ... (codul funcției send_status_to_laptop este identic cu cel anterior) ...
-    global last_sent_status_tuple, status_change_time
-    current_status_tuple = (person_name, status_msg)
-    current_time = time.time()
-    if current_status_tuple != last_sent_status_tuple or (current_time - status_change_time > SEND_INTERVAL):
-        payload = {
-            "pi_timestamp": datetime.datetime.now().isoformat(),
-            "person_name": person_name,
-            "status": status_msg
-        }
-        try:
-            # print(f"[HTTP] Sending status: {payload}") # Poate fi prea verbos
-            response = requests.post(LAPTOP_HTTP_URL, json=payload, timeout=3.0)
-            response.raise_for_status()
-            # print(f"[HTTP] Server response: {response.status_code} - {response.json()}")
-            last_sent_status_tuple = current_status_tuple
-            status_change_time = current_time
-        except requests.exceptions.Timeout:
-            print(f"[ERROR_HTTP] Connection to {LAPTOP_HTTP_URL} timed out.")
-        except requests.exceptions.ConnectionError:
-            print(f"[ERROR_HTTP] Could not connect to {LAPTOP_HTTP_URL}. Is the server running?")
-        except requests.exceptions.HTTPError as http_err:
-             print(f"[ERROR_HTTP] HTTP error occurred: {http_err} - Response: {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"[ERROR_HTTP] Failed to send status to laptop: {e}")
-        except Exception as e:
-             print(f"[ERROR_HTTP] An unexpected error occurred during HTTP send: {e}")
-
-
-# --- Funcție pentru procesarea frame-ului (doar recunoaștere și trimitere HTTP) ---
-def process_frame_for_recognition(frame):
-    global face_locations, face_encodings, face_names_display
+# --- Funcție pentru a trimite statusul către laptop (HTTP sau MQTT) ---
+if args.offline:
+    status_publisher = RecordingStatusPublisher()
+elif STATUS_TRANSPORT == "mqtt" and mqtt_client is not None:
+    status_publisher = MQTTStatusPublisher(mqtt_client, MQTT_STATUS_TOPIC, max_queue=STATUS_QUEUE_SIZE)
+else:
+    if STATUS_TRANSPORT == "mqtt":
+        log.warning("MQTT client unavailable, sending status over HTTP.")
+    status_publisher = StatusPublisher(LAPTOP_HTTP_URL, timeout=STATUS_HTTP_TIMEOUT,
+                                       coalesce_interval=STATUS_COALESCE_INTERVAL,
+                                       max_queue=STATUS_QUEUE_SIZE, spool_path=STATUS_SPOOL_PATH,
+                                       bulk_url=LAPTOP_BULK_URL, bulk_size=STATUS_BULK_SIZE)
+status_publisher.start()
+
+status_reporter = StatusReporter(status_publisher, DEVICE_ID, resend_interval=SEND_INTERVAL)
+
+# --- Pașii lenți ai vederii, rulați în paralel ---
+def open_camera():
+    if args.source:
+        log.info("Replaying frames from %s...", args.source)
+        source = open_source(args.source, size=CAMERA_RESOLUTION, fps=args.source_fps)
+        source.start()
+        return source
+    from picamera2 import Picamera2 # Disponibil doar pe Raspberry Pi
+    log.info("Initializing camera...")
+    picam = Picamera2()
+    config = picam.create_preview_configuration(main={"format": 'XRGB8888', "size": CAMERA_RESOLUTION})
+    picam.configure(config)
+    picam.start()
+    time.sleep(CAMERA_SETTLE_TIME)
+    log.info("Camera started.")
+    return picam
+
+def load_gallery():
+    log.info("Loading encodings...")
+    if not os.path.exists(GALLERY_PATH):
+        if not os.path.exists(LEGACY_ENCODINGS_PATH):
+            raise FileNotFoundError(f"{GALLERY_PATH} not found! Run 'python enroll.py build dataset' first.")
+        log.warning("%s not found, loading %s. Run 'python enroll.py import' to convert it.",
+                    GALLERY_PATH, LEGACY_ENCODINGS_PATH)
+    # Reloader-ul urmărește și GALLERY_PATH: o galerie creată mai târziu înlocuiește pickle-ul fără repornire
+    reloader = GalleryReloader(GALLERY_PATH, AUTHORIZED_NAMES_PATH, authorized_names, tolerance=0.55,
+                               poll_interval=GALLERY_RELOAD_INTERVAL, encoding_model=ENCODING_MODEL,
+                               fallback_path=LEGACY_ENCODINGS_PATH)
+    matcher = reloader.load()
+    log.info("Loaded %d known faces from %s, %d authorized people.",
+             len(matcher), reloader.loaded_path, len(matcher.authorized_names))
+    return reloader, matcher
+
+def load_models():
+    try:
+        detector = build_detector(DETECTOR_BACKEND, upsample=DETECTION_UPSAMPLE, cascade_path=CASCADE_MODEL_PATH,
+                                  dnn_model_path=DNN_MODEL_PATH, dnn_config_path=DNN_CONFIG_PATH,
+                                  dnn_confidence=DNN_CONFIDENCE, proposer=DETECTOR_PROPOSER,
+                                  confirmer=DETECTOR_CONFIRMER)
+    except (FileNotFoundError, ValueError) as e:
+        log.warning("Detector '%s' unavailable (%s), using HOG.", DETECTOR_BACKEND, e)
+        detector = HOGDetector(DETECTION_UPSAMPLE)
+    log.info("Face detector: %s", detector.name)
+    # Importul face_recognition și prima rulare dlib nu mai cad pe primul frame
+    warm_up(detector, ENCODING_MODEL)
+    return detector
+
+vision_futures = start_tasks(startup_timeline, {"camera": open_camera, "gallery": load_gallery,
+                                                "models": load_models})
+
+# Cât timp rulează pașii de mai sus: obiectele ieftine ale buclei
+detection_scaler = AdaptiveScaler(TARGET_FRAME_TIME, DETECTION_SCALE_LEVELS,
+                                  initial_level=DETECTION_SCALE_LEVELS.index(cv_scaler),
+                                  upsample=DETECTION_UPSAMPLE, num_jitters=ENCODING_JITTERS,
+                                  encoding_model=ENCODING_MODEL, enabled=ADAPTIVE_SCALING)
+motion_gate = MotionGate(MOTION_THRESHOLD, MOTION_MIN_CHANGED_FRACTION,
+                         force_interval=MOTION_FORCE_INTERVAL) if MOTION_GATE_ENABLED else None
+face_tracker = FaceTracker(TRACK_IOU_THRESHOLD, TRACK_MIN_CONFIDENT_IOU, TRACK_REFRESH_INTERVAL,
+                           TRACK_MAX_MISSED) if TRACKING_ENABLED else None
+encoding_cache = EncodingCache(ENCODING_CACHE_SIZE, ENCODING_CACHE_TTL, ENCODING_CACHE_MAX_DISTANCE,
+                               ENCODING_CACHE_MIN_IOU) if ENCODING_CACHE_ENABLED else None
 
-    if cv_scaler > 1:
-        resized_frame = cv2.resize(frame, (0, 0), fx=(1/cv_scaler), fy=(1/cv_scaler))
-    else:
-        resized_frame = frame
-    rgb_resized_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
+def send_status_to_laptop(person_name, status_msg):
+    # Doar schimbările de status (și o retrimitere la SEND_INTERVAL) ajung la publisher
+    status_reporter.report(person_name, status_msg)
+    if AUTO_OPEN_ON_RECOGNITION and status_msg == "authorized":
+        door_actuator.open("recognition") # Doar pune comanda în coadă; repornește termenul de închidere
 
-    face_locations = face_recognition.face_locations(rgb_resized_frame, model='hog')
-    http_status_message = "no_face"
-    http_detected_person = "N/A"
-    face_names_display = []
 
-    if not face_locations:
-        http_status_message = "no_face"
-        http_detected_person = "N/A"
-    else:
-        face_encodings = face_recognition.face_encodings(rgb_resized_frame, face_locations, model='small', num_jitters=1)
-        temp_best_status_for_http = "unknown"
-        temp_person_for_http = "Unknown"
-        is_authorized_person_in_frame = False # Doar pentru a ști dacă să trimitem "authorized"
-
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(known_face_encodings, face_encoding, tolerance=0.55)
-            name = "Unknown"
-            face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-
-            if True in matches:
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index] and face_distances[best_match_index] <= 0.55:
-                    name = known_face_names[best_match_index]
-                    if name in authorized_names:
-                        is_authorized_person_in_frame = True
-                        temp_best_status_for_http = "authorized"
-                        temp_person_for_http = name
-                        # Nu mai facem break, procesăm toate fețele pentru afișare
-                    elif temp_best_status_for_http != "authorized":
-                        temp_best_status_for_http = "unauthorized"
-                        if temp_person_for_http == "Unknown": temp_person_for_http = name
-            face_names_display.append(name)
-
-        if is_authorized_person_in_frame:
-            http_status_message = "authorized"
-            http_detected_person = temp_person_for_http # Numele persoanei autorizate
-        else:
-            http_status_message = temp_best_status_for_http
-            http_detected_person = temp_person_for_http
-            if not face_names_display and face_locations:
-                 http_detected_person = "Unknown"
+# --- Funcție pentru procesarea frame-ului (doar recunoaștere și trimitere status) ---
+def process_frame_for_recognition(frame):
+    global face_locations, face_names_display
 
-    send_status_to_laptop(http_detected_person, http_status_message)
+    # Filtrul de mișcare, detecția la scara adaptivă, encodarea și potrivirea sunt în Recognizer
+    result = recognizer.process(frame)
+    face_locations, face_names_display = result.locations, result.names
+    send_status_to_laptop(result.person, result.status)
+    startup_timeline.mark("first_recognition")
     # NU mai controlăm hardware-ul direct de aici pe baza recunoașterii
     return frame
 
 # --- Funcția draw_results (rămâne la fel) ---
-def draw_results(frame):
+def draw_results(frame, locations, names):
     # ... (codul tău existent pentru draw_results) ...
-    for (top, right, bottom, left), name in zip(face_locations, face_names_display):
-        top *= cv_scaler; right *= cv_scaler; bottom *= cv_scaler; left *= cv_scaler
+    # Casetele sunt deja la rezoluția completă a frame-ului, indiferent de scara de detecție
+    for (top, right, bottom, left), name in zip(locations, names):
         box_color = (0, 0, 255); auth_text = ""
-        if name in authorized_names:
+        if recognizer.matcher.is_authorized(name):
             box_color = (0, 255, 0); auth_text = "Auth"
         elif name != "Unknown":
              box_color = (0, 165, 255); auth_text = "Not Auth"
@@ -259,6 +363,14 @@ def draw_results(frame):
              cv2.putText(frame, auth_text, (left + 5, bottom - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
     return frame
 
+debug_stream = None
+if HEADLESS and DEBUG_STREAM_PORT is not None:
+    try:
+        debug_stream = DebugStreamServer(DEBUG_STREAM_PORT, max_fps=DEBUG_STREAM_MAX_FPS,
+                                         jpeg_quality=DEBUG_STREAM_JPEG_QUALITY, annotate=draw_results).start()
+    except OSError as e:
+        log.error("Could not start debug stream on port %s: %s", DEBUG_STREAM_PORT, e)
+
 # --- Funcția calculate_fps (rămâne la fel) ---
 frame_count_fps = 0
 start_time_fps = time.time()
@@ -271,42 +383,246 @@ def calculate_fps():
         fps_display = frame_count_fps / elapsed_time; frame_count_fps = 0; start_time_fps = time.time()
     return fps_display
 
-# --- Funcție pentru a verifica și închide automat ușa ---
-def check_auto_close_door():
-    global is_door_currently_open, door_open_start_time
-    if is_door_currently_open and (time.time() - door_open_start_time > AUTO_CLOSE_DELAY):
-        print("[AUTO_CLOSE] Auto-closing door due to timeout.")
-        close_door_sequence()
+capture_seconds = metrics_registry.histogram("frame_capture_seconds")
+
+def capture_frame():
+    """``camera.capture_array`` cu timpul de captură înregistrat."""
+    started = time.perf_counter()
+    frame = camera.capture_array()
+    capture_seconds.observe(time.perf_counter() - started)
+    return frame
+
+metrics_registry.gauge("fps", lambda: fps_display)
+metrics_registry.gauge("detection_scale", lambda: detection_scaler.scale)
+metrics_registry.gauge("status_backlog", lambda: status_publisher.backlog)
+metrics_registry.gauge("door_open", lambda: int(door_actuator.is_open))
+
+def publish_metrics(snapshot):
+    # Fără broker (sau offline) snapshot-ul ajunge doar în log
+    if mqtt_client is not None and mqtt_client.is_connected():
+        mqtt_client.publish(MQTT_METRICS_TOPIC, json.dumps(snapshot), qos=0, retain=True)
+    else:
+        log.info("Metrics: %s", format_summary(snapshot))
+
+metrics_reporter = MetricsReporter(publish_metrics, METRICS_INTERVAL, labels={"device_id": DEVICE_ID})
+if METRICS_ENABLED:
+    metrics_reporter.start()
+
+# --- Afișarea (doar cu monitor) ---
+def show_frame(frame, locations, names):
+    """Adnotează și afișează frame-ul; în modul headless doar îl oferă stream-ului de depanare."""
+    current_fps_val = calculate_fps()
+    if HEADLESS:
+        if debug_stream is not None:
+            debug_stream.offer(frame, locations, names)
+        return
+    display_frame = draw_results(frame, locations, names)
+    cv2.putText(display_frame, f"FPS: {current_fps_val:.1f}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    cv2.imshow('Face Recognition (Status Only)', display_frame)
+
+def quit_key_pressed():
+    if HEADLESS:
+        return False
+    if cv2.waitKey(1) & 0xFF == ord('q'):
+        log.info("'q' pressed, exiting loop.")
+        return True
+    return False
+
+# --- Oprire prin semnal (SIGTERM de la systemd, SIGINT/Ctrl+C) ---
+shutdown_event = threading.Event()
+
+def request_shutdown(signum, frame):
+    log.info("Received %s, shutting down...", signal.Signals(signum).name)
+    shutdown_event.set()
+
+def wait_for_vision():
+    """Așteaptă pașii de pornire; returnează ``{pas: rezultat}`` sau None (eșec ori oprire cerută)."""
+    return wait_for_tasks(vision_futures, shutdown_event)
+
+def run_command_only():
+    """Fără vedere: ușa rămâne încuiată, comenzile MQTT funcționază până la oprire."""
+    log.error("Vision unavailable, running in command-only mode (door locked, MQTT commands still work).")
+    while not shutdown_event.wait(1.0):
+        pass
+
+# --- Modul pipeline: etape pe thread-uri/procese separate ---
+def run_pipeline():
+    """Rulează captura, detecția, encodarea, publicarea și afișarea în paralel."""
+    # "fork" ca worker-ii să nu reimporte acest script (care inițializează hardware-ul)
+    executor = ProcessPoolExecutor(max_workers=PIPELINE_WORKERS, mp_context=multiprocessing.get_context("fork"))
+    pipeline = Pipeline()
+    detect_q = pipeline.queue("detect", maxsize=2)
+    encode_q = pipeline.queue("encode", maxsize=2)
+    publish_q = pipeline.queue("publish", maxsize=1)
+    display_q = pipeline.queue("display", maxsize=1)
+
+    def gate(item):
+        if recognizer.needs_recognition(item.frame):
+            return item
+        # Scenă statică și goală: păstrăm starea "no_face" fără detecție
+        recognizer.record(item.timings, 0, processed=False)
+        publish_q.put(item)
+        display_q.put(item)
+        return None
+
+    def submit_detect(pool, item):
+        scale = detection_scaler.scale
+        item.rgb = to_rgb(item.frame)
+        return pool.submit(detect_faces, downscale(item.rgb, scale), scale, face_detector, item.rgb.shape)
+
+    def complete_detect(item, locations):
+        item.locations = locations
+        return item
+
+    def submit_encode(pool, item):
+        # Aceeași galerie pentru tot frame-ul, chiar dacă între timp este înlocuită
+        item.matcher = recognizer.snapshot()
+        if face_tracker is None:
+            boxes = item.locations
+        else:
+            # Cu tracking, doar fețele noi/expirate ajung la dlib
+            item.tracks = face_tracker.update(item.locations)
+            boxes = [track.box for track in item.tracks if track.needs_encoding]
+        crops = crop_faces(item.rgb, boxes)
+        if encoding_cache is not None:
+            # Fețele găsite în cache nu mai ajung la dlib
+            item.cache_keys, item.cache_entries = encoding_cache.lookup(crops, boxes)
+            crops = [crop for crop, entry in zip(crops, item.cache_entries) if entry is None]
+        item.encode_submitted = time.perf_counter()
+        if not crops:
+            done = Future()
+            done.set_result([])
+            return done
+        return pool.submit(encode_crops, crops, detection_scaler.num_jitters, detection_scaler.encoding_model)
+
+    def complete_encode(item, encodings):
+        item.rgb = None
+        matches = item.matcher.match(encodings)
+        if encoding_cache is not None:
+            matches = encoding_cache.fill(item.cache_keys, item.cache_entries, encodings, matches,
+                                          time.perf_counter() - item.encode_submitted)
+        if face_tracker is not None:
+            tracks = item.tracks
+            face_tracker.assign([track for track in tracks if track.needs_encoding], matches)
+            matches = [track.match for track in tracks]
+        item.encodings = encodings
+        item.names, item.person, item.status = summarize_matches(item.locations, matches)
+        recognizer.last_status = item.status
+        recognizer.record(item.timings, len(item.locations))
+        if detection_scaler.observe(item.age, item.timings.get("detect")):
+            log.info("Detection %s", detection_scaler.describe())
+        return item
+
+    def publish(item):
+        send_status_to_laptop(item.person, item.status)
+        startup_timeline.mark("first_recognition")
+        return None
+
+    gate_q = pipeline.queue("gate", maxsize=1)
+    capture_stage = pipeline.add(CaptureStage(capture_frame, [gate_q]))
+    pipeline.add(Stage("gate", gate, gate_q, [detect_q]))
+    pipeline.add(PoolStage("detect", submit_detect, complete_detect, executor, detect_q, [encode_q],
+                           max_age=PIPELINE_MAX_FRAME_AGE, max_in_flight=PIPELINE_WORKERS))
+    # Tracker-ul are nevoie de rezultatul frame-ului anterior, deci encodarea rămâne în ordine
+    encode_in_flight = 1 if face_tracker is not None else PIPELINE_WORKERS
+    pipeline.add(PoolStage("encode", submit_encode, complete_encode, executor, encode_q, [publish_q, display_q],
+                           max_age=PIPELINE_MAX_FRAME_AGE, max_in_flight=encode_in_flight))
+    pipeline.add(Stage("publish", publish, publish_q))
+    pipeline.start()
+    log.info("Pipeline started with %d worker processes.", PIPELINE_WORKERS)
+
+    # Afișarea rămâne pe thread-ul principal (cerință OpenCV/HighGUI); în modul headless doar stream-ul de depanare
+    last_report = time.time()
+    last_item_at = time.time()
+    try:
+        while not shutdown_event.is_set():
+            try:
+                item = display_q.get(timeout=0.05)
+                last_item_at = time.time()
+            except queue.Empty:
+                item = None
+                # Sursă înregistrată terminată și niciun frame în zbor
+                if not capture_stage.is_alive() and time.time() - last_item_at > PIPELINE_MAX_FRAME_AGE:
+                    log.info("End of recorded source, exiting loop.")
+                    break
+            if item is not None:
+                show_frame(item.frame, item.locations, item.names)
+
+            if time.time() - last_report > PIPELINE_REPORT_INTERVAL:
+                log.info("Pipeline: %s", pipeline.format_report())
+                last_report = time.time()
+
+            if quit_key_pressed():
+                break
+    finally:
+        pipeline.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+        log.info("Pipeline stopped.")
 
 # --- Bucla Principală ---
-print("[INFO] Starting main loop... Press 'q' to quit.")
+signal.signal(signal.SIGINT, request_shutdown)
+signal.signal(signal.SIGTERM, request_shutdown)
 try:
-    while True:
-        frame = picam2.capture_array()
-        processed_frame = process_frame_for_recognition(frame) # Doar recunoaștere și HTTP
-        display_frame = draw_results(processed_frame)
-        current_fps_val = calculate_fps()
-        cv2.putText(display_frame, f"FPS: {current_fps_val:.1f}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        cv2.imshow('Face Recognition (Status Only)', display_frame)
-
-        # Verifică dacă ușa trebuie închisă automat
-        check_auto_close_door()
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("[INFO] 'q' pressed, exiting loop.")
-            break
-        # Adăugăm un mic sleep pentru a nu suprasolicita CPU dacă nu e nevoie de FPS maxim
-        # time.sleep(0.01) # Decomentează dacă vrei să reduci utilizarea CPU
+    vision = wait_for_vision()
+    if vision is None:
+        # Camera pornită trebuie oprită la final chiar dacă alt pas a eșuat
+        try:
+            camera = vision_futures["camera"].result(timeout=CAMERA_SETTLE_TIME + 5.0)
+        except Exception:
+            camera = None
+        if not shutdown_event.is_set():
+            if not COMMAND_ONLY_ON_VISION_FAILURE:
+                raise SystemExit(1)
+            run_command_only()
+    else:
+        camera = vision["camera"]
+        gallery_reloader, face_matcher = vision["gallery"]
+        face_detector = vision["models"]
+        recognizer = Recognizer(face_matcher, detection_scaler, face_tracker, motion_gate, face_detector,
+                                encoding_cache)
+        # Galeria și lista de autorizați se schimbă fără oprirea buclei (fișiere modificate sau "reload" pe MQTT)
+        gallery_reloader.on_swap = recognizer.swap_matcher
+        gallery_reloader.start()
+        startup_timeline.mark("vision_ready")
+        log.info("Startup timeline: %s", startup_timeline.summary())
+
+        if HEADLESS:
+            log.info("Starting main loop (headless)... Send SIGTERM or press Ctrl+C to quit.")
+        else:
+            log.info("Starting main loop... Press 'q' to quit.")
+        if PIPELINE_MODE:
+            run_pipeline()
+        else:
+            last_report = time.time()
+            while not shutdown_event.is_set():
+                try:
+                    frame = capture_frame()
+                except EndOfSource:
+                    log.info("End of recorded source, exiting loop.")
+                    break
+                processed_frame = process_frame_for_recognition(frame) # Doar recunoaștere și trimitere status
+                show_frame(processed_frame, face_locations, face_names_display)
+
+                if HEADLESS and time.time() - last_report > HEADLESS_REPORT_INTERVAL:
+                    log.info("FPS: %.1f", fps_display)
+                    last_report = time.time()
+
+                if quit_key_pressed():
+                    break
+                # Adăugăm un mic sleep pentru a nu suprasolicita CPU dacă nu e nevoie de FPS maxim
+                # time.sleep(0.01) # Decomentează dacă vrei să reduci utilizarea CPU
 
 finally:
-    print("[INFO] Cleaning up...")
-    cv2.destroyAllWindows()
-    if 'picam2' in locals() and picam2: picam2.stop(); print("[INFO] Camera stopped.")
-    if mqtt_client: mqtt_client.loop_stop(); mqtt_client.disconnect(); print("[MQTT] Disconnected.")
-    if 'green_led' in locals(): green_led.off()
-    if 'red_led' in locals(): red_led.on()
-    if 'servo' in locals() and servo: servo.value = SERVO_LOCKED_VALUE; print("[INFO] Servo locked.")
+    log.info("Cleaning up...")
+    if not HEADLESS: cv2.destroyAllWindows()
+    if debug_stream: debug_stream.stop(); log.info("Debug stream stopped.")
+    if camera: camera.stop(); log.info("Camera stopped.")
+    if gallery_reloader: gallery_reloader.stop()
+    metrics_reporter.stop() # Ultimul snapshot pleacă înainte de oprirea publisher-ului și a clientului MQTT
+    status_publisher.stop(); log.info("Status publisher stopped.")
+    if mqtt_client: mqtt_client.loop_stop(); mqtt_client.disconnect(); mqtt_log.info("Disconnected.")
+    door_actuator.stop(); log.info("Servo locked.")
     if factory: factory.close()
-    print("[INFO] GPIO resources released.")
-    print("[INFO] Script finished.")
\ No newline at end of file
+    log.info("GPIO resources released.")
+    log.info("Script finished.")
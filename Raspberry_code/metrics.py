@@ -0,0 +1,201 @@
+"""Metrici ale agentului de pe Pi: contoare, gauge-uri și histograme cu bucket-uri fixe.
+
+Modulele își iau metricile din ``registry`` (``registry.histogram("...")``
+returnează mereu aceeași instanță). Cu ``registry.enabled = False`` fiecare
+``inc``/``set``/``observe`` se oprește la verificarea unui bool.
+
+``MetricsReporter`` trimite periodic un snapshot agregat (JSON): contoarele și
+histogramele conțin doar ce s-a întâmplat de la snapshot-ul anterior, iar
+gauge-urile valoarea curentă. ``main.py`` îl publică pe MQTT
+(``usa/inteligenta/metrics/<DEVICE_ID>``).
+"""
+import bisect
+import datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    def __init__(self, registry):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            value = self.value
+            if reset:
+                self.value = 0
+        return value
+
+
+class Gauge:
+    """Valoare setată explicit sau, cu ``callback``, citită la snapshot."""
+
+    def __init__(self, registry, callback=None):
+        self._registry = registry
+        self.callback = callback
+        self.value = None
+
+    def set(self, value):
+        if self._registry.enabled:
+            self.value = value
+
+    def snapshot(self, reset=False):
+        if self.callback is not None:
+            try:
+                return self.callback()
+            except Exception:
+                return None
+        return self.value
+
+
+class Histogram:
+    def __init__(self, registry, buckets=LATENCY_BUCKETS):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+
+    def observe(self, value):
+        if not self._registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def quantile(self, q, counts=None):
+        """Estimare după bucket-uri: limita superioară a bucket-ului care conține cuantila."""
+        counts = self._counts if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets + (None,), counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return None
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            counts, total, count, maximum = list(self._counts), self._sum, self._count, self._max
+            if reset:
+                self._counts = [0] * (len(self.buckets) + 1)
+                self._sum, self._count, self._max = 0.0, 0, 0.0
+        return {
+            "count": count,
+            "sum": total,
+            "max": maximum,
+            "p50": self.quantile(0.5, counts),
+            "p95": self.quantile(0.95, counts),
+            "buckets": list(self.buckets),
+            "counts": counts,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, name, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = factory()
+        return metric
+
+    def counter(self, name):
+        return self._get(name, lambda: Counter(self))
+
+    def gauge(self, name, callback=None):
+        gauge = self._get(name, lambda: Gauge(self, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS):
+        return self._get(name, lambda: Histogram(self, buckets))
+
+    def snapshot(self, reset=False):
+        result = {"counters": {}, "gauges": {}, "histograms": {}}
+        for name, metric in sorted(self._metrics.items()):
+            section = ("counters" if isinstance(metric, Counter)
+                       else "gauges" if isinstance(metric, Gauge) else "histograms")
+            result[section][name] = metric.snapshot(reset)
+        return result
+
+
+registry = MetricsRegistry()
+
+
+class MetricsReporter(threading.Thread):
+    """Apelează ``publish(snapshot)`` la fiecare ``interval`` secunde (și la oprire)."""
+
+    def __init__(self, publish, interval=60.0, registry=registry, labels=None):
+        super().__init__(name="metrics-reporter", daemon=True)
+        self.publish = publish
+        self.interval = interval
+        self.registry = registry
+        self.labels = dict(labels or {})
+        self._stop_event = threading.Event()
+        self._last = time.monotonic()
+
+    def report(self):
+        now = time.monotonic()
+        snapshot = dict(self.labels, timestamp=datetime.datetime.now().isoformat(),
+                        interval=now - self._last, **self.registry.snapshot(reset=True))
+        self._last = now
+        try:
+            self.publish(snapshot)
+        except Exception as e:
+            logger.warning("Could not publish metrics: %s", e)
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+            self.report()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.registry.enabled:
+                self.report()
+
+
+def format_summary(snapshot):
+    """Un rând scurt (p50/p95 în ms per histogramă) pentru log."""
+    parts = []
+    for name, hist in snapshot["histograms"].items():
+        if hist["count"]:
+            p50 = f"{hist['p50'] * 1000:.0f}" if hist["p50"] is not None else ">max"
+            p95 = f"{hist['p95'] * 1000:.0f}" if hist["p95"] is not None else ">max"
+            parts.append(f"{name} p50<={p50}ms p95<={p95}ms n={hist['count']}")
+    parts.extend(f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}"
+                 for name, value in snapshot["counters"].items() if value)
+    parts.extend(f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}"
+                 for name, value in snapshot["gauges"].items() if value is not None)
+    return "; ".join(parts)
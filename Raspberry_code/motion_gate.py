@@ -0,0 +1,62 @@
+"""Filtru ieftin de mișcare, rulat înaintea detecției HOG.
+
+Frame-ul este micșorat, convertit în tonuri de gri și comparat cu un fundal
+mediat în timp. Dacă nu s-a schimbat nimic semnificativ și ultimul rezultat a
+fost "no_face", detecția completă poate fi sărită. O dată la
+``force_interval`` secunde se face oricum o trecere completă, ca o persoană
+care a intrat foarte încet să nu rămână nedetectată.
+"""
+import time
+
+import cv2
+
+
+class MotionGate:
+    def __init__(self, threshold=25, min_changed_fraction=0.01, width=160,
+                 force_interval=2.0, background_alpha=0.05):
+        self.threshold = threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.width = width
+        self.force_interval = force_interval
+        self.background_alpha = background_alpha
+        self._background = None
+        self._last_full_pass = 0.0
+        self.changed_fraction = 0.0
+        self.processed = 0
+        self.skipped = 0
+
+    def _preprocess(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            small = cv2.cvtColor(small, code)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def has_motion(self, frame):
+        """Actualizează fundalul și spune dacă scena s-a schimbat."""
+        gray = self._preprocess(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype("float32")
+            self.changed_fraction = 1.0
+            return True
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = cv2.countNonZero(cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)[1])
+        self.changed_fraction = changed / diff.size
+        cv2.accumulateWeighted(gray, self._background, self.background_alpha)
+        return self.changed_fraction >= self.min_changed_fraction
+
+    def should_process(self, frame, idle=True):
+        """True dacă frame-ul trebuie trecut prin detecția completă.
+
+        ``idle`` indică faptul că ultimul rezultat a fost "no_face"; cât timp
+        există fețe în cadru, fiecare frame este procesat.
+        """
+        moved = self.has_motion(frame)
+        now = time.monotonic()
+        if not idle or moved or now - self._last_full_pass >= self.force_interval:
+            self._last_full_pass = now
+            self.processed += 1
+            return True
+        self.skipped += 1
+        return False
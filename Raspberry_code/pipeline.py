@@ -0,0 +1,273 @@
+"""Pipeline pe mai multe etape pentru bucla principală de pe Pi.
+
+Fiecare etapă (captură, detecție, encodare/potrivire, publicare status,
+afișare) rulează pe propriul thread și comunică prin cozi mărginite. Când o
+coadă este plină, cel mai vechi frame este aruncat, deci latența rămâne
+mărginită chiar dacă o etapă (ex. POST-ul HTTP) devine lentă. Etapele grele
+(HOG, encodare dlib) pot trimite munca într-un ``ProcessPoolExecutor``, ca să
+folosească toate nucleele Pi-ului, nu doar unul.
+"""
+import collections
+import concurrent.futures
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FrameItem:
+    """Un frame împreună cu rezultatele acumulate pe parcursul pipeline-ului."""
+
+    __slots__ = ("seq", "captured_at", "frame", "rgb", "locations", "encodings",
+                 "tracks", "cache_keys", "cache_entries", "encode_submitted", "matcher", "names", "person",
+                 "status", "timings")
+
+    def __init__(self, seq, frame):
+        self.seq = seq
+        self.captured_at = time.monotonic()
+        self.frame = frame
+        self.rgb = None
+        self.locations = []
+        self.encodings = []
+        self.tracks = None
+        self.cache_keys = None
+        self.cache_entries = None
+        self.encode_submitted = None
+        self.matcher = None
+        self.names = []
+        self.person = "N/A"
+        self.status = "no_face"
+        self.timings = {}
+
+    @property
+    def age(self):
+        return time.monotonic() - self.captured_at
+
+
+class DropOldestQueue:
+    """Coadă mărginită care, când e plină, aruncă elementul cel mai vechi."""
+
+    def __init__(self, maxsize=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+
+class StageStats:
+    """Timpi per etapă (scrise doar de thread-ul etapei)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.stale = 0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self, reset=False):
+        avg = self.total / self.count if self.count else 0.0
+        snap = {"count": self.count, "avg_ms": avg * 1000.0, "max_ms": self.max * 1000.0,
+                "last_ms": self.last * 1000.0, "stale": self.stale}
+        if reset:
+            self.count, self.total, self.max, self.stale = 0, 0.0, 0.0, 0
+        return snap
+
+
+class Stage(threading.Thread):
+    """Etapă care aplică ``work(item)`` pe thread-ul propriu.
+
+    ``work`` returnează item-ul (eventual modificat) sau ``None`` ca să-l
+    oprească. Item-urile mai vechi decât ``max_age`` secunde sunt aruncate
+    înainte de procesare.
+    """
+
+    def __init__(self, name, work, inbox, outboxes=(), stop_event=None, max_age=None):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.work = work
+        self.inbox = inbox
+        self.outboxes = list(outboxes)
+        self.stop_event = stop_event or threading.Event()
+        self.max_age = max_age
+        self.stats = StageStats()
+
+    def _next_item(self, timeout=0.1):
+        try:
+            item = self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if self.max_age is not None and item.age > self.max_age:
+            self.stats.stale += 1
+            return None
+        return item
+
+    def _emit(self, item):
+        for outbox in self.outboxes:
+            outbox.put(item)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self._next_item()
+            if item is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                item = self.work(item)
+            except Exception as e:
+                logger.error("Stage '%s' failed: %s", self.stage_name, e)
+                continue
+            elapsed = time.perf_counter() - t0
+            self.stats.add(elapsed)
+            if item is not None:
+                item.timings[self.stage_name] = elapsed
+                self._emit(item)
+
+
+class PoolStage(Stage):
+    """Etapă care trimite munca într-un executor (de obicei un pool de procese).
+
+    ``submit(executor, item)`` returnează un ``Future``; ``complete(item, result)``
+    rulează pe thread-ul etapei și returnează item-ul de trimis mai departe.
+    Până la ``max_in_flight`` frame-uri sunt procesate în paralel, iar
+    rezultatele sunt emise în ordinea capturii.
+    """
+
+    def __init__(self, name, submit, complete, executor, inbox, outboxes=(), stop_event=None,
+                 max_age=None, max_in_flight=2):
+        super().__init__(name, None, inbox, outboxes, stop_event, max_age)
+        self.submit = submit
+        self.complete = complete
+        self.executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+
+    def run(self):
+        in_flight = collections.deque()
+        while not self.stop_event.is_set():
+            if len(in_flight) < self.max_in_flight:
+                item = self._next_item(timeout=0.01 if in_flight else 0.1)
+                if item is not None:
+                    in_flight.append((item, time.perf_counter(), self.submit(self.executor, item)))
+                    continue
+            if not in_flight:
+                continue
+            item, t0, future = in_flight[0]
+            try:
+                result = future.result(timeout=0.05)
+            except concurrent.futures.TimeoutError:
+                continue
+            except Exception as e:
+                in_flight.popleft()
+                logger.error("Stage '%s' failed: %s", self.stage_name, e)
+                continue
+            in_flight.popleft()
+            try:
+                item = self.complete(item, result)
+            except Exception as e:
+                logger.error("Stage '%s' failed: %s", self.stage_name, e)
+                continue
+            elapsed = time.perf_counter() - t0
+            self.stats.add(elapsed)
+            if item is not None:
+                item.timings[self.stage_name] = elapsed
+                self._emit(item)
+
+
+class CaptureStage(Stage):
+    """Sursa pipeline-ului: produce frame-uri cât de repede poate camera."""
+
+    def __init__(self, capture, outboxes, stop_event=None):
+        super().__init__("capture", None, None, outboxes, stop_event)
+        self.capture = capture
+        self._seq = itertools.count()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            t0 = time.perf_counter()
+            try:
+                frame = self.capture()
+            except EOFError:
+                # Sursă înregistrată terminată: etapa se oprește, restul golesc cozile
+                logger.info("Capture source exhausted.")
+                return
+            except Exception as e:
+                logger.error("Capture failed: %s", e)
+                time.sleep(0.1)
+                continue
+            item = FrameItem(next(self._seq), frame)
+            elapsed = time.perf_counter() - t0
+            self.stats.add(elapsed)
+            item.timings[self.stage_name] = elapsed
+            self._emit(item)
+
+
+class Pipeline:
+    """Grupează etapele, le pornește/oprește și raportează timpii."""
+
+    def __init__(self, stop_event=None):
+        self.stop_event = stop_event or threading.Event()
+        self.stages = []
+        self.queues = {}
+
+    def queue(self, name, maxsize=1):
+        q = DropOldestQueue(maxsize)
+        self.queues[name] = q
+        return q
+
+    def add(self, stage):
+        stage.stop_event = self.stop_event
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout=timeout)
+
+    def report(self, reset=True):
+        stats = {stage.stage_name: stage.stats.snapshot(reset) for stage in self.stages}
+        for name, q in self.queues.items():
+            stats.setdefault(f"queue:{name}", {})["dropped"] = q.dropped
+        return stats
+
+    def format_report(self, reset=True):
+        parts = []
+        for name, snap in self.report(reset).items():
+            if name.startswith("queue:"):
+                if snap["dropped"]:
+                    parts.append(f"{name} dropped={snap['dropped']}")
+                continue
+            parts.append(f"{name} {snap['avg_ms']:.1f}/{snap['max_ms']:.1f}ms x{snap['count']}"
+                         + (f" stale={snap['stale']}" if snap["stale"] else ""))
+        return " | ".join(parts)
@@ -0,0 +1,168 @@
+"""Etapele recunoașterii faciale, fără dependențe de hardware.
+
+Funcțiile de aici sunt apelate atât din bucla serială din ``main.py`` cât și
+din worker-ii pipeline-ului (``pipeline.py``), inclusiv din procese separate,
+deci trebuie să rămână funcții pure la nivel de modul.
+
+Coordonatele casetelor returnate sunt mereu în rezoluția completă a
+frame-ului, indiferent de scara la care a rulat detecția.
+
+``face_recognition`` este importat la prima folosire: importul încarcă
+modelele dlib (secunde pe Pi), iar ``main.py`` îl face prin ``warm_up`` în
+paralel cu restul pornirii.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from face_matcher import UNKNOWN_NAME
+
+CROP_MARGIN = 0.3 # Marginea adăugată în jurul feței la encodare (fracțiune din latura casetei)
+
+
+def _face_recognition():
+    import face_recognition
+
+    return face_recognition
+
+
+def to_rgb(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def downscale(rgb_frame, scale=1):
+    """Micșorează frame-ul de ``scale`` ori pentru detecție."""
+    if scale > 1:
+        return cv2.resize(rgb_frame, (0, 0), fx=(1 / scale), fy=(1 / scale), interpolation=cv2.INTER_AREA)
+    return rgb_frame
+
+
+def scale_locations(locations, scale, frame_shape=None):
+    """Aduce casetele de la scara de detecție la rezoluția completă."""
+    if scale == 1:
+        return list(locations)
+    scaled = []
+    for top, right, bottom, left in locations:
+        box = (int(round(top * scale)), int(round(right * scale)),
+               int(round(bottom * scale)), int(round(left * scale)))
+        if frame_shape is not None:
+            h, w = frame_shape[:2]
+            box = (max(box[0], 0), min(box[1], w), min(box[2], h), max(box[3], 0))
+        scaled.append(box)
+    return scaled
+
+
+def detect_faces(rgb_small, scale=1, detector=None, full_shape=None):
+    """Detecție pe frame-ul micșorat (HOG implicit, vezi ``detectors.py``); casetele sunt la rezoluția completă."""
+    if detector is None:
+        locations = _face_recognition().face_locations(rgb_small, number_of_times_to_upsample=1, model='hog')
+    else:
+        locations = detector.detect(rgb_small)
+    return scale_locations(locations, scale, full_shape)
+
+
+def crop_faces(rgb_frame, locations, margin=CROP_MARGIN):
+    """Decupează fiecare față (cu margine) din frame-ul la rezoluție completă.
+
+    Returnează perechi (crop, caseta relativă la crop), ca la encodare să nu
+    fie nevoie de tot frame-ul (mai ales când e trimis către alt proces).
+    """
+    h, w = rgb_frame.shape[:2]
+    crops = []
+    for top, right, bottom, left in locations:
+        pad_y = int((bottom - top) * margin)
+        pad_x = int((right - left) * margin)
+        y0, y1 = max(top - pad_y, 0), min(bottom + pad_y, h)
+        x0, x1 = max(left - pad_x, 0), min(right + pad_x, w)
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        crops.append((crop, (top - y0, right - x0, bottom - y0, left - x0)))
+    return crops
+
+
+def encode_crops(crops, num_jitters=1, model='small'):
+    face_recognition = _face_recognition()
+    encodings = []
+    for crop, location in crops:
+        encodings.extend(face_recognition.face_encodings(crop, [location], num_jitters=num_jitters, model=model))
+    return encodings
+
+
+def warm_up(detector=None, model='small'):
+    """Încarcă modelele dlib și rulează o dată detecția și encodarea, pe un frame gol."""
+    blank = np.zeros((120, 160, 3), dtype=np.uint8)
+    detect_faces(blank, detector=detector)
+    encode_crops([(blank, (10, 110, 110, 10))], model=model)
+
+
+def encode_faces(rgb_frame, locations, num_jitters=1, model='small'):
+    if not locations:
+        return []
+    return encode_crops(crop_faces(rgb_frame, locations), num_jitters, model)
+
+
+def identify_faces(rgb_frame, locations, matcher, tracker=None, num_jitters=1, model='small', timings=None,
+                   cache=None):
+    """Returnează câte un MatchResult per locație.
+
+    Cu un ``FaceTracker``, doar fețele noi sau cu identitatea expirată sunt
+    re-encodate; restul își păstrează rezultatul din frame-urile anterioare.
+    Cu un ``EncodingCache``, fețele (aproape) identice cu una encodată recent
+    își reiau encodarea și potrivirea din cache.
+    Dacă e dat, ``timings`` primește durata (secunde) etapelor "encode" și "match".
+    """
+    encode_start = time.perf_counter()
+    if tracker is None:
+        targets = None
+        boxes = locations
+    else:
+        tracks = tracker.update(locations)
+        targets = [track for track in tracks if track.needs_encoding]
+        boxes = [track.box for track in targets]
+    if cache is None:
+        encodings = encode_faces(rgb_frame, boxes, num_jitters, model)
+        match_start = time.perf_counter()
+        matches = matcher.match(encodings)
+    else:
+        crops = crop_faces(rgb_frame, boxes)
+        keys, entries = cache.lookup(crops, boxes)
+        misses = [crop for crop, entry in zip(crops, entries) if entry is None]
+        dlib_start = time.perf_counter()
+        encodings = encode_crops(misses, num_jitters, model) if misses else []
+        match_start = time.perf_counter()
+        matches = cache.fill(keys, entries, encodings, matcher.match(encodings), match_start - dlib_start)
+    if targets:
+        tracker.assign(targets, matches)
+    if timings is not None:
+        timings["encode"] = match_start - encode_start
+        timings["match"] = time.perf_counter() - match_start
+    if tracker is None:
+        return matches
+    return [track.match for track in tracks]
+
+
+def summarize_matches(locations, matches):
+    """Reduce rezultatele per față la (nume afișate, persoană, status HTTP).
+
+    Un singur chip autorizat face ca tot frame-ul să fie "authorized"; altfel
+    o persoană cunoscută dar neautorizată dă "unauthorized", iar restul
+    "unknown". Fără fețe, statusul este "no_face".
+    """
+    if not locations:
+        return [], "N/A", "no_face"
+
+    names_display = []
+    best_status = "unknown"
+    person = "Unknown"
+    for match in matches:
+        name = match.name
+        if match.authorized:
+            best_status = "authorized"
+            person = name
+            # Nu facem break, procesăm toate fețele pentru afișare
+        elif name != UNKNOWN_NAME and best_status != "authorized":
+            best_status = "unauthorized"
+            if person == "Unknown":
+                person = name
+        names_display.append(name)
+    return names_display, person, best_status
@@ -0,0 +1,108 @@
+"""Calea de recunoaștere a unui frame, independentă de cameră și de hardware.
+
+``Recognizer`` leagă etapele din ``recognition.py`` (filtrul de mișcare,
+detecția la scara adaptivă, encodarea cu tracking și cache, potrivirea cu galeria) și
+măsoară durata fiecăreia. Este folosit de bucla serială din ``main.py`` și de
+``bench_recognition.py``, care îl rulează pe frame-uri înregistrate.
+
+Galeria (``matcher``) poate fi înlocuită oricând din alt thread cu
+``swap_matcher`` (vezi ``gallery_reload.py``). Fiecare frame citește referința
+o singură dată, prin ``snapshot()``, deci vede fie galeria veche, fie pe cea
+nouă, niciodată un amestec.
+"""
+import collections
+import logging
+import time
+
+from detectors import HOGDetector
+from metrics import registry
+from recognition import detect_faces, downscale, identify_faces, summarize_matches, to_rgb
+
+logger = logging.getLogger(__name__)
+
+RecognitionResult = collections.namedtuple("RecognitionResult", "locations names person status timings processed")
+
+STAGES = ("gate", "detect", "encode", "match")
+
+
+class Recognizer:
+    def __init__(self, matcher, scaler, tracker=None, motion_gate=None, detector=None, encoding_cache=None):
+        self.matcher = matcher
+        self.detector = detector if detector is not None else HOGDetector(scaler.upsample)
+        self.scaler = scaler
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+        self.encoding_cache = encoding_cache
+        self._active_matcher = matcher
+        self.last_status = "no_face"
+        self.last_locations = []
+        self.last_names = []
+        self._stage_seconds = {stage: registry.histogram(f"recognition_{stage}_seconds") for stage in STAGES}
+        self._frames = registry.counter("frames_total")
+        self._frames_gated = registry.counter("frames_gated_total")
+        self._faces = registry.counter("faces_detected_total")
+
+    def record(self, timings, faces, processed=True):
+        """Metricile unui frame (folosit și de modul pipeline, care nu trece prin ``process``)."""
+        if not registry.enabled:
+            return
+        self._frames.inc()
+        if not processed:
+            self._frames_gated.inc()
+        self._faces.inc(faces)
+        for stage, seconds in timings.items():
+            histogram = self._stage_seconds.get(stage)
+            if histogram is not None:
+                histogram.observe(seconds)
+
+    def swap_matcher(self, matcher):
+        """Înlocuiește galeria; atribuirea referinței este atomică, frame-ul în curs o păstrează pe cea veche."""
+        self.matcher = matcher
+
+    def snapshot(self):
+        """Galeria pentru frame-ul curent. Apelat din thread-ul care folosește tracker-ul."""
+        matcher = self.matcher
+        if matcher is not self._active_matcher:
+            self._active_matcher = matcher
+            # Identitățile din track-uri și din cache provin din galeria veche (ex. o persoană revocată)
+            if self.tracker is not None:
+                self.tracker.invalidate()
+            if self.encoding_cache is not None:
+                self.encoding_cache.clear()
+        return matcher
+
+    def needs_recognition(self, frame):
+        """Filtrul de mișcare: sare peste HOG când scena e statică și goală."""
+        if self.motion_gate is None:
+            return True
+        return self.motion_gate.should_process(frame, idle=(self.last_status == "no_face"))
+
+    def process(self, frame):
+        """Recunoaște fețele din frame (BGR); returnează un ``RecognitionResult``."""
+        frame_start = time.perf_counter()
+        timings = {}
+        if not self.needs_recognition(frame):
+            timings["gate"] = time.perf_counter() - frame_start
+            # Scenă statică și goală: păstrăm ultima stare "no_face"
+            self.last_locations, self.last_names = [], []
+            self.record(timings, 0, processed=False)
+            return RecognitionResult([], [], "N/A", "no_face", timings, False)
+        timings["gate"] = time.perf_counter() - frame_start
+
+        # Detecția rulează pe frame-ul micșorat, encodarea pe crop-urile la rezoluție completă
+        scale = self.scaler.scale
+        detect_start = time.perf_counter()
+        rgb_frame = to_rgb(frame)
+        locations = detect_faces(downscale(rgb_frame, scale), scale, self.detector, rgb_frame.shape)
+        timings["detect"] = time.perf_counter() - detect_start
+        # Fețele noi sunt comparate cu galeria într-un singur pas; cele urmărite își păstrează identitatea
+        matches = identify_faces(rgb_frame, locations, self.snapshot(), self.tracker,
+                                 self.scaler.num_jitters, self.scaler.encoding_model, timings, self.encoding_cache)
+        names, person, status = summarize_matches(locations, matches)
+
+        self.last_status = status
+        self.last_locations, self.last_names = locations, names
+        if self.scaler.observe(time.perf_counter() - frame_start, timings["detect"]):
+            logger.info("Detection %s", self.scaler.describe())
+        self.record(timings, len(locations))
+        return RecognitionResult(locations, names, person, status, timings, True)
@@ -0,0 +1,105 @@
+"""Pornirea agentului: inițializări în paralel și cronologia lor.
+
+``main.py`` pornește întâi ce face ușa utilizabilă (GPIO încuiat, MQTT), apoi
+rulează în paralel, cu ``start_tasks``, pașii lenți ai vederii (camera,
+galeria, modelele dlib) și îi așteaptă cu ``wait_for_tasks``. ``StartupTimeline`` notează momentul fiecărui pas,
+măsurat de la pornirea procesului (nu de la primul import), și îl expune ca
+gauge ``startup_<pas>_seconds``.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+def process_start_monotonic():
+    """Momentul pornirii procesului pe ceasul ``time.monotonic()``.
+
+    Pe Linux din ``/proc`` (include pornirea interpretorului și importurile);
+    altfel momentul apelului.
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Câmpurile de după "(comm)" încep cu al treilea; starttime este al 22-lea
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic()
+    return time.monotonic() - max(0.0, age)
+
+
+class StartupTimeline:
+    def __init__(self, origin=None, registry=None):
+        self.origin = time.monotonic() if origin is None else origin
+        self.registry = registry
+        self._lock = threading.Lock()
+        self.marks = {} # pas -> secunde de la pornire (doar prima apariție)
+        self.durations = {} # pas -> cât a durat (pentru pașii rulați cu ``run``)
+
+    def elapsed(self):
+        return time.monotonic() - self.origin
+
+    def mark(self, name):
+        """Notează prima atingere a pasului ``name``; apelurile ulterioare sunt ignorate."""
+        if name in self.marks:
+            return self.marks[name]
+        with self._lock:
+            if name in self.marks:
+                return self.marks[name]
+            at = self.marks[name] = self.elapsed()
+        logger.info("Startup: %s at %.2fs", name, at)
+        if self.registry is not None:
+            self.registry.gauge(f"startup_{name}_seconds").set(at)
+        return at
+
+    def run(self, name, fn, *args, **kwargs):
+        """Rulează ``fn`` și notează cât a durat și, dacă a reușit, când s-a terminat."""
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            self.durations[name] = time.monotonic() - started
+        self.mark(name)
+        return result
+
+    def summary(self):
+        parts = []
+        for name, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            duration = self.durations.get(name)
+            parts.append(f"{name} {at:.2f}s" + (f" (took {duration:.2f}s)" if duration is not None else ""))
+        return ", ".join(parts)
+
+
+def start_tasks(timeline, tasks):
+    """Pornește fiecare ``(nume, funcție)`` pe propriul thread; returnează ``{nume: Future}``."""
+    executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup")
+    futures = {name: executor.submit(timeline.run, name, fn) for name, fn in tasks.items()}
+    executor.shutdown(wait=False)
+    return futures
+
+
+def wait_for_tasks(futures, stop_event, poll=0.1):
+    """Așteaptă pașii din ``start_tasks``; returnează ``{nume: rezultat}`` sau None.
+
+    None dacă un pas a eșuat sau dacă ``stop_event`` a fost setat între timp;
+    apelantul decide ce face fără ei (``main.py`` rămâne în modul doar-comenzi).
+    """
+    results = {}
+    for name, future in futures.items():
+        while not stop_event.is_set():
+            try:
+                results[name] = future.result(timeout=poll)
+                break
+            except FutureTimeoutError: # Pe Python 3.9 nu este TimeoutError-ul builtin
+                continue
+            except Exception as e:
+                logger.error("Startup step '%s' failed: %s", name, e)
+                return None
+        else:
+            return None
+    return results
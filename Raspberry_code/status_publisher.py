@@ -0,0 +1,381 @@
+"""Trimiterea statusului către serverul Django, pe un thread separat.
+
+Bucla de recunoaștere doar depune ultimul status (``submit``); thread-ul
+publisher-ului:
+
+* păstrează o singură sesiune HTTP keep-alive (fără conexiune TCP nouă la
+  fiecare status);
+* unește actualizările: dintr-un interval de ``coalesce_interval`` secunde se
+  trimite doar ultimul status;
+* la erori de rețea și 5xx reîncearcă cu backoff exponențial, păstrând
+  evenimentele într-o coadă mărginită în memorie; ce nu mai încape ajunge
+  (opțional) într-un fișier spool JSONL, trimis primul după revenirea serverului;
+* un status respins de server (4xx, ex. 400 pentru câmpuri prea lungi) nu
+  mai este reîncercat: este logat și aruncat, ca să nu blocheze coada;
+* cu ``bulk_url``, restanțele (spool, coadă) pleacă în loturi NDJSON
+  comprimate gzip, câte ``bulk_size`` statusuri într-o singură cerere.
+"""
+import collections
+import datetime
+import gzip
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Rezultatul unei cereri: livrat, respins definitiv de server, de reîncercat
+SENT = "sent"
+REJECTED = "rejected"
+RETRY = "retry"
+RETRYABLE_STATUS_CODES = frozenset({408, 429}) # 4xx temporare; toate 5xx sunt reîncercate
+
+
+class StatusPublisher(threading.Thread):
+    def __init__(self, url, timeout=3.0, coalesce_interval=0.5, max_queue=200, spool_path=None,
+                 backoff_initial=0.5, backoff_max=30.0, bulk_url=None, bulk_size=500):
+        super().__init__(name="status-publisher", daemon=True)
+        self.url = url
+        self.timeout = timeout
+        self.coalesce_interval = coalesce_interval
+        self.spool_path = spool_path
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.bulk_url = bulk_url
+        self.bulk_size = bulk_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._last_enqueued = 0.0
+        self._outbox = collections.deque()
+        self._max_queue = max_queue
+        self._spooled = self._count_spooled()
+        self._stopping = False
+
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        self.online = True
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._send_seconds = registry.histogram("status_http_seconds")
+        self._sent_total = registry.counter("status_sent_total")
+        self._failed_total = registry.counter("status_failed_total")
+        self._rejected_total = registry.counter("status_rejected_total")
+
+    # --- API folosit de bucla principală ---
+    def submit(self, payload):
+        """Depune un status; nu blochează niciodată bucla de recunoaștere."""
+        with self._cond:
+            if self._latest is not None:
+                self.coalesced += 1
+            self._latest = payload
+            self._cond.notify()
+
+    def stop(self, timeout=None):
+        """Oprește thread-ul; ce n-a putut fi trimis rămâne în spool (dacă există).
+
+        Spool-ul este scris de un singur thread: dacă thread-ul publisher-ului
+        e încă într-o trimitere după ``timeout``, el scrie restul la ieșire.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout if timeout is not None else self.timeout + 1.0)
+        if self.is_alive():
+            logger.warning("Status publisher is still sending, it will spool %d pending statuses when done.",
+                           len(self._outbox))
+            return
+        self._finish()
+
+    def _finish(self):
+        """Mută în spool statusurile netrimise și închide sesiunea (după oprirea trimiterilor)."""
+        with self._cond:
+            if self._latest is not None:
+                self._outbox.append(self._latest)
+                self._latest = None
+            pending = list(self._outbox)
+            self._outbox.clear()
+        for payload in pending:
+            self._spool(payload)
+        self.session.close()
+
+    @property
+    def backlog(self):
+        return len(self._outbox) + self._spooled
+
+    # --- Spool pe disc ---
+    def _count_spooled(self):
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        with open(self.spool_path, "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+
+    def _spool(self, payload):
+        if not self.spool_path:
+            self.dropped += 1
+            return
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+        self._spooled += 1
+
+    def _read_spool(self):
+        with open(self.spool_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _drain_spool(self):
+        """Trimite evenimentele din spool, în ordine. Returnează False la eroare."""
+        pending = self._read_spool()
+        step = self.bulk_size if self.bulk_url else 1
+        for i in range(0, len(pending), step):
+            chunk = pending[i:i + step]
+            # La oprire nu mai începem o cerere nouă: restul rămâne în spool
+            done = 0 if self._stopping else self._deliver(chunk)
+            if done < len(chunk):
+                with open(self.spool_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(p) + "\n" for p in pending[i + done:])
+                self._spooled = len(pending) - i - done
+                return False
+        os.remove(self.spool_path)
+        self._spooled = 0
+        return True
+
+    # --- Trimitere ---
+    def _deliver(self, payloads):
+        """Trimite statusurile, în ordine; returnează câte au fost consumate (livrate sau respinse)."""
+        if len(payloads) > 1:
+            result = self._post_batch(payloads)
+            if result == SENT:
+                return len(payloads)
+            if result == RETRY:
+                return 0
+            # Lot respins (ex. 413): fiecare status separat, ca doar cele invalide să fie aruncate
+            logger.warning("Bulk request with %d statuses rejected, sending them one by one.", len(payloads))
+        for done, payload in enumerate(payloads):
+            if self._post(payload) == RETRY:
+                return done
+        return len(payloads)
+
+    def _post(self, payload):
+        return self._send(self.url, 1, json=payload)
+
+    def _post_batch(self, payloads):
+        body = gzip.compress("".join(json.dumps(p) + "\n" for p in payloads).encode("utf-8"))
+        headers = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+        return self._send(self.bulk_url, len(payloads), data=body, headers=headers)
+
+    def _send(self, url, count, **kwargs):
+        response = None
+        started = time.perf_counter()
+        try:
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+            self._send_seconds.observe(time.perf_counter() - started)
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            self._on_failure(f"Connection to {url} timed out.")
+            return RETRY
+        except requests.exceptions.ConnectionError:
+            self._on_failure(f"Could not connect to {url}. Is the server running?")
+            return RETRY
+        except requests.exceptions.HTTPError as http_err:
+            code = response.status_code
+            if code >= 500 or code in RETRYABLE_STATUS_CODES:
+                self._on_failure(f"HTTP error occurred: {http_err} - Response: {response.text}")
+                return RETRY
+            # Serverul e disponibil, dar aceeași cerere ar fi respinsă din nou
+            self._on_reachable(url)
+            if count == 1:
+                self.rejected += 1
+                self._rejected_total.inc()
+                logger.error("Status rejected by server, dropping it: %s - Response: %s - Payload: %s",
+                             http_err, response.text[:200], str(kwargs.get("json"))[:200])
+            return REJECTED
+        except requests.exceptions.RequestException as e:
+            self._on_failure(f"Failed to send status to laptop: {e}")
+            return RETRY
+        except Exception as e:
+            self._on_failure(f"An unexpected error occurred during HTTP send: {e}")
+            return RETRY
+        self.sent += count
+        self._sent_total.inc(count)
+        self._on_reachable(url)
+        return SENT
+
+    def _on_reachable(self, url):
+        if not self.online:
+            logger.info("Connection to %s restored.", url)
+        self.online = True
+        self._backoff = 0.0
+
+    def _on_failure(self, message):
+        self.failed += 1
+        self._failed_total.inc()
+        # Doar prima eroare dintr-o pană este afișată, nu câte una la fiecare încercare
+        if self.online:
+            logger.error("%s Retrying in the background.", message)
+        self.online = False
+        self._backoff = min(self.backoff_max, max(self.backoff_initial, self._backoff * 2))
+        self._next_attempt = time.monotonic() + self._backoff * random.uniform(0.8, 1.2)
+
+    def _enqueue(self, payload):
+        self._outbox.append(payload)
+        while len(self._outbox) > self._max_queue:
+            self._spool(self._outbox.popleft())
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            self._finish()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                if self._latest is not None and now - self._last_enqueued >= self.coalesce_interval:
+                    self._enqueue(self._latest)
+                    self._latest = None
+                    self._last_enqueued = now
+                if self._stopping:
+                    return
+                waits = []
+                if self._latest is not None:
+                    waits.append(self.coalesce_interval - (now - self._last_enqueued))
+                if self._outbox or self._spooled:
+                    waits.append(self._next_attempt - now)
+                if not waits or min(waits) > 0:
+                    self._cond.wait(timeout=min(waits) if waits else None)
+                    continue
+                batch = list(itertools.islice(self._outbox, self.bulk_size if self.bulk_url else 1))
+
+            if self._spooled and self.spool_path:
+                if not self._drain_spool():
+                    continue
+            if not batch:
+                continue
+            done = self._deliver(batch)
+            with self._cond:
+                # Între timp, o coadă plină poate să fi mutat deja o parte din lot în spool
+                for payload in batch[:done]:
+                    if self._outbox and self._outbox[0] is payload:
+                        self._outbox.popleft()
+
+
+class MQTTStatusPublisher:
+    """Publică statusul pe topicul ușii prin clientul MQTT deja folosit pentru comenzi.
+
+    Mesajele sunt "retained" (serverul pornit mai târziu primește ultimul status)
+    și QoS 1; cât timp conexiunea lipsește, paho le ține în coada proprie, până
+    la ``max_queue`` mesaje. Oferă aceeași interfață ca ``StatusPublisher``.
+    """
+
+    def __init__(self, client, topic, qos=1, max_queue=200):
+        self.client = client
+        self.topic = topic
+        self.qos = qos
+        self.client.max_queued_messages_set(max_queue)
+        self._publish_seconds = registry.histogram("status_mqtt_publish_seconds")
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def start(self):
+        pass
+
+    def stop(self, timeout=None):
+        pass
+
+    @property
+    def online(self):
+        return self.client.is_connected()
+
+    @property
+    def backlog(self):
+        return 0
+
+    def submit(self, payload):
+        started = time.perf_counter()
+        info = self.client.publish(self.topic, json.dumps(payload), qos=self.qos, retain=True)
+        self._publish_seconds.observe(time.perf_counter() - started)
+        # Fără conexiune, un mesaj QoS>0 rămâne în coadă și pleacă la reconectare
+        if info.rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+            self.sent += 1
+        else:
+            self.dropped += 1
+            logger.error("Could not queue status on '%s'. RC: %s", self.topic, info.rc)
+
+
+class RecordingStatusPublisher:
+    """Păstrează statusurile în memorie (serializate ca pentru rețea), fără să le trimită.
+
+    Înlocuiește publisher-ul real la rularea offline (``main.py --offline``,
+    ``bench_recognition.py``).
+    """
+
+    def __init__(self, max_records=10000):
+        self.records = collections.deque(maxlen=max_records)
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.online = True
+        self.backlog = 0
+
+    def start(self):
+        pass
+
+    def stop(self, timeout=None):
+        pass
+
+    def submit(self, payload):
+        self.records.append(json.dumps(payload))
+        self.sent += 1
+
+
+class StatusReporter:
+    """Decide ce statusuri pleacă spre server: orice schimbare, plus o retrimitere
+    periodică a aceluiași status (``resend_interval``) ca semn de viață."""
+
+    def __init__(self, publisher, device_id, resend_interval=5.0):
+        self.publisher = publisher
+        self.device_id = device_id
+        self.resend_interval = resend_interval
+        self.last_sent = None
+        self.last_sent_at = 0.0
+
+    def report(self, person_name, status_msg, now=None):
+        """Returnează True dacă statusul a fost trimis publisher-ului."""
+        now = time.time() if now is None else now
+        current = (person_name, status_msg)
+        if current == self.last_sent and now - self.last_sent_at <= self.resend_interval:
+            return False
+        payload = {
+            "device_id": self.device_id,
+            "pi_timestamp": datetime.datetime.now().astimezone().isoformat(), # Cu offset: serverul îl ordonează corect
+            "person_name": person_name,
+            "status": status_msg
+        }
+        # Trimiterea efectivă (keep-alive, reîncercări, spool) se face pe thread-ul publisher-ului
+        self.publisher.submit(payload)
+        self.last_sent = current
+        self.last_sent_at = now
+        return True
@@ -0,0 +1,1403 @@
+"""Teste pentru codul de pe Pi care nu are nevoie de cameră, dlib sau GPIO real.
+
+Rulare, din ``Raspberry_code``::
+
+    python -m unittest tests
+"""
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import pickle
+import queue
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import cv2
+import numpy as np
+import paho.mqtt.client as mqtt
+import requests
+
+from adaptive import AdaptiveScaler
+from encoding_cache import EncodingCache, face_hash, hamming_distance
+from debug_stream import DebugStreamServer
+from detectors import CascadeDetector, CascadedDetector, DNNDetector, HOGDetector, build_detector
+import enroll
+from face_matcher import UNKNOWN_NAME, FaceMatcher, MatchResult
+from face_tracker import FaceTracker, iou
+from frame_sources import EndOfSource, ImageDirectorySource, VideoFileSource, load_labels, open_source
+from gallery_index import BruteForceIndex, IVFIndex, load_index, save_index
+from gallery_reload import GalleryReloader
+from gallery_store import load_gallery, write_gallery
+from log_utils import KeyValueFormatter, QueueLogHandler, RateLimitFilter, configure_logging
+from metrics import MetricsRegistry, MetricsReporter, format_summary
+from motion_gate import MotionGate
+from pipeline import CaptureStage, DropOldestQueue, FrameItem, Pipeline, PoolStage, Stage
+from recognizer import Recognizer
+from startup import StartupTimeline, process_start_monotonic, start_tasks, wait_for_tasks
+from status_publisher import MQTTStatusPublisher, StatusPublisher
+
+try:
+    from gpiozero.pins.mock import MockFactory, MockPWMPin
+
+    from door_actuator import DoorActuator
+except ImportError: # gpiozero lipsește în afara Pi-ului
+    DoorActuator = None
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def reference_compare_faces(known, encoding, tolerance):
+    """``face_recognition.compare_faces``: distanța euclidiană față de fiecare encodare cunoscută."""
+    return list(np.linalg.norm(np.asarray(known) - encoding, axis=1) <= tolerance)
+
+
+class FaceMatcherTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.known = rng.normal(0, 0.1, (6, 128)).astype(np.float32)
+        self.names = ["Ana", "Ana", "Bogdan", "Carmen", "Dan", "Elena"]
+        self.matcher = FaceMatcher(self.known, self.names, {"Ana", "Dan"}, tolerance=0.55)
+
+    def test_tolerance_boundary(self):
+        direction = np.zeros(128, dtype=np.float32)
+        direction[0] = 1.0
+        inside = self.known[2] + direction * 0.5
+        outside = self.known[2] + direction * 5.0
+        self.assertEqual(self.matcher.match([inside])[0].name, "Bogdan")
+        self.assertEqual(self.matcher.match([outside])[0].name, UNKNOWN_NAME)
+
+    def test_exact_tolerance_is_a_match(self):
+        matcher = FaceMatcher([[0.0] * 128], ["Ana"], tolerance=0.5)
+        query = np.zeros(128)
+        query[3] = 0.5
+        self.assertEqual(matcher.match([query])[0].name, "Ana")
+
+    def test_empty_gallery_and_empty_query(self):
+        empty = FaceMatcher([], [], {"Ana"})
+        results = empty.match([np.zeros(128)])
+        self.assertEqual(results[0].name, UNKNOWN_NAME)
+        self.assertFalse(results[0].authorized)
+        self.assertEqual(self.matcher.match([]), [])
+        self.assertEqual(self.matcher.match(np.zeros((0, 128))), [])
+
+    def test_authorization_mask(self):
+        results = self.matcher.match([self.known[0], self.known[2], self.known[4]])
+        self.assertEqual([r.name for r in results], ["Ana", "Bogdan", "Dan"])
+        self.assertEqual([r.authorized for r in results], [True, False, True])
+        self.assertTrue(self.matcher.is_authorized("Ana"))
+        self.assertFalse(self.matcher.is_authorized(UNKNOWN_NAME))
+
+    def test_gallery_encoded_with_another_model_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "encodings.gallery")
+            write_gallery(path, self.known, self.names, {"params": {"encoding_model": "large"}})
+            with self.assertRaisesRegex(ValueError, "'large' model"):
+                FaceMatcher.from_file(path, encoding_model="small")
+            self.assertEqual(len(FaceMatcher.from_file(path, encoding_model="large")), 6)
+            # Galerie fără parametri (importată): acceptată, cu avertisment
+            write_gallery(path, self.known, self.names, {"params": None})
+            with self.assertLogs("face_matcher", "WARNING"):
+                self.assertEqual(len(FaceMatcher.from_file(path, encoding_model="small")), 6)
+
+    def test_unknown_face_is_never_authorized(self):
+        far = np.full(128, 10.0)
+        result = self.matcher.match([far])[0]
+        self.assertEqual(result.name, UNKNOWN_NAME)
+        self.assertFalse(result.authorized)
+
+    def test_equivalent_to_compare_faces(self):
+        rng = np.random.default_rng(2)
+        queries = self.known[rng.integers(0, len(self.known), 40)] + rng.normal(0, 0.06, (40, 128))
+        for query, result in zip(queries, self.matcher.match(queries)):
+            matches = reference_compare_faces(self.known, query, 0.55)
+            distances = np.linalg.norm(self.known - query, axis=1)
+            if any(matches):
+                self.assertEqual(result.name, self.names[int(np.argmin(distances))])
+                self.assertAlmostEqual(result.distance, float(distances.min()), places=4)
+            else:
+                self.assertEqual(result.name, UNKNOWN_NAME)
+
+
+def clustered_gallery(people=40, per_person=5, seed=3):
+    """Encodări grupate pe persoane, ca într-o galerie reală (câteva poze per persoană)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.3, (people, 128))
+    matrix = np.repeat(centers, per_person, axis=0) + rng.normal(0, 0.03, (people * per_person, 128))
+    return matrix.astype(np.float32), rng
+
+
+def drain(q, count, timeout=3.0):
+    """Primele ``count`` item-uri din coadă (mai puține dacă expiră ``timeout``)."""
+    items, deadline = [], time.monotonic() + timeout
+    while len(items) < count and time.monotonic() < deadline:
+        try:
+            items.append(q.get(timeout=0.05))
+        except queue.Empty:
+            pass
+    return items
+
+
+class PipelineTests(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("pipeline").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("pipeline").setLevel, logging.NOTSET)
+
+    def test_full_queue_drops_the_oldest_item(self):
+        q = DropOldestQueue(maxsize=2)
+        for n in range(5):
+            q.put(n)
+        self.assertEqual(q.dropped, 3)
+        self.assertEqual([q.get_nowait(), q.get_nowait()], [3, 4])
+        with self.assertRaises(queue.Empty):
+            q.get_nowait()
+
+    def test_pool_stage_emits_results_in_capture_order(self):
+        inbox, outbox = DropOldestQueue(10), DropOldestQueue(10)
+        executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        def work(seq):
+            time.sleep(0.02 * (4 - seq)) # Frame-urile mai noi se termină primele
+            if seq == 2:
+                raise ValueError("no face")
+            return seq * 10
+
+        def complete(item, result):
+            item.names = [result]
+            return item
+
+        stage = PoolStage("encode", lambda ex, item: ex.submit(work, item.seq), complete, executor, inbox,
+                          [outbox], max_in_flight=4)
+        stage.start()
+        self.addCleanup(stage.join, 2.0)
+        self.addCleanup(stage.stop_event.set)
+        for seq in range(5):
+            inbox.put(FrameItem(seq, None))
+        items = drain(outbox, 4)
+        # Frame-ul 2 a eșuat în pool și este sărit, restul ies în ordine
+        self.assertEqual([(item.seq, item.names) for item in items], [(0, [0]), (1, [10]), (3, [30]), (4, [40])])
+        self.assertIn("encode", items[0].timings)
+        self.assertEqual(stage.stats.count, 4)
+
+    def test_stale_items_are_skipped(self):
+        inbox, outbox = DropOldestQueue(10), DropOldestQueue(10)
+        stage = Stage("match", lambda item: item, inbox, [outbox], max_age=0.5)
+        old, fresh = FrameItem(0, None), FrameItem(1, None)
+        old.captured_at -= 1.0
+        inbox.put(old)
+        inbox.put(fresh)
+        stage.start()
+        self.addCleanup(stage.join, 2.0)
+        self.addCleanup(stage.stop_event.set)
+        self.assertEqual([item.seq for item in drain(outbox, 1)], [1])
+        self.assertEqual(stage.stats.snapshot()["stale"], 1)
+
+    def test_pipeline_runs_until_the_source_ends_and_stops(self):
+        frames = iter(range(3))
+
+        def capture():
+            try:
+                return next(frames)
+            except StopIteration:
+                raise EOFError from None
+
+        pipeline = Pipeline()
+        detect_q, out_q = pipeline.queue("detect", maxsize=5), DropOldestQueue(5)
+        capture_stage = pipeline.add(CaptureStage(capture, [detect_q]))
+        pipeline.add(Stage("detect", lambda item: None if item.frame == 1 else item, detect_q, [out_q]))
+        pipeline.start()
+        self.assertEqual([item.frame for item in drain(out_q, 2)], [0, 2])
+        capture_stage.join(2.0)
+        self.assertFalse(capture_stage.is_alive()) # EOFError oprește doar captura
+        pipeline.stop()
+        self.assertFalse(any(stage.is_alive() for stage in pipeline.stages))
+        report = pipeline.report()
+        self.assertEqual((report["capture"]["count"], report["detect"]["count"]), (3, 3))
+        self.assertEqual(report["queue:detect"]["dropped"], 0)
+        self.assertIn("detect", pipeline.format_report())
+
+
+class AdaptiveScalerTests(unittest.TestCase):
+    def make_scaler(self, **kwargs):
+        options = dict(target_frame_time=0.2, levels=(1.0, 2.0, 3.0), smoothing=1.0, cooldown=1.0)
+        options.update(kwargs)
+        return AdaptiveScaler(**options)
+
+    def test_slow_frames_coarsen_the_scale_after_each_cooldown(self):
+        scaler = self.make_scaler()
+        self.assertTrue(scaler.observe(0.5, now=10.0))
+        self.assertEqual(scaler.scale, 2.0)
+        self.assertFalse(scaler.observe(0.5, now=10.5)) # În cooldown
+        self.assertTrue(scaler.observe(0.5, now=11.0))
+        self.assertFalse(scaler.observe(0.5, now=20.0)) # Deja la scara cea mai grosieră
+        self.assertEqual(scaler.scale, 3.0)
+
+    def test_fast_frames_refine_and_the_band_holds(self):
+        scaler = self.make_scaler(initial_level=2)
+        self.assertFalse(scaler.observe(0.15, now=10.0)) # Între 0.6 și 1.1 din țintă: rămâne
+        self.assertTrue(scaler.observe(0.05, now=10.0))
+        self.assertEqual(scaler.scale, 2.0)
+        self.assertIsNone(scaler.frame_time) # Media se reia la noua scară
+
+    def test_moving_average_smooths_spikes(self):
+        scaler = self.make_scaler(smoothing=0.2)
+        for _ in range(5):
+            scaler.observe(0.15, now=0.0)
+        # Un frame izolat de 0.4 s: media devine 0.15 + 0.2 * 0.25 = 0.2, sub pragul de 0.22
+        self.assertFalse(scaler.observe(0.4, now=10.0))
+        self.assertAlmostEqual(scaler.frame_time, 0.2)
+        self.assertTrue(self.make_scaler().observe(0.4, now=10.0)) # Fără netezire, același frame schimbă scara
+
+    def test_disabled_scaler_only_measures(self):
+        scaler = self.make_scaler(enabled=False)
+        self.assertFalse(scaler.observe(1.0, detect_time=0.8, now=10.0))
+        self.assertEqual(scaler.scale, 1.0)
+        self.assertIn("detect 800ms", scaler.describe())
+
+
+class FrameSourceTests(unittest.TestCase):
+    LABELS = [{"start": 2, "end": 2, "person": "Ana", "status": "authorized"}, {"start": 0, "end": 1, "status": "no_face"}]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        logging.getLogger("frame_sources").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("frame_sources").setLevel, logging.NOTSET)
+
+    def write_frames(self, directory, count=3):
+        os.makedirs(directory, exist_ok=True)
+        for i in range(count):
+            cv2.imwrite(os.path.join(directory, f"{i:03d}.png"), np.full((24, 32, 3), i * 60, dtype=np.uint8))
+        with open(os.path.join(directory, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump(self.LABELS, f)
+
+    def test_image_directory_in_name_order_with_labels(self):
+        directory = os.path.join(self.tmp, "clip")
+        self.write_frames(directory)
+        with open(os.path.join(directory, "001b.jpg"), "wb") as f:
+            f.write(b"not an image") # Sărită, cu avertisment
+        source = open_source(directory, size=(16, 12))
+        self.assertIsInstance(source, ImageDirectorySource)
+        frames = list(source)
+        self.assertEqual([int(frame[0, 0, 0]) for frame, _ in frames], [0, 60, 120])
+        self.assertEqual(frames[0][0].shape, (12, 16, 3))
+        self.assertEqual([label for _, label in frames], [("N/A", "no_face"), ("N/A", "no_face"), ("Ana", "authorized")])
+
+    def test_end_of_source_and_loop(self):
+        directory = os.path.join(self.tmp, "clip")
+        self.write_frames(directory, count=2)
+        source = ImageDirectorySource(directory)
+        source.start()
+        source.capture_array()
+        source.capture_array()
+        with self.assertRaises(EndOfSource):
+            source.capture_array()
+        looping = ImageDirectorySource(directory, loop=True)
+        values = [int(looping.capture_array()[0, 0, 0]) for _ in range(5)]
+        self.assertEqual(values, [0, 60, 0, 60, 0])
+        self.assertEqual(looping.index, 0)
+
+    def test_video_file_with_side_labels(self):
+        path = os.path.join(self.tmp, "door.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+        if not writer.isOpened():
+            self.skipTest("OpenCV cannot write MJPG video here")
+        for i in range(3):
+            writer.write(np.full((24, 32, 3), i * 60, dtype=np.uint8))
+        writer.release()
+        with open(path + ".labels.json", "w", encoding="utf-8") as f:
+            json.dump(self.LABELS, f)
+        source = open_source(path)
+        self.assertIsInstance(source, VideoFileSource)
+        frames = list(source)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames[2][1], ("Ana", "authorized"))
+        source.stop()
+
+    def test_labels_validation_and_missing_paths(self):
+        self.assertEqual(load_labels(os.path.join(self.tmp, "missing.json")), [])
+        bad = os.path.join(self.tmp, "bad.json")
+        with open(bad, "w", encoding="utf-8") as f:
+            json.dump([{"start": 0, "status": "no_face"}], f)
+        with self.assertRaises(ValueError):
+            load_labels(bad)
+        with self.assertRaises(FileNotFoundError):
+            open_source(os.path.join(self.tmp, "missing.mp4"))
+        os.makedirs(os.path.join(self.tmp, "empty"))
+        with self.assertRaises(ValueError):
+            open_source(os.path.join(self.tmp, "empty"))
+
+
+class DebugStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.full((48, 64, 3), 120, dtype=np.uint8)
+
+    def fetch_async(self, stream, count=1, timeout=3.0):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(stream.next_jpeg(timeout=timeout)))
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        self.addCleanup(lambda: [thread.join(timeout=5) for thread in threads])
+        return threads, results
+
+    def test_offer_without_clients_keeps_nothing(self):
+        stream = DebugStreamServer(max_fps=0)
+        stream.offer(self.frame)
+        self.assertIsNone(stream._latest)
+        self.assertIsNone(stream.next_jpeg(timeout=0.05))
+        self.assertEqual(stream.clients, 0)
+
+    def test_waiting_client_is_counted_and_receives_frame(self):
+        stream = DebugStreamServer(max_fps=0)
+        threads, results = self.fetch_async(stream)
+        self.assertTrue(wait_for(lambda: stream.clients == 1))
+        stream.offer(self.frame)
+        threads[0].join(timeout=3)
+        self.assertEqual(stream.clients, 0)
+        decoded = cv2.imdecode(np.frombuffer(results[0], np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, self.frame.shape)
+
+    def test_concurrent_clients_share_one_encode(self):
+        calls = []
+
+        def annotate(image, locations, names):
+            calls.append((list(locations), list(names)))
+            image[:] = 0 # Adnotarea nu trebuie să atingă frame-ul original
+            time.sleep(0.2)
+            return image
+
+        stream = DebugStreamServer(max_fps=0, annotate=annotate)
+        threads, results = self.fetch_async(stream, count=3)
+        self.assertTrue(wait_for(lambda: stream.clients == 3))
+        stream.offer(self.frame, [(1, 2, 3, 4)], ["alice"])
+        for thread in threads:
+            thread.join(timeout=3)
+        self.assertEqual(len(results), 3)
+        self.assertIsNotNone(results[0])
+        self.assertTrue(all(jpeg == results[0] for jpeg in results))
+        self.assertEqual(stream.encoded, 1)
+        self.assertEqual(calls, [([(1, 2, 3, 4)], ["alice"])])
+        self.assertTrue((self.frame == 120).all())
+
+    def test_offers_are_throttled_to_max_fps(self):
+        stream = DebugStreamServer(max_fps=1.0)
+        threads, _ = self.fetch_async(stream)
+        self.assertTrue(wait_for(lambda: stream.clients == 1))
+        stream.offer(self.frame)
+        stream.offer(self.frame)
+        threads[0].join(timeout=3)
+        self.assertEqual(stream._seq, 1)
+
+    def test_stop_releases_waiting_clients(self):
+        stream = DebugStreamServer(max_fps=0)
+        threads, results = self.fetch_async(stream, timeout=10.0)
+        self.assertTrue(wait_for(lambda: stream.clients == 1))
+        stream.stop()
+        threads[0].join(timeout=3)
+        self.assertEqual(results, [None])
+
+    def test_http_snapshot_and_unknown_path(self):
+        stream = DebugStreamServer(port=0, host="127.0.0.1", max_fps=0).start()
+        self.addCleanup(stream.stop)
+        base = f"http://127.0.0.1:{stream.port}"
+        with self.assertRaises(urllib.error.HTTPError) as caught:
+            urllib.request.urlopen(f"{base}/missing", timeout=3)
+        self.assertEqual(caught.exception.code, 404)
+        caught.exception.close()
+
+        responses = []
+
+        def fetch():
+            with urllib.request.urlopen(f"{base}/snapshot.jpg", timeout=5) as response:
+                responses.append((response.headers["Content-Type"], response.read()))
+
+        thread = threading.Thread(target=fetch)
+        thread.start()
+        self.assertTrue(wait_for(lambda: stream.clients == 1))
+        stream.offer(self.frame)
+        thread.join(timeout=5)
+        content_type, body = responses[0]
+        self.assertEqual(content_type, "image/jpeg")
+        self.assertTrue(body.startswith(b"\xff\xd8"))
+
+
+class FakeDetector:
+    """Detector de test: întoarce casete fixe sau calculate din forma imaginii."""
+
+    def __init__(self, name, boxes):
+        self.name = name
+        self.boxes = boxes
+        self.shapes = []
+
+    def detect(self, rgb):
+        self.shapes.append(rgb.shape[:2])
+        return self.boxes(rgb.shape) if callable(self.boxes) else list(self.boxes)
+
+
+class DetectorTests(unittest.TestCase):
+    def setUp(self):
+        handle, self.cascade_path = tempfile.mkstemp(suffix=".xml")
+        os.close(handle)
+        self.addCleanup(os.remove, self.cascade_path)
+
+    def test_build_detector_selects_backend(self):
+        hog = build_detector("hog", upsample=2)
+        self.assertIsInstance(hog, HOGDetector)
+        self.assertEqual(hog.upsample, 2)
+        lbp = build_detector("lbp", cascade_path=self.cascade_path)
+        self.assertIsInstance(lbp, CascadeDetector)
+        self.assertEqual((lbp.name, lbp.cascade_path), ("lbp", self.cascade_path))
+        dnn = build_detector("dnn", dnn_model_path=self.cascade_path, dnn_config_path=self.cascade_path,
+                             dnn_confidence=0.7)
+        self.assertIsInstance(dnn, DNNDetector)
+        self.assertEqual(dnn.confidence, 0.7)
+        with self.assertRaises(ValueError):
+            build_detector("yolo")
+
+    def test_missing_model_files_raise(self):
+        with self.assertRaises(FileNotFoundError):
+            build_detector("haar", cascade_path="/nonexistent/cascade.xml")
+        with self.assertRaises(FileNotFoundError):
+            build_detector("dnn", dnn_model_path="/nonexistent/model", dnn_config_path=self.cascade_path)
+        # main.py cade pe HOG exact la această excepție
+        with self.assertRaises(FileNotFoundError):
+            build_detector("cascade", cascade_path="/nonexistent/cascade.xml")
+
+    def test_build_cascade_combines_proposer_and_confirmer(self):
+        detector = build_detector("cascade", upsample=2, cascade_path=self.cascade_path, proposer="haar",
+                                  confirmer="hog")
+        self.assertIsInstance(detector, CascadedDetector)
+        self.assertEqual(detector.name, "haar+hog")
+        self.assertIsInstance(detector.proposer, CascadeDetector)
+        self.assertEqual(detector.confirmer.upsample, 2)
+        # Detectoarele ajung în procesele pipeline-ului prin pickle
+        self.assertEqual(pickle.loads(pickle.dumps(detector)).name, "haar+hog")
+
+    def test_hog_detector_calls_face_recognition(self):
+        fake = mock.Mock()
+        fake.face_locations.return_value = [(1, 2, 3, 4)]
+        rgb = np.zeros((10, 10, 3), dtype=np.uint8)
+        with mock.patch.dict(sys.modules, {"face_recognition": fake}):
+            self.assertEqual(HOGDetector(upsample=2).detect(rgb), [(1, 2, 3, 4)])
+        fake.face_locations.assert_called_once_with(rgb, number_of_times_to_upsample=2, model="hog")
+
+    def test_cascaded_maps_confirmations_back_to_frame(self):
+        proposer = FakeDetector("haar", [(50, 90, 90, 50)])
+        # Confirmă fața în centrul crop-ului primit
+        confirmer = FakeDetector("hog", lambda shape: [(shape[0] // 4, 3 * shape[1] // 4, 3 * shape[0] // 4,
+                                                        shape[1] // 4)])
+        detector = CascadedDetector(proposer, confirmer, margin=0.5, min_crop=120)
+        boxes = detector.detect(np.zeros((200, 200, 3), dtype=np.uint8))
+        # Caseta de 40px cu margine devine un crop de 80px, mărit la 120px
+        self.assertEqual(confirmer.shapes, [(120, 120)])
+        self.assertEqual(boxes, [(50, 90, 90, 50)])
+
+    def test_cascaded_without_confirmation_returns_nothing(self):
+        proposer = FakeDetector("haar", [(50, 90, 90, 50), (120, 180, 180, 120)])
+        confirmer = FakeDetector("hog", [])
+        detector = CascadedDetector(proposer, confirmer)
+        self.assertEqual(detector.detect(np.zeros((200, 200, 3), dtype=np.uint8)), [])
+        self.assertEqual(len(confirmer.shapes), 2)
+
+    def test_cascaded_merges_duplicates_and_skips_empty_crops(self):
+        proposer = FakeDetector("haar", [(50, 90, 90, 50), (52, 92, 92, 52), (300, 400, 350, 350)])
+        confirmer = FakeDetector("hog", lambda shape: [(shape[0] // 4, 3 * shape[1] // 4, 3 * shape[0] // 4,
+                                                        shape[1] // 4)])
+        detector = CascadedDetector(proposer, confirmer, min_crop=0)
+        boxes = detector.detect(np.zeros((200, 200, 3), dtype=np.uint8))
+        self.assertEqual(len(boxes), 1)
+        # Propunerea din afara imaginii nu ajunge la detectorul scump
+        self.assertEqual(len(confirmer.shapes), 2)
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_registry_returns_same_metric_per_name(self):
+        self.assertIs(self.registry.counter("frames"), self.registry.counter("frames"))
+        self.assertIs(self.registry.histogram("detect"), self.registry.histogram("detect"))
+        callback = lambda: 3
+        gauge = self.registry.gauge("queue")
+        self.assertIs(self.registry.gauge("queue", callback), gauge)
+        self.assertIs(gauge.callback, callback)
+
+    def test_disabled_registry_ignores_updates(self):
+        self.registry.enabled = False
+        self.registry.counter("frames").inc()
+        self.registry.gauge("fps").set(5)
+        self.registry.histogram("detect").observe(0.1)
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot["counters"], {"frames": 0})
+        self.assertEqual(snapshot["gauges"], {"fps": None})
+        self.assertEqual(snapshot["histograms"]["detect"]["count"], 0)
+
+    def test_histogram_buckets_and_quantiles(self):
+        histogram = self.registry.histogram("detect", buckets=(0.1, 0.2, 0.5))
+        for value in (0.05, 0.1, 0.15, 0.3, 0.3, 0.3, 0.3, 0.3, 0.3, 0.9):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        # Valoarea egală cu o limită intră în bucket-ul acelei limite
+        self.assertEqual(snapshot["counts"], [2, 1, 6, 1])
+        self.assertEqual((snapshot["count"], snapshot["max"]), (10, 0.9))
+        self.assertAlmostEqual(snapshot["sum"], 3.0)
+        self.assertEqual((snapshot["p50"], snapshot["p95"]), (0.5, None))
+        self.assertIsNone(self.registry.histogram("empty").quantile(0.5))
+
+    def test_snapshot_reset_keeps_gauges(self):
+        self.registry.counter("frames").inc(3)
+        self.registry.gauge("fps").set(2.5)
+        self.registry.gauge("backlog", lambda: 7)
+        self.registry.gauge("broken", lambda: 1 / 0)
+        self.registry.histogram("detect").observe(0.02)
+        first = self.registry.snapshot(reset=True)
+        self.assertEqual(first["counters"], {"frames": 3})
+        self.assertEqual(first["gauges"], {"backlog": 7, "broken": None, "fps": 2.5})
+        second = self.registry.snapshot(reset=True)
+        self.assertEqual(second["counters"], {"frames": 0})
+        self.assertEqual(second["gauges"]["fps"], 2.5)
+        self.assertEqual(second["histograms"]["detect"]["count"], 0)
+
+    def test_reporter_publishes_deltas_and_final_snapshot(self):
+        published = []
+        counter = self.registry.counter("frames")
+        counter.inc(2)
+        reporter = MetricsReporter(published.append, interval=0.05, registry=self.registry,
+                                   labels={"device_id": "pi-1"})
+        reporter.start()
+        self.assertTrue(wait_for(lambda: len(published) >= 1))
+        counter.inc()
+        reporter.stop(timeout=3)
+        self.assertFalse(reporter.is_alive())
+        self.assertEqual(published[0]["device_id"], "pi-1")
+        self.assertIn("timestamp", published[0])
+        self.assertEqual(published[0]["counters"]["frames"], 2)
+        self.assertEqual(sum(snapshot["counters"]["frames"] for snapshot in published), 3)
+
+    def test_reporter_survives_publish_errors(self):
+        logging.getLogger("metrics").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("metrics").setLevel, logging.NOTSET)
+        reporter = MetricsReporter(mock.Mock(side_effect=OSError("broker down")), registry=self.registry)
+        reporter.report()
+        self.assertEqual(reporter.publish.call_count, 1)
+
+    def test_format_summary(self):
+        self.registry.histogram("detect_seconds").observe(0.02)
+        self.registry.histogram("idle_seconds")
+        self.registry.counter("frames_total").inc(4)
+        self.registry.counter("errors_total")
+        self.registry.gauge("fps").set(1.5)
+        summary = format_summary(self.registry.snapshot())
+        self.assertEqual(summary, "detect_seconds p50<=25ms p95<=25ms n=1; frames_total=4; fps=1.50")
+
+
+class StartupTests(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger("startup").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("startup").setLevel, logging.NOTSET)
+        self.registry = MetricsRegistry()
+        self.timeline = StartupTimeline(time.monotonic() - 1.0, self.registry)
+
+    def test_process_start_is_in_the_past(self):
+        self.assertLessEqual(process_start_monotonic(), time.monotonic())
+
+    def test_mark_keeps_first_time_and_sets_gauge(self):
+        first = self.timeline.mark("gpio")
+        self.assertGreaterEqual(first, 1.0)
+        self.assertEqual(self.timeline.mark("gpio"), first)
+        self.assertEqual(self.registry.gauge("startup_gpio_seconds").value, first)
+
+    def test_run_marks_only_successful_steps(self):
+        self.assertEqual(self.timeline.run("gallery", lambda: "ok"), "ok")
+        with self.assertRaises(RuntimeError):
+            self.timeline.run("camera", mock.Mock(side_effect=RuntimeError("no camera")))
+        self.assertEqual(set(self.timeline.marks), {"gallery"})
+        self.assertEqual(set(self.timeline.durations), {"gallery", "camera"})
+        self.timeline.mark("mqtt_ready")
+        summary = self.timeline.summary()
+        self.assertRegex(summary, r"^gallery \d+\.\d\ds \(took \d+\.\d\ds\), mqtt_ready \d+\.\d\ds$")
+
+    def test_tasks_run_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=3)
+        futures = start_tasks(self.timeline, {"camera": barrier.wait, "gallery": barrier.wait,
+                                              "models": barrier.wait})
+        results = wait_for_tasks(futures, threading.Event())
+        self.assertEqual(set(results), {"camera", "gallery", "models"})
+        self.assertEqual(set(self.timeline.marks), {"camera", "gallery", "models"})
+
+    def test_wait_polls_slow_tasks(self):
+        futures = start_tasks(self.timeline, {"camera": lambda: time.sleep(0.2) or "camera"})
+        self.assertEqual(wait_for_tasks(futures, threading.Event(), poll=0.02), {"camera": "camera"})
+
+    def test_failed_step_falls_back_to_command_only(self):
+        # Ca în main.py: GPIO și MQTT sunt gata înainte de pașii vederii
+        self.timeline.mark("gpio")
+        self.timeline.mark("mqtt_ready")
+        futures = start_tasks(self.timeline, {"camera": mock.Mock(side_effect=OSError("no camera")),
+                                              "gallery": lambda: "gallery"})
+        self.assertIsNone(wait_for_tasks(futures, threading.Event()))
+        self.assertIsInstance(futures["camera"].exception(timeout=3), OSError)
+        self.assertNotIn("camera", self.timeline.marks)
+        self.assertIn("mqtt_ready", self.timeline.marks)
+
+    def test_stop_event_interrupts_waiting(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        futures = start_tasks(self.timeline, {"camera": release.wait})
+        stop_event = threading.Event()
+        threading.Timer(0.1, stop_event.set).start()
+        started = time.monotonic()
+        self.assertIsNone(wait_for_tasks(futures, stop_event, poll=0.02))
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertFalse(futures["camera"].done())
+
+
+class GalleryIndexTests(unittest.TestCase):
+    def test_ivf_agrees_with_brute_force_on_top1(self):
+        matrix, rng = clustered_gallery()
+        queries = matrix[rng.integers(0, len(matrix), 100)] + rng.normal(0, 0.03, (100, 128))
+        brute_idx, brute_dist = BruteForceIndex(matrix).search(queries)
+        ivf_idx, ivf_dist = IVFIndex.build(matrix, n_lists=14, n_probe=4).search(queries)
+        np.testing.assert_array_equal(ivf_idx, brute_idx)
+        np.testing.assert_allclose(ivf_dist, brute_dist, rtol=1e-4, atol=1e-5)
+
+    def test_probing_every_list_is_exact(self):
+        matrix, rng = clustered_gallery(seed=4)
+        queries = rng.normal(0, 0.3, (30, 128))
+        index = IVFIndex.build(matrix, n_lists=8, n_probe=8)
+        np.testing.assert_array_equal(index.search(queries)[0], BruteForceIndex(matrix).search(queries)[0])
+
+    def test_empty_queries_and_gallery(self):
+        matrix, _ = clustered_gallery(people=3)
+        idx, dist = IVFIndex.build(matrix, n_lists=2).search(np.zeros((0, 128)))
+        self.assertEqual(len(idx), 0)
+        idx, dist = BruteForceIndex(np.zeros((0, 128))).search(np.zeros((2, 128)))
+        self.assertTrue(np.isinf(dist).all())
+
+    def test_saved_index_is_bound_to_its_gallery(self):
+        matrix, _ = clustered_gallery(people=10)
+        index = IVFIndex.build(matrix, n_lists=4, n_probe=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "encodings.index.npz")
+            save_index(index, path, matrix)
+            loaded = load_index(path, matrix)
+            self.assertEqual((loaded.kind, loaded.n_probe), ("ivf", 2))
+            np.testing.assert_array_equal(loaded.search(matrix)[0], index.search(matrix)[0])
+            with self.assertRaises(ValueError):
+                load_index(path, matrix + 1.0)
+
+
+class MotionGateTests(unittest.TestCase):
+    def setUp(self):
+        self.scene = np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    def test_static_empty_scene_is_skipped(self):
+        gate = MotionGate(force_interval=1000.0)
+        self.assertTrue(gate.should_process(self.scene)) # Primul frame construiește fundalul
+        self.assertEqual([gate.should_process(self.scene.copy()) for _ in range(5)], [False] * 5)
+        self.assertEqual((gate.processed, gate.skipped), (1, 5))
+
+    def test_motion_is_processed(self):
+        gate = MotionGate(force_interval=1000.0)
+        gate.should_process(self.scene)
+        moved = self.scene.copy()
+        moved[100:300, 200:400] = 250
+        self.assertTrue(gate.should_process(moved))
+        self.assertGreater(gate.changed_fraction, 0.1)
+
+    def test_small_noise_is_not_motion(self):
+        gate = MotionGate(force_interval=1000.0)
+        gate.should_process(self.scene)
+        noisy = self.scene + np.random.default_rng(0).integers(0, 5, self.scene.shape, dtype=np.uint8)
+        self.assertFalse(gate.should_process(noisy))
+
+    def test_faces_in_frame_are_always_processed(self):
+        gate = MotionGate(force_interval=1000.0)
+        gate.should_process(self.scene)
+        self.assertTrue(gate.should_process(self.scene, idle=False))
+
+    def test_forced_full_pass(self):
+        gate = MotionGate(force_interval=0.05)
+        gate.should_process(self.scene)
+        self.assertFalse(gate.should_process(self.scene))
+        time.sleep(0.06)
+        self.assertTrue(gate.should_process(self.scene))
+
+    def test_bgra_and_gray_frames(self):
+        gate = MotionGate(force_interval=1000.0)
+        bgra = np.full((480, 640, 4), 90, dtype=np.uint8)
+        self.assertTrue(gate.should_process(bgra))
+        self.assertFalse(gate.should_process(bgra))
+        self.assertTrue(MotionGate().should_process(np.full((480, 640), 90, dtype=np.uint8)))
+
+
+class FaceTrackerTests(unittest.TestCase):
+    ANA = MatchResult("Ana", 0.3, True)
+
+    def test_iou(self):
+        box = (100, 200, 200, 100)
+        self.assertEqual(iou(box, box), 1.0)
+        self.assertEqual(iou(box, (300, 400, 400, 300)), 0.0)
+        self.assertAlmostEqual(iou(box, (100, 250, 200, 150)), 50 / 150)
+
+    def test_confident_track_reuses_identity(self):
+        tracker = FaceTracker(refresh_interval=10.0)
+        [track] = tracker.update([(100, 200, 200, 100)], now=0.0)
+        self.assertTrue(track.needs_encoding)
+        tracker.assign([track], [self.ANA], now=0.0)
+        [same] = tracker.update([(102, 202, 202, 102)], now=0.1)
+        self.assertIs(same, track)
+        self.assertFalse(same.needs_encoding)
+        self.assertEqual(same.match, self.ANA)
+        self.assertEqual((tracker.encoded, tracker.reused), (1, 1))
+
+    def test_refresh_and_large_moves_reencode(self):
+        tracker = FaceTracker(min_confident_iou=0.6, refresh_interval=1.0)
+        [track] = tracker.update([(100, 200, 200, 100)], now=0.0)
+        tracker.assign([track], [self.ANA], now=0.0)
+        self.assertTrue(tracker.update([(100, 200, 200, 100)], now=1.5)[0].needs_encoding)
+        tracker.assign([track], [self.ANA], now=1.5)
+        # IoU ~0.43: același track, dar sub pragul de încredere
+        [moved] = tracker.update([(100, 240, 200, 140)], now=1.6)
+        self.assertIs(moved, track)
+        self.assertTrue(moved.needs_encoding)
+
+    def test_each_detection_gets_its_own_track(self):
+        tracker = FaceTracker()
+        tracks = tracker.update([(100, 200, 200, 100), (100, 500, 200, 400)], now=0.0)
+        self.assertNotEqual(tracks[0].track_id, tracks[1].track_id)
+        swapped = tracker.update([(100, 500, 200, 400), (100, 200, 200, 100)], now=0.1)
+        self.assertEqual([t.track_id for t in swapped], [tracks[1].track_id, tracks[0].track_id])
+
+    def test_missed_tracks_expire(self):
+        tracker = FaceTracker(max_missed=2)
+        [track] = tracker.update([(100, 200, 200, 100)], now=0.0)
+        tracker.update([], now=0.1)
+        tracker.update([], now=0.2)
+        self.assertEqual(tracker.tracks, [track])
+        tracker.update([], now=0.3)
+        self.assertEqual(tracker.tracks, [])
+        [new] = tracker.update([(100, 200, 200, 100)], now=0.4)
+        self.assertNotEqual(new.track_id, track.track_id)
+
+    def test_invalidate_forces_reencoding(self):
+        tracker = FaceTracker(refresh_interval=10.0)
+        [track] = tracker.update([(100, 200, 200, 100)], now=0.0)
+        tracker.assign([track], [self.ANA], now=0.0)
+        tracker.invalidate()
+        [same] = tracker.update([(100, 200, 200, 100)], now=0.1)
+        self.assertTrue(same.needs_encoding)
+        self.assertIsNone(same.match)
+
+
+def face_crop(seed, noise=0):
+    """Crop RGB cu o „față” netedă (contraste mari între celulele dHash), opțional cu zgomot."""
+    rng = np.random.default_rng(seed)
+    face = cv2.resize(rng.integers(0, 255, (8, 9, 3), dtype=np.uint8), (90, 80), interpolation=cv2.INTER_NEAREST)
+    if noise:
+        face = np.clip(face.astype(int) + rng.integers(-noise, noise + 1, face.shape), 0, 255).astype(np.uint8)
+    crop = np.zeros((120, 130, 3), dtype=np.uint8)
+    crop[20:100, 20:110] = face
+    return crop, (20, 110, 100, 20)
+
+
+class EncodingCacheTests(unittest.TestCase):
+    BOX = (100, 200, 200, 100)
+
+    def setUp(self):
+        self.cache = EncodingCache(max_entries=2, ttl=2.0, max_distance=6, min_iou=0.5)
+
+    def encode(self, crops, boxes, now, names):
+        """Un frame: ``lookup``, apoi ``fill`` cu câte o encodare pentru fiecare miss."""
+        keys, entries = self.cache.lookup(crops, boxes, now=now)
+        misses = [name for name, entry in zip(names, entries) if entry is None]
+        encodings = [np.full(128, i, dtype=np.float32) for i, _ in enumerate(misses)]
+        matches = [MatchResult(name, 0.3, False) for name in misses]
+        results = self.cache.fill(keys, entries, encodings, matches, encode_seconds=0.02 * len(misses), now=now)
+        return [entry is not None for entry in entries], [r.name for r in results]
+
+    def test_face_hash_is_stable_under_noise(self):
+        crop, location = face_crop(1)
+        noisy, _ = face_crop(1, noise=3)
+        other, _ = face_crop(2)
+        self.assertLessEqual(hamming_distance(face_hash(crop, location), face_hash(noisy, location)), 2)
+        self.assertGreater(hamming_distance(face_hash(crop, location), face_hash(other, location)), 6)
+
+    def test_near_identical_face_is_a_hit(self):
+        self.assertEqual(self.encode([face_crop(1)], [self.BOX], 0.0, ["Ana"]), ([False], ["Ana"]))
+        shifted = (102, 203, 202, 103)
+        self.assertEqual(self.encode([face_crop(1, noise=3)], [shifted], 0.1, ["x"]), ([True], ["Ana"]))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertAlmostEqual(self.cache.saved_seconds, 0.02)
+
+    def test_other_face_or_other_place_is_a_miss(self):
+        self.encode([face_crop(1)], [self.BOX], 0.0, ["Ana"])
+        self.assertEqual(self.encode([face_crop(2)], [self.BOX], 0.1, ["Bogdan"]), ([False], ["Bogdan"]))
+        # Aceeași față, dar caseta abia se suprapune (IoU sub min_iou)
+        self.assertEqual(self.encode([face_crop(1)], [(100, 260, 200, 160)], 0.2, ["Carmen"]), ([False], ["Carmen"]))
+
+    def test_entries_expire_after_ttl(self):
+        self.encode([face_crop(1)], [self.BOX], 0.0, ["Ana"])
+        self.assertEqual(self.encode([face_crop(1)], [self.BOX], 1.9, ["x"])[0], [True])
+        # Un hit nu prelungește intrarea
+        self.assertEqual(self.encode([face_crop(1)], [self.BOX], 2.0, ["Ana"])[0], [False])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        far = (100, 600, 200, 500)
+        self.encode([face_crop(1), face_crop(2)], [self.BOX, far], 0.0, ["Ana", "Bogdan"])
+        self.assertEqual(self.encode([face_crop(1)], [self.BOX], 0.1, ["x"])[0], [True]) # Ana devine cea mai recentă
+        self.encode([face_crop(3)], [(100, 900, 200, 800)], 0.2, ["Carmen"])
+        self.assertEqual(len(self.cache), 2)
+        hits, names = self.encode([face_crop(1), face_crop(2)], [self.BOX, far], 0.3, ["x", "Bogdan"])
+        self.assertEqual((hits, names), ([True, False], ["Ana", "Bogdan"]))
+
+    def test_clear_forgets_everything(self):
+        self.encode([face_crop(1)], [self.BOX], 0.0, ["Ana"])
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.encode([face_crop(1)], [self.BOX], 0.1, ["Ana"])[0], [False])
+
+
+class EnrollTests(unittest.TestCase):
+    PARAMS = {"detection_model": "hog", "upsample": 1, "num_jitters": 1, "encoding_model": "small"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dataset = os.path.join(tmp.name, "dataset")
+        self.output = os.path.join(tmp.name, "encodings.gallery")
+        self.encoded = []
+        self.failing = set()
+        # Encodarea rulează în proces (thread-uri), ca apelurile să poată fi numărate
+        for target, replacement in (("encode_image", self.fake_encode), ("ProcessPoolExecutor", ThreadPoolExecutor)):
+            patcher = mock.patch.object(enroll, target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_encode(self, path, **params):
+        rel_path = os.path.relpath(path, self.dataset)
+        self.encoded.append(rel_path)
+        if rel_path in self.failing:
+            raise RuntimeError("corrupt image")
+        with open(path, "rb") as f:
+            seed = int.from_bytes(f.read()[:4], "big")
+        return np.random.default_rng(seed).normal(0, 0.1, (1, 128)).astype(np.float32)
+
+    def write_image(self, rel_path, content):
+        path = os.path.join(self.dataset, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def build(self, params=None):
+        self.encoded = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            enroll.build_gallery(self.dataset, self.output, params or self.PARAMS, workers=2)
+        matrix, names, metadata = load_gallery(self.output)
+        return sorted(self.encoded), names, {image["path"]: image for image in metadata["images"]}, matrix
+
+    def test_only_new_or_changed_images_are_encoded(self):
+        self.write_image("Ana/1.jpg", b"ana1")
+        self.write_image("Ana/2.jpg", b"ana2")
+        self.write_image("Bogdan/1.jpg", b"bog1")
+        encoded, names, images, first = self.build()
+        self.assertEqual(encoded, ["Ana/1.jpg", "Ana/2.jpg", "Bogdan/1.jpg"])
+        self.assertEqual(names, ["Ana", "Ana", "Bogdan"])
+
+        self.write_image("Ana/2.jpg", b"ana2-new")
+        for name in os.listdir(os.path.join(self.dataset, "Bogdan")):
+            os.remove(os.path.join(self.dataset, "Bogdan", name))
+        os.rmdir(os.path.join(self.dataset, "Bogdan"))
+        self.write_image("Carmen/1.jpg", b"car1")
+        self.failing.add(os.path.join("Carmen", "1.jpg"))
+        encoded, names, images, second = self.build()
+        self.assertEqual(encoded, ["Ana/2.jpg", "Carmen/1.jpg"])
+        # Bogdan a dispărut, iar imaginea lui Carmen care a eșuat lipsește din galerie
+        self.assertEqual(names, ["Ana", "Ana"])
+        self.assertEqual(sorted(images), ["Ana/1.jpg", "Ana/2.jpg"])
+        np.testing.assert_array_equal(second[0], first[0]) # Encodarea imaginii neschimbate, refolosită
+
+        self.failing.clear()
+        encoded, names, images, _ = self.build()
+        self.assertEqual(encoded, ["Carmen/1.jpg"]) # Doar imaginea eșuată anterior
+        self.assertEqual(names, ["Ana", "Ana", "Carmen"])
+
+    def test_changed_parameters_reencode_everything(self):
+        self.write_image("Ana/1.jpg", b"ana1")
+        self.build()
+        self.assertEqual(self.build(dict(self.PARAMS, num_jitters=2))[0], ["Ana/1.jpg"])
+        self.assertEqual(self.build(dict(self.PARAMS, num_jitters=2))[0], [])
+
+
+class GalleryReloadTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.gallery_path = os.path.join(tmp.name, "encodings.gallery")
+        self.authorized_path = os.path.join(tmp.name, "authorized_names.json")
+        self.known = np.random.default_rng(4).normal(0, 0.1, (3, 128)).astype(np.float32)
+        write_gallery(self.gallery_path, self.known, ["Ana", "Bogdan", "Carmen"])
+        self.write_authorized(["Ana"])
+        self.swapped = []
+        self.reloader = GalleryReloader(self.gallery_path, self.authorized_path, on_swap=self.swapped.append,
+                                        poll_interval=0.05)
+        self.matcher = self.reloader.load()
+        logging.getLogger("gallery_reload").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("gallery_reload").setLevel, logging.NOTSET)
+
+    def write_authorized(self, names):
+        with open(self.authorized_path, "w", encoding="utf-8") as f:
+            json.dump(names, f) # Listele din teste au lungimi diferite, deci și semnătura (mtime, size) diferă
+
+    def test_changed_files_swap_in_a_new_matcher(self):
+        self.assertFalse(self.reloader.changed())
+        self.write_authorized(["Ana", "Bogdan"])
+        self.assertTrue(self.reloader.changed())
+        matcher = self.reloader.reload()
+        self.assertEqual(self.swapped, [matcher])
+        self.assertIsNot(matcher, self.matcher)
+        self.assertEqual(matcher.authorized_names, {"Ana", "Bogdan"})
+        # Matcher-ul vechi, încă folosit de frame-ul în curs, rămâne neschimbat
+        self.assertEqual(self.matcher.authorized_names, {"Ana"})
+        self.assertFalse(self.reloader.changed())
+
+    def test_invalid_files_keep_the_current_gallery(self):
+        with open(self.authorized_path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertIsNone(self.reloader.reload())
+        self.assertEqual((self.swapped, self.reloader.failures), ([], 1))
+        # Nu reîncercăm până la următoarea modificare
+        self.assertFalse(self.reloader.changed())
+
+    def test_background_thread_reloads_on_change_and_on_request(self):
+        self.reloader.start()
+        self.addCleanup(self.reloader.stop, 2.0)
+        self.write_authorized(["Carmen"])
+        self.assertTrue(wait_for(lambda: len(self.swapped) == 1))
+        self.assertEqual(self.swapped[0].authorized_names, {"Carmen"})
+        self.reloader.request_reload()
+        self.assertTrue(wait_for(lambda: len(self.swapped) == 2))
+
+    def test_gallery_written_later_replaces_the_legacy_pickle(self):
+        os.remove(self.gallery_path)
+        pickle_path = os.path.join(os.path.dirname(self.gallery_path), "encodings.pickle")
+        with open(pickle_path, "wb") as f:
+            pickle.dump({"encodings": list(self.known[:1]), "names": ["Ana"]}, f)
+        reloader = GalleryReloader(self.gallery_path, self.authorized_path, on_swap=self.swapped.append,
+                                   fallback_path=pickle_path)
+        self.assertEqual(len(reloader.load()), 1)
+        self.assertEqual(reloader.loaded_path, pickle_path)
+        self.assertFalse(reloader.changed())
+
+        write_gallery(self.gallery_path, self.known, ["Ana", "Bogdan", "Carmen"])
+        self.assertTrue(reloader.changed())
+        self.assertEqual(len(reloader.reload()), 3)
+        self.assertEqual(reloader.loaded_path, self.gallery_path)
+
+    def test_swap_invalidates_tracks_and_cached_encodings(self):
+        tracker, cache = FaceTracker(refresh_interval=10.0), EncodingCache()
+        recognizer = Recognizer(self.matcher, AdaptiveScaler(), tracker=tracker, encoding_cache=cache)
+        box = (100, 200, 200, 100)
+        [track] = tracker.update([box], now=0.0)
+        tracker.assign([track], [MatchResult("Ana", 0.2, True)], now=0.0)
+        crop = (np.random.default_rng(0).integers(0, 255, (120, 120, 3), dtype=np.uint8), (10, 110, 110, 10))
+        keys, entries = cache.lookup([crop], [box], now=0.0)
+        cache.fill(keys, entries, [self.known[0]], [MatchResult("Ana", 0.2, True)], now=0.0)
+        self.assertIs(recognizer.snapshot(), self.matcher)
+        self.assertEqual(len(cache), 1)
+
+        self.write_authorized([])
+        self.reloader.on_swap = recognizer.swap_matcher
+        new_matcher = self.reloader.reload()
+        # Schimbarea se aplică abia la începutul frame-ului următor, din thread-ul recunoașterii
+        self.assertEqual(len(cache), 1)
+        self.assertIs(recognizer.snapshot(), new_matcher)
+        self.assertEqual(len(cache), 0)
+        self.assertTrue(tracker.update([box], now=0.1)[0].needs_encoding)
+        self.assertFalse(new_matcher.match([self.known[0]])[0].authorized)
+
+
+class LogUtilsTests(unittest.TestCase):
+    """Modulul este folosit și de server (``settings.LOGGING``)."""
+
+    def make_record(self, level=logging.ERROR, msg="Status send failed: %s", args=("timeout",), **fields):
+        record = logging.LogRecord("status_publisher", level, __file__, 1, msg, args, None)
+        record.__dict__.update(fields)
+        return record
+
+    def test_rate_limit_reports_suppressed_count(self):
+        limiter = RateLimitFilter(burst=2, period=60.0)
+        results = [limiter.filter(self.make_record(args=(i,))) for i in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertTrue(all(limiter.filter(self.make_record(logging.INFO)) for _ in range(5)))
+        limiter.period = 0.0
+        record = self.make_record()
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_rate_limit_sampling(self):
+        limiter = RateLimitFilter(burst=1, period=60.0, sample_every=3)
+        results = [limiter.filter(self.make_record()) for _ in range(7)]
+        self.assertEqual(results, [True, False, False, True, False, False, True])
+
+    def test_key_value_formatter(self):
+        formatter = KeyValueFormatter("%(levelname)s %(message)s")
+        text = formatter.format(self.make_record(device="door 2", suppressed=4))
+        self.assertEqual(text, 'ERROR Status send failed: timeout device="door 2" suppressed=4')
+        entry = json.loads(KeyValueFormatter(json_lines=True).format(self.make_record(device="door-2")))
+        self.assertEqual((entry["message"], entry["device"]), ("Status send failed: timeout", "door-2"))
+
+    def test_queue_handler_never_blocks(self):
+        stream = io.StringIO()
+        handler = QueueLogHandler(stream, maxsize=2)
+        handler.setFormatter(KeyValueFormatter("%(message)s"))
+        self.addCleanup(handler.close)
+        handler._listener.stop() # Nimeni nu golește coada: încap doar 2 mesaje
+        for i in range(5):
+            handler.handle(self.make_record(args=(i,)))
+        self.assertEqual(handler.dropped, 3)
+        handler._listener.start()
+        handler.handle(self.make_record(args=("again",)))
+        handler.close()
+        self.assertEqual(stream.getvalue().splitlines(), [
+            "Status send failed: 0", "Status send failed: 1", "Status send failed: again dropped=3"])
+
+    def test_configure_logging_replaces_root_handlers(self):
+        root = logging.getLogger()
+        saved = (root.handlers[:], root.level)
+        self.addCleanup(lambda: (setattr(root, "handlers", saved[0]), root.setLevel(saved[1])))
+        stream = io.StringIO()
+        handler = configure_logging("WARNING", stream=stream, burst=1)
+        self.addCleanup(handler.close)
+        self.assertEqual(root.handlers, [handler])
+        for _ in range(3):
+            logging.getLogger("status_publisher").error("Server unreachable: %s", "timeout")
+        logging.getLogger("status_publisher").info("not shown")
+        handler.close()
+        # Nivelul INFO e filtrat, iar cele două erori repetate sunt suprimate
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith("ERROR [status_publisher] Server unreachable: timeout"))
+
+
+@unittest.skipIf(DoorActuator is None, "gpiozero is not installed")
+class DoorActuatorTests(unittest.TestCase):
+    def make_actuator(self, auto_close_delay=5.0):
+        actuator = DoorActuator(17, 27, 18, pin_factory=MockFactory(pin_class=MockPWMPin),
+                                auto_close_delay=auto_close_delay)
+        logging.getLogger("door_actuator").setLevel(logging.CRITICAL)
+        self.addCleanup(logging.getLogger("door_actuator").setLevel, logging.NOTSET)
+        actuator.start()
+        self.addCleanup(lambda: actuator.is_alive() and actuator.stop(2.0))
+        return actuator
+
+    def assert_locked(self, actuator):
+        self.assertFalse(actuator.is_open)
+        self.assertAlmostEqual(actuator.servo.value, actuator.locked_value, places=2)
+        self.assertEqual((actuator.green_led.is_lit, actuator.red_led.is_lit), (False, True))
+
+    def test_open_and_close(self):
+        actuator = self.make_actuator()
+        self.assert_locked(actuator)
+        actuator.open()
+        self.assertTrue(wait_for(lambda: actuator.is_open))
+        self.assertAlmostEqual(actuator.servo.value, actuator.unlocked_value, places=2)
+        self.assertEqual((actuator.green_led.is_lit, actuator.red_led.is_lit), (True, False))
+        self.assertGreater(actuator.seconds_until_close, 4.0)
+        actuator.close()
+        self.assertTrue(wait_for(lambda: not actuator.is_open))
+        self.assert_locked(actuator)
+        self.assertIsNone(actuator.seconds_until_close)
+        self.assertEqual((actuator.opened, actuator.auto_closed), (1, 0))
+
+    def test_auto_close_after_delay(self):
+        actuator = self.make_actuator(auto_close_delay=0.2)
+        started = time.monotonic()
+        actuator.open()
+        self.assertTrue(wait_for(lambda: actuator.auto_closed == 1))
+        elapsed = time.monotonic() - started
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1.0)
+        self.assert_locked(actuator)
+
+    def test_reopening_extends_the_deadline(self):
+        actuator = self.make_actuator(auto_close_delay=0.5)
+        actuator.open()
+        time.sleep(0.3)
+        reopened = time.monotonic()
+        actuator.open("recognition")
+        time.sleep(0.35) # Peste termenul primei deschideri
+        self.assertTrue(actuator.is_open)
+        self.assertTrue(wait_for(lambda: not actuator.is_open))
+        self.assertGreaterEqual(time.monotonic() - reopened, 0.5)
+        self.assertEqual((actuator.opened, actuator.auto_closed), (1, 1))
+
+    def test_stop_joins_the_thread_and_releases_pins(self):
+        actuator = self.make_actuator()
+        actuator.open()
+        self.assertTrue(wait_for(lambda: actuator.is_open))
+        actuator.stop(2.0)
+        self.assertFalse(actuator.is_alive())
+        self.assertTrue(all(device.closed for device in (actuator.servo, actuator.green_led, actuator.red_led)))
+
+
+def http_response(status_code, text=""):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode("utf-8")
+    response.url = "http://server/"
+    return response
+
+
+class FakeSession:
+    """Înlocuiește ``requests.Session``: răspunde cu ``reply(url, payloads)`` și notează cererile."""
+
+    def __init__(self, reply=None):
+        self.reply = reply or (lambda url, payloads: http_response(200))
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, url, timeout=None, **kwargs):
+        if "json" in kwargs:
+            payloads = [kwargs["json"]]
+        else:
+            payloads = [json.loads(line) for line in gzip.decompress(kwargs["data"]).splitlines()]
+        with self.lock:
+            self.requests.append((url, payloads))
+        result = self.reply(url, payloads)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def sent(self):
+        with self.lock:
+            return [payload["n"] for _, payloads in self.requests for payload in payloads]
+
+    def close(self):
+        pass
+
+
+class StatusPublisherTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.tmp.name, "spool.jsonl")
+        publisher_logger = logging.getLogger("status_publisher")
+        self.addCleanup(publisher_logger.setLevel, publisher_logger.level)
+        publisher_logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_publisher(self, reply=None, **kwargs):
+        options = dict(coalesce_interval=0.05, backoff_initial=0.01, backoff_max=0.04)
+        options.update(kwargs)
+        publisher = StatusPublisher("http://server/single", **options)
+        publisher.session = FakeSession(reply)
+        return publisher
+
+    def test_coalescing_sends_only_the_latest_status(self):
+        publisher = self.make_publisher()
+        for n in range(3):
+            publisher.submit({"n": n})
+        publisher.start()
+        self.assertTrue(wait_for(lambda: publisher.sent == 1))
+        publisher.stop()
+        self.assertEqual(publisher.session.sent(), [2])
+        self.assertEqual(publisher.coalesced, 2)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        replies = iter([requests.exceptions.ConnectionError(), http_response(503), http_response(200)])
+        publisher = self.make_publisher(lambda url, payloads: next(replies))
+        publisher.start()
+        publisher.submit({"n": 1})
+        self.assertTrue(wait_for(lambda: publisher.sent == 1))
+        publisher.stop()
+        self.assertEqual(publisher.session.sent(), [1, 1, 1])
+        self.assertEqual((publisher.failed, publisher.rejected), (2, 0))
+        self.assertTrue(publisher.online)
+
+    def test_backoff_doubles_up_to_the_limit(self):
+        publisher = self.make_publisher(lambda url, payloads: requests.exceptions.ConnectionError())
+        delays = []
+        for _ in range(5):
+            publisher._post({"n": 1})
+            delays.append(publisher._backoff)
+        self.assertEqual(delays, [0.01, 0.02, 0.04, 0.04, 0.04])
+        self.assertFalse(publisher.online)
+
+    def test_client_errors_are_dropped_not_retried(self):
+        def reply(url, payloads):
+            return http_response(400, "Invalid 'status'") if payloads[0]["n"] == 1 else http_response(200)
+
+        publisher = self.make_publisher(reply, coalesce_interval=0.0)
+        logging.getLogger("status_publisher").setLevel(logging.NOTSET)
+        with self.assertLogs("status_publisher", level="ERROR") as logs:
+            publisher.start()
+            publisher.submit({"n": 1})
+            self.assertTrue(wait_for(lambda: publisher.rejected == 1))
+        self.assertIn("Invalid 'status'", logs.output[0])
+        publisher.submit({"n": 2})
+        self.assertTrue(wait_for(lambda: publisher.sent == 1))
+        publisher.stop()
+        self.assertEqual(publisher.session.sent(), [1, 2])
+        self.assertTrue(publisher.online)
+        self.assertEqual((publisher.failed, publisher.backlog), (0, 0))
+
+    def test_rejected_bulk_is_resent_one_by_one(self):
+        def reply(url, payloads):
+            if url.endswith("bulk") or payloads[0]["n"] == 2:
+                return http_response(413 if url.endswith("bulk") else 400)
+            return http_response(200)
+
+        publisher = self.make_publisher(reply, bulk_url="http://server/bulk")
+        self.assertEqual(publisher._deliver([{"n": 1}, {"n": 2}, {"n": 3}]), 3)
+        self.assertEqual([url for url, _ in publisher.session.requests][0], "http://server/bulk")
+        self.assertEqual((publisher.sent, publisher.rejected), (2, 1))
+
+    def test_overflow_is_spooled_and_drained_in_order(self):
+        online = threading.Event()
+
+        def reply(url, payloads):
+            return http_response(200) if online.is_set() else requests.exceptions.ConnectionError()
+
+        publisher = self.make_publisher(reply, max_queue=2, spool_path=self.spool, bulk_url="http://server/bulk",
+                                        bulk_size=2)
+        for n in range(5):
+            publisher._enqueue({"n": n})
+        self.assertEqual((len(publisher._outbox), publisher._spooled, publisher.backlog), (2, 3, 5))
+        self.assertFalse(publisher._drain_spool())
+        self.assertEqual(publisher._spooled, 3) # Nimic pierdut la eroare
+
+        online.set()
+        publisher.start()
+        self.assertTrue(wait_for(lambda: publisher.backlog == 0))
+        publisher.stop()
+        # Prima cerere (eșuată) conținea primul lot din spool; apoi totul, în ordine
+        self.assertEqual(publisher.session.sent()[2:], [0, 1, 2, 3, 4])
+        self.assertFalse(os.path.exists(self.spool))
+
+    def test_partial_drain_keeps_the_rest_of_the_spool(self):
+        def reply(url, payloads):
+            return http_response(200) if payloads[0]["n"] < 2 else requests.exceptions.Timeout()
+
+        publisher = self.make_publisher(reply, spool_path=self.spool)
+        for n in range(4):
+            publisher._spool({"n": n})
+        self.assertFalse(publisher._drain_spool())
+        self.assertEqual([p["n"] for p in publisher._read_spool()], [2, 3])
+        self.assertEqual(publisher._spooled, 2)
+
+    def test_stop_spools_unsent_statuses(self):
+        publisher = self.make_publisher(lambda url, payloads: requests.exceptions.ConnectionError(),
+                                        spool_path=self.spool, backoff_initial=10.0, backoff_max=10.0)
+        publisher.start()
+        publisher.submit({"n": 1})
+        self.assertTrue(wait_for(lambda: publisher.failed == 1))
+        publisher.submit({"n": 2})
+        publisher.stop()
+        self.assertEqual([p["n"] for p in publisher._read_spool()], [1, 2])
+
+
+    def test_stop_during_a_send_leaves_the_spool_to_the_worker(self):
+        sending, release = threading.Event(), threading.Event()
+
+        def reply(url, payloads):
+            sending.set()
+            release.wait(3)
+            return requests.exceptions.Timeout()
+
+        publisher = self.make_publisher(reply, spool_path=self.spool, coalesce_interval=0.0)
+        publisher.start()
+        publisher.submit({"n": 1})
+        self.assertTrue(sending.wait(3))
+        publisher.submit({"n": 2})
+        publisher.stop(timeout=0.05)
+        # Thread-ul este încă în cerere: stop() nu atinge spool-ul
+        self.assertTrue(publisher.is_alive())
+        self.assertFalse(os.path.exists(self.spool))
+        release.set()
+        publisher.join(3)
+        self.assertFalse(publisher.is_alive())
+        self.assertEqual([p["n"] for p in publisher._read_spool()], [1, 2])
+        self.assertEqual(publisher.session.sent(), [1])
+
+
+class FakeMQTTClient:
+    """Stub pentru clientul paho: reține publicările și întoarce codul ``rc`` dat."""
+
+    def __init__(self, rc=mqtt.MQTT_ERR_SUCCESS, connected=True):
+        self.rc = rc
+        self.connected = connected
+        self.max_queued = None
+        self.published = []
+
+    def max_queued_messages_set(self, count):
+        self.max_queued = count
+
+    def is_connected(self):
+        return self.connected
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.published.append((topic, json.loads(payload), qos, retain))
+        return mock.Mock(rc=self.rc)
+
+
+class MQTTStatusPublisherTests(unittest.TestCase):
+    def setUp(self):
+        publisher_logger = logging.getLogger("status_publisher")
+        self.addCleanup(publisher_logger.setLevel, publisher_logger.level)
+        publisher_logger.setLevel(logging.CRITICAL)
+
+    def test_submit_publishes_retained_status(self):
+        client = FakeMQTTClient()
+        publisher = MQTTStatusPublisher(client, "usa/inteligenta/status", max_queue=50)
+        publisher.start()
+        publisher.submit({"status": "AUTHORIZED", "names": ["alice"]})
+        publisher.stop()
+        self.assertEqual(client.max_queued, 50)
+        self.assertEqual(client.published,
+                         [("usa/inteligenta/status", {"status": "AUTHORIZED", "names": ["alice"]}, 1, True)])
+        self.assertEqual((publisher.sent, publisher.dropped, publisher.backlog), (1, 0, 0))
+
+    def test_online_follows_client_connection(self):
+        client = FakeMQTTClient(connected=False)
+        publisher = MQTTStatusPublisher(client, "status")
+        self.assertFalse(publisher.online)
+        client.connected = True
+        self.assertTrue(publisher.online)
+
+    def test_disconnected_client_queues_message(self):
+        # paho ține mesajul QoS 1 și îl trimite la reconectare
+        client = FakeMQTTClient(rc=mqtt.MQTT_ERR_NO_CONN, connected=False)
+        publisher = MQTTStatusPublisher(client, "status")
+        publisher.submit({"status": "UNKNOWN"})
+        self.assertEqual((publisher.sent, publisher.dropped), (1, 0))
+
+    def test_full_client_queue_drops_message(self):
+        client = FakeMQTTClient(rc=mqtt.MQTT_ERR_QUEUE_SIZE)
+        publisher = MQTTStatusPublisher(client, "status")
+        publisher.submit({"status": "UNKNOWN"})
+        self.assertEqual((publisher.sent, publisher.dropped), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AccessEvent
+
+
+@admin.register(AccessEvent)
+class AccessEventAdmin(admin.ModelAdmin):
+    list_display = ("event_time", "device_id", "person_name", "status", "timestamp")
+    list_filter = ("status", "device_id")
+    search_fields = ("person_name",)
+    date_hierarchy = "event_time"
+    show_full_result_count = False  # Evităm COUNT(*) pe tabele mari
@@ -0,0 +1,252 @@
+# pi_listener/benchmark.py
+"""Benchmark de încărcare pentru căile de status și de comenzi ale serverului.
+
+Simulează, în același proces (test client Django, fără rețea):
+
+* N Pi-uri virtuale care trimit statusuri cu o rată dată (``update_status/``
+  sau, cu ``bulk_size``, ``update_status/bulk/``);
+* M dashboard-uri care fac polling pe ``status/json/`` (cu ``If-None-Match``)
+  sau ascultă stream-ul SSE (prin clientul ASGI);
+* comenzi de ușă prin ``send_command/``, publicate către un ``LocalBroker``.
+
+Rezultatul (``run_benchmark``) este un dict serializabil JSON: throughput și
+latențe p50/p95/p99 pentru fiecare operație. Folosit de ``manage.py bench_server``.
+"""
+import asyncio
+import datetime
+import json
+import math
+import platform
+import random
+import threading
+import time
+
+import django
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from .event_log import access_event_writer
+from .local_broker import LocalBroker
+from .mqtt_publisher import reset_mqtt_manager
+from .status import reset_state_store
+
+STATUS_SEQUENCE = [
+    ("N/A", "no_face"),
+    ("Abel Caluseri", "authorized"),
+    ("Unknown", "unknown"),
+    ("Alexandra Anghel", "authorized"),
+    ("Intrus", "unauthorized"),
+]
+
+
+def percentile(sorted_values, q):
+    """Percentila q (0-100), metoda nearest-rank."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.counters = {}
+
+    def add(self, seconds, ok=True, **counters):
+        with self._lock:
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.errors += 1
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self, duration):
+        with self._lock:
+            values = sorted(self.latencies)
+            result = {
+                "count": len(values),
+                "errors": self.errors,
+                "throughput": len(values) / duration if duration else 0.0,
+                "mean_ms": 1000.0 * sum(values) / len(values) if values else None,
+                "p50_ms": None,
+                "p95_ms": None,
+                "p99_ms": None,
+                "max_ms": 1000.0 * values[-1] if values else None,
+            }
+            for q in (50, 95, 99):
+                value = percentile(values, q)
+                result[f"p{q}_ms"] = 1000.0 * value if value is not None else None
+            result.update(self.counters)
+            return result
+
+
+def _paced(rate, stop_at):
+    """Momentele la care un worker trimite următoarea cerere (rate=0: cât de repede se poate)."""
+    start = time.monotonic()
+    k = 0
+    while True:
+        if rate > 0:
+            delay = start + k / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if time.monotonic() >= stop_at:
+            return
+        yield k
+        k += 1
+
+
+def _status_payload(device_id, rng):
+    person_name, status_msg = rng.choice(STATUS_SEQUENCE)
+    return {"device_id": device_id, "person_name": person_name, "status": status_msg,
+            "pi_timestamp": datetime.datetime.now().astimezone().isoformat()}
+
+
+def _virtual_pi(device_id, rate, bulk_size, stop_at, stats, seed):
+    client = Client()
+    rng = random.Random(seed)
+    single_url = reverse('pi_listener:update_status')
+    bulk_url = reverse('pi_listener:update_status_bulk')
+    for _ in _paced(rate, stop_at):
+        if bulk_size:
+            body = "\n".join(json.dumps(_status_payload(device_id, rng)) for _ in range(bulk_size))
+            started = time.perf_counter()
+            response = client.post(bulk_url, body, content_type="application/x-ndjson")
+            stats.add(time.perf_counter() - started, response.status_code == 200, statuses=bulk_size)
+        else:
+            payload = json.dumps(_status_payload(device_id, rng))
+            started = time.perf_counter()
+            response = client.post(single_url, payload, content_type="application/json")
+            stats.add(time.perf_counter() - started, response.status_code == 200, statuses=1)
+
+
+def _poller(device_id, interval, stop_at, stats):
+    client = Client()
+    url = reverse('pi_listener:status_json')
+    etag = None
+    for _ in _paced(1.0 / interval if interval else 0, stop_at):
+        headers = {"if-none-match": etag} if etag else {}
+        started = time.perf_counter()
+        response = client.get(url, {"device": device_id}, headers=headers)
+        elapsed = time.perf_counter() - started
+        if response.status_code == 200:
+            etag = response["ETag"]
+        stats.add(elapsed, response.status_code in (200, 304), not_modified=int(response.status_code == 304))
+
+
+def _commander(device_ids, rate, stop_at, stats, seed):
+    client = Client()
+    rng = random.Random(seed)
+    url = reverse('pi_listener:send_door_command')
+    for _ in _paced(rate, stop_at):
+        command = rng.choice(["deschide", "inchide"])
+        started = time.perf_counter()
+        response = client.get(url, {"command": command, "device": rng.choice(device_ids)})
+        stats.add(time.perf_counter() - started, response.status_code == 302)
+
+
+async def _stream_dashboard(device_id, stop_at, stats):
+    """Latența de livrare: de la pi_timestamp (trimiterea statusului) până la sosirea delta-ului SSE."""
+    response = await AsyncClient().get(reverse('pi_listener:status_stream'), {"device": device_id})
+    stream = aiter(response.streaming_content)
+    try:
+        while True:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                chunk = await asyncio.wait_for(anext(stream), remaining)
+            except (asyncio.TimeoutError, StopAsyncIteration):
+                return
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if not text.startswith("event: delta"):
+                continue
+            delta = json.loads(text.split("data: ", 1)[1])
+            if delta.get("pi_timestamp"):
+                sent = datetime.datetime.fromisoformat(delta["pi_timestamp"]).timestamp()
+                stats.add(max(0.0, time.time() - sent))
+    finally:
+        await stream.aclose()
+
+
+def _stream_dashboards(device_ids, stop_at, stats):
+    async def main():
+        await asyncio.gather(*(_stream_dashboard(device_id, stop_at, stats) for device_id in device_ids))
+    asyncio.run(main())
+
+
+def run_benchmark(pis=10, rate=5.0, duration=10.0, dashboards=5, dashboard_mode="poll", poll_interval=1.0,
+                  command_rate=1.0, bulk_size=0, state_store="pi_listener.state_store.LocalStateStore", seed=0):
+    """Rulează scenariul și returnează rezultatele. Trebuie apelat cu o bază de date de test."""
+    config = {
+        "pis": pis, "rate": rate, "duration": duration, "dashboards": dashboards,
+        "dashboard_mode": dashboard_mode, "poll_interval": poll_interval, "command_rate": command_rate,
+        "bulk_size": bulk_size, "state_store": state_store, "seed": seed,
+    }
+    device_ids = [f"bench-{i}" for i in range(max(1, pis))]
+    stats = {name: LatencyStats() for name in ("status_post", "dashboard", "door_command")}
+
+    with LocalBroker() as broker, override_settings(MQTT_BROKER_HOST=broker.host, MQTT_BROKER_PORT=broker.port,
+                                                    PI_STATE_STORE=state_store):
+        reset_mqtt_manager()
+        reset_state_store()
+        access_event_writer.clear()
+        written_before = access_event_writer.written
+        stop_at = time.monotonic() + duration
+        threads = [threading.Thread(target=_virtual_pi, name=f"bench-pi-{i}",
+                                    args=(device_ids[i], rate, bulk_size, stop_at, stats["status_post"], seed + i))
+                   for i in range(pis)]
+        watched = [device_ids[i % len(device_ids)] for i in range(dashboards)]
+        if dashboard_mode == "stream" and dashboards:
+            threads.append(threading.Thread(target=_stream_dashboards, name="bench-streams",
+                                            args=(watched, stop_at, stats["dashboard"])))
+        else:
+            threads.extend(threading.Thread(target=_poller, name=f"bench-poll-{i}",
+                                            args=(device_id, poll_interval, stop_at, stats["dashboard"]))
+                           for i, device_id in enumerate(watched))
+        if command_rate > 0:
+            threads.append(threading.Thread(target=_commander, name="bench-commands",
+                                            args=(device_ids, command_rate, stop_at, stats["door_command"], seed)))
+
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        access_event_writer.flush()
+        delivered = len(broker.messages)
+        reset_mqtt_manager()
+        reset_state_store()
+
+    operations = {name: s.summary(elapsed) for name, s in stats.items()}
+    operations["door_command"]["delivered"] = delivered
+    operations["status_post"]["access_events_written"] = access_event_writer.written - written_before
+    return {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "started_at": datetime.datetime.now().isoformat(),
+        },
+        "elapsed": elapsed,
+        "operations": operations,
+    }
+
+
+def compare_results(baseline, current):
+    """Raport (nume, metrică, valoare de bază, valoare curentă, raport) pentru metricile principale."""
+    rows = []
+    for name, ops in current["operations"].items():
+        base_ops = baseline.get("operations", {}).get(name)
+        if not base_ops:
+            continue
+        for metric in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+            old, new = base_ops.get(metric), ops.get(metric)
+            if old and new is not None:
+                rows.append((name, metric, old, new, new / old))
+    return rows
@@ -0,0 +1,118 @@
+# pi_listener/broadcast.py
+"""Punct unic de difuzare a schimbărilor de status către dashboard-uri (SSE).
+
+Fiecare ușă are propriul broadcaster (``get_broadcaster(device_id)``).
+Codul care modifică statusul apelează ``publish(...)`` cu starea curentă a ușii.
+Broadcaster-ul calculează doar câmpurile schimbate față
+de ultima difuzare și le pune în coada fiecărui abonat (câte o conexiune
+EventSource deschisă). Cozile sunt mărginite: un abonat lent nu blochează
+restul, ci primește la următoarea citire o stare completă în locul delta-urilor
+pierdute.
+"""
+import asyncio
+import threading
+
+# Câmpurile din starea ușii care ajung în browser
+PUBLIC_FIELDS = ("message", "person_name", "status", "received_at", "pi_timestamp", "show_buttons")
+
+RESYNC = object()
+
+
+def public_state(state):
+    return {field: state.get(field) for field in PUBLIC_FIELDS}
+
+
+class Subscription:
+    def __init__(self, broadcaster, loop, maxsize):
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _deliver(self, delta):
+        try:
+            self.queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # Abonat prea lent: renunțăm la delta-uri și cerem o stare completă
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout=None):
+        """Următoarea schimbare (dict), starea completă după o resincronizare, sau None la timeout."""
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if item is RESYNC:
+            return self.broadcaster.snapshot()
+        return item
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class StatusBroadcaster:
+    def __init__(self, queue_size=32):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._state = {}
+        self.version = 0
+
+    def subscribe(self):
+        """Creează un abonament legat de event loop-ul curent (apelat din cod async)."""
+        subscription = Subscription(self, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
+
+    def publish(self, state):
+        """Difuzează câmpurile schimbate. Poate fi apelat din orice thread."""
+        new_state = public_state(state)
+        with self._lock:
+            delta = {k: v for k, v in new_state.items() if self._state.get(k, RESYNC) != v}
+            if not delta:
+                return None
+            self._state = new_state
+            self.version += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, delta)
+            except RuntimeError:
+                # Event loop-ul abonatului s-a închis între timp
+                self.unsubscribe(subscription)
+        return delta
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def subscribed_devices():
+    """Ușile care au cel puțin un dashboard conectat."""
+    with _broadcasters_lock:
+        broadcasters = list(_broadcasters.items())
+    return [device_id for device_id, broadcaster in broadcasters if broadcaster.subscriber_count]
+
+
+def get_broadcaster(device_id):
+    """Broadcaster-ul unei uși (creat la prima folosire)."""
+    broadcaster = _broadcasters.get(device_id)
+    if broadcaster is None:
+        with _broadcasters_lock:
+            broadcaster = _broadcasters.setdefault(device_id, StatusBroadcaster())
+    return broadcaster
@@ -0,0 +1,217 @@
+# pi_listener/event_log.py
+"""Jurnalul evenimentelor de acces: scriere în loturi și interogare keyset.
+
+``update_status_view`` nu face câte un INSERT per POST: evenimentele sunt
+adunate în memorie și scrise de un thread de fundal cu ``bulk_create``,
+într-o singură tranzacție, la fiecare ``ACCESS_LOG_FLUSH_INTERVAL`` secunde
+sau când lotul atinge ``ACCESS_LOG_BATCH_SIZE``.
+
+Dacă scrierea eșuează (ex. SQLite "database is locked"), lotul revine în
+buffer și este reîncercat la următoarea scriere.
+
+Interogările folosesc paginare keyset pe (event_time, id), deci costul unei
+pagini nu crește cu numărul de rânduri sărite, ca la OFFSET. ``event_time``
+este momentul producerii statusului pe Pi (``pi_timestamp``), nu al primirii:
+statusurile trimise în lot după o pană rămân la locul lor în istoric.
+"""
+import atexit
+import base64
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .metrics import ACCESS_LOG_FLUSH_SECONDS, ACCESS_LOG_WRITTEN, registry
+from .models import AccessEvent
+
+logger = logging.getLogger(__name__)
+MAX_PAGE_SIZE = 500
+
+
+def parse_event_time(pi_timestamp):
+    """``pi_timestamp`` (ISO 8601) ca datetime cu fus orar, sau None dacă nu poate fi citit.
+
+    Fără offset, momentul este interpretat în fusul orar al serverului (TIME_ZONE).
+    """
+    if not pi_timestamp:
+        return None
+    try:
+        parsed = parse_datetime(pi_timestamp)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+class AccessEventWriter:
+    def __init__(self, batch_size=None, flush_interval=None, max_buffer=None):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._last_status = {}
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, 'ACCESS_LOG_BATCH_SIZE', 200)
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, 'ACCESS_LOG_FLUSH_INTERVAL', 1.0)
+
+    @property
+    def max_buffer(self):
+        return self._max_buffer or getattr(settings, 'ACCESS_LOG_MAX_BUFFER', 10000)
+
+    def record(self, device_id, person_name, status, timestamp, pi_timestamp=None):
+        """Adaugă un eveniment în buffer; ``timestamp`` este momentul primirii.
+
+        Statusurile repetate (aceeași persoană și același status pe aceeași ușă,
+        ex. mesajele periodice "no_face") nu sunt scrise din nou.
+        Returnează True dacă evenimentul a fost păstrat.
+        """
+        key = (person_name or "", status)
+        with self._cond:
+            if self._last_status.get(device_id) == key:
+                return False
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return False # Fără să-l notăm ca ultim status: următorul identic trebuie scris
+            self._buffer.append(AccessEvent(
+                device_id=device_id,
+                person_name=person_name or "",
+                status=status,
+                timestamp=timestamp,
+                pi_timestamp=pi_timestamp or "",
+                event_time=parse_event_time(pi_timestamp) or timestamp,
+            ))
+            self._last_status[device_id] = key
+            full = len(self._buffer) >= self.batch_size
+            if full:
+                self._cond.notify()
+        if getattr(settings, 'ACCESS_LOG_BACKGROUND_FLUSH', True):
+            self._ensure_thread()
+        elif full:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Scrie tot ce e în buffer, într-o singură tranzacție; returnează câte evenimente a scris."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                with ACCESS_LOG_FLUSH_SECONDS.time():
+                    with transaction.atomic():
+                        AccessEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+            except Exception:
+                self._requeue(batch)
+                logger.exception("Failed to write %d access events, keeping them for the next flush.", len(batch))
+                return 0
+            self.written += len(batch)
+            ACCESS_LOG_WRITTEN.inc(len(batch))
+            self.flushes += 1
+            return len(batch)
+
+    def _requeue(self, batch):
+        """Pune lotul nescris înapoi la începutul buffer-ului (cele mai noi evenimente în plus se pierd)."""
+        for event in batch:
+            event.pk = None # Id-urile primite într-o tranzacție anulată nu mai sunt valide
+        with self._cond:
+            self._buffer[:0] = batch
+            overflow = len(self._buffer) - self.max_buffer
+            if overflow > 0:
+                del self._buffer[-overflow:]
+                self.dropped += overflow
+
+    def clear(self):
+        """Renunță la evenimentele nescrise și uită ultimul status al fiecărei uși."""
+        with self._cond:
+            self._buffer = []
+            self._last_status.clear()
+
+    def pending(self):
+        with self._cond:
+            return len(self._buffer)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._buffer) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+            try:
+                if not self.flush() and self.pending():
+                    # Scrierea a eșuat și lotul a revenit în buffer: nu reîncercăm imediat
+                    time.sleep(self.flush_interval)
+            except Exception as e:
+                logger.error("Failed to write access events: %s", e)
+            finally:
+                close_old_connections()
+
+
+access_event_writer = AccessEventWriter()
+registry.gauge("pi_access_log_pending", "Access events buffered in memory, not yet written",
+               callback=access_event_writer.pending)
+atexit.register(lambda: access_event_writer.pending() and access_event_writer.flush())
+
+
+# --- Interogare cu paginare keyset ---
+def encode_cursor(event):
+    raw = f"{event.event_time.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        event_time, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.datetime.fromisoformat(event_time), int(event_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def query_events(start=None, end=None, person_name=None, device_id=None, status=None, cursor=None, limit=100):
+    """Evenimentele produse în [start, end), în ordinea momentului de pe Pi.
+
+    Returnează (evenimente, cursor_următor); cursorul este None pe ultima pagină.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    qs = AccessEvent.objects.all()
+    if device_id:
+        qs = qs.filter(device_id=device_id)
+    if person_name:
+        qs = qs.filter(person_name=person_name)
+    if status:
+        qs = qs.filter(status=status)
+    if start:
+        qs = qs.filter(event_time__gte=start)
+    if end:
+        qs = qs.filter(event_time__lt=end)
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        qs = qs.filter(Q(event_time__gt=after_time) | Q(event_time=after_time, id__gt=after_id))
+    events = list(qs.order_by("event_time", "id")[:limit + 1])
+    next_cursor = encode_cursor(events[limit - 1]) if len(events) > limit else None
+    return events[:limit], next_cursor
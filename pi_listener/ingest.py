@@ -0,0 +1,100 @@
+# pi_listener/ingest.py
+"""Decodarea și validarea loturilor de statusuri (``update_status/bulk/``,
+mesajele MQTT citite de ``mqtt_status_subscriber``).
+
+Corpul cererii poate fi un array JSON sau NDJSON (un status pe linie),
+opțional comprimat gzip (``Content-Encoding: gzip``). Validarea se face într-o
+singură trecere: statusurile valide sunt întoarse în ordine, iar cele invalide
+doar raportate, cu indexul lor, fără să respingă tot lotul.
+"""
+import json
+import zlib
+
+from .status import StatusEvent, clean_device_id
+
+# Limitele câmpurilor din AccessEvent
+MAX_PERSON_NAME_LENGTH = 128
+MAX_STATUS_LENGTH = 32
+MAX_PI_TIMESTAMP_LENGTH = 64
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+def decode_body(body, content_encoding=None, max_bytes=1024 * 1024):
+    """Corpul cererii, decomprimat; nu decomprimă mai mult de ``max_bytes``."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(body, max_bytes + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip body: {e}") from e
+        if len(data) > max_bytes or decompressor.unconsumed_tail:
+            raise PayloadTooLarge(f"Decompressed body exceeds {max_bytes} bytes")
+        return data
+    if encoding != "identity":
+        raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+    if len(body) > max_bytes:
+        raise PayloadTooLarge(f"Body exceeds {max_bytes} bytes")
+    return body
+
+
+def _records(data):
+    """Perechi (index, înregistrare sau eroare de parsare)."""
+    if data.lstrip()[:1] == b"[":
+        try:
+            records = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON array: {e}") from e
+        yield from enumerate(records)
+        return
+    for index, line in enumerate(line for line in data.splitlines() if line.strip()):
+        try:
+            yield index, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield index, ValueError(f"Invalid JSON: {e}")
+
+
+def validate_status(record, device_id=None):
+    """Un status (dict decodat din JSON) ca ``StatusEvent``; ValueError dacă nu e valid.
+
+    Folosită și de ``update_status/``, ca un status singur să fie validat la fel ca unul din lot.
+    """
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Status must be a JSON object")
+    person_name = record.get('person_name')
+    status_msg = record.get('status')
+    if person_name is None or status_msg is None:
+        raise ValueError("Missing 'person_name' or 'status'")
+    if not isinstance(person_name, str) or len(person_name) > MAX_PERSON_NAME_LENGTH:
+        raise ValueError("Invalid 'person_name'")
+    if not isinstance(status_msg, str) or not status_msg or len(status_msg) > MAX_STATUS_LENGTH:
+        raise ValueError("Invalid 'status'")
+    pi_timestamp = record.get('pi_timestamp')
+    if pi_timestamp is not None and (not isinstance(pi_timestamp, str) or len(pi_timestamp) > MAX_PI_TIMESTAMP_LENGTH):
+        raise ValueError("Invalid 'pi_timestamp'")
+    if device_id is None:
+        device_id = record.get('device_id')
+        if device_id is not None and not isinstance(device_id, str):
+            raise ValueError("Invalid 'device_id'")
+    return StatusEvent(clean_device_id(device_id), person_name, status_msg, pi_timestamp)
+
+
+def parse_status_events(data, max_events=5000, device_id=None):
+    """Returnează (statusuri valide în ordine, erori [{"index", "error"}]).
+
+    ``device_id``, dacă e dat (ex. din topicul MQTT), înlocuiește câmpul din statusuri.
+    """
+    events, errors = [], []
+    for index, record in _records(data):
+        if index >= max_events:
+            raise PayloadTooLarge(f"Too many statuses in one request (max {max_events})")
+        try:
+            events.append(validate_status(record, device_id))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    return events, errors
@@ -0,0 +1,223 @@
+# pi_listener/local_broker.py
+"""Broker MQTT 3.1.1 minimal, în proces, pentru teste și benchmark-uri.
+
+Suportă doar ce folosesc clienții paho din proiect: CONNECT, PUBLISH (QoS 0/1,
+cu mesaje "retained"), SUBSCRIBE/UNSUBSCRIBE cu wildcard-uri ``+``/``#``,
+PINGREQ și DISCONNECT. Mesajele sunt livrate abonaților cu QoS 0. Nu este
+gândit pentru producție.
+"""
+import socket
+import socketserver
+import struct
+import threading
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(topic_filter, topic):
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def _encode_length(length):
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+
+def _encode_string(value):
+    data = value.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def _packet(packet_type, flags, body):
+    return bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.send_lock = threading.Lock()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.request.makefile("rb")
+        self.server.broker.connect(self)
+
+    def send(self, data):
+        with self.send_lock:
+            self.request.sendall(data)
+
+    def _read_packet(self):
+        header = self.rfile.read(1)
+        if not header:
+            return None, None, None
+        multiplier, length = 1, 0
+        while True:
+            byte = self.rfile.read(1)
+            if not byte:
+                return None, None, None
+            length += (byte[0] & 0x7F) * multiplier
+            if not byte[0] & 0x80:
+                break
+            multiplier *= 128
+        body = self.rfile.read(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                packet_type, flags, body = self._read_packet()
+                if packet_type is None or packet_type == DISCONNECT:
+                    break
+                if packet_type == CONNECT:
+                    self.send(_packet(CONNACK, 0, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    self._handle_publish(flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self._handle_subscribe(body)
+                elif packet_type == UNSUBSCRIBE:
+                    packet_id = body[:2]
+                    pos = 2
+                    while pos < len(body):
+                        (size,) = struct.unpack("!H", body[pos:pos + 2])
+                        broker.unsubscribe(self, body[pos + 2:pos + 2 + size].decode("utf-8"))
+                        pos += 2 + size
+                    self.send(_packet(UNSUBACK, 0, packet_id))
+                elif packet_type == PINGREQ:
+                    self.send(_packet(PINGRESP, 0, b""))
+                # PUBACK-urile de la clienți sunt ignorate (livrăm cu QoS 0)
+        except OSError:
+            pass
+        finally:
+            broker.disconnect(self)
+
+    def _handle_publish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        retain = bool(flags & 0x01)
+        (size,) = struct.unpack("!H", body[:2])
+        topic = body[2:2 + size].decode("utf-8")
+        pos = 2 + size
+        if qos:
+            packet_id = body[pos:pos + 2]
+            pos += 2
+        payload = body[pos:]
+        self.server.broker.publish(topic, payload, retain)
+        if qos:
+            self.send(_packet(PUBACK, 0, packet_id))
+
+    def _handle_subscribe(self, body):
+        packet_id = body[:2]
+        pos = 2
+        granted = bytearray()
+        filters = []
+        while pos < len(body):
+            (size,) = struct.unpack("!H", body[pos:pos + 2])
+            filters.append(body[pos + 2:pos + 2 + size].decode("utf-8"))
+            pos += 2 + size + 1
+            granted.append(0)
+        self.send(_packet(SUBACK, 0, packet_id + bytes(granted)))
+        for topic_filter in filters:
+            self.server.broker.subscribe(self, topic_filter)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalBroker:
+    """Broker pornit pe un port liber de pe 127.0.0.1.
+
+    Se folosește ca context manager::
+
+        with LocalBroker() as broker:
+            settings.MQTT_BROKER_PORT = broker.port
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), _ClientHandler)
+        self._server.broker = self
+        self.host, self.port = self._server.server_address
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._subscriptions = []
+        self._retained = {}
+        self.messages = []
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-mqtt-broker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            handlers = list(self._clients)
+        for handler in handlers:
+            try:
+                handler.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def publish(self, topic, payload, retain=False):
+        with self._lock:
+            self.messages.append((topic, payload))
+            if retain:
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None)
+            targets = [handler for handler, topic_filter in self._subscriptions if topic_matches(topic_filter, topic)]
+        data = _packet(PUBLISH, 0, _encode_string(topic) + payload)
+        for handler in targets:
+            try:
+                handler.send(data)
+            except OSError:
+                pass
+
+    def subscribe(self, handler, topic_filter):
+        with self._lock:
+            self._subscriptions.append((handler, topic_filter))
+            retained = [(t, p) for t, p in self._retained.items() if topic_matches(topic_filter, t)]
+        for topic, payload in retained:
+            handler.send(_packet(PUBLISH, 0x01, _encode_string(topic) + payload))
+
+    def unsubscribe(self, handler, topic_filter):
+        with self._lock:
+            self._subscriptions = [(h, f) for h, f in self._subscriptions if not (h is handler and f == topic_filter)]
+
+    def connect(self, handler):
+        with self._lock:
+            self._clients.add(handler)
+
+    def disconnect(self, handler):
+        with self._lock:
+            self._clients.discard(handler)
+            self._subscriptions = [(h, f) for h, f in self._subscriptions if h is not handler]
+
+    def messages_on(self, topic):
+        with self._lock:
+            return [payload for t, payload in self.messages if t == topic]
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from pi_listener.benchmark import compare_results, run_benchmark
+
+
+class Command(BaseCommand):
+    help = ("Benchmark de încărcare: N Pi-uri virtuale, M dashboard-uri și comenzi de ușă, "
+            "în proces, pe o bază de date de test și un broker MQTT local.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pis", type=int, default=10, help="Pi-uri virtuale (câte o ușă fiecare)")
+        parser.add_argument("--rate", type=float, default=5.0, help="Cereri/s per Pi (0 = cât de repede se poate)")
+        parser.add_argument("--bulk-size", type=int, default=0,
+                            help="Statusuri per cerere prin update_status/bulk/ (0 = update_status/)")
+        parser.add_argument("--dashboards", type=int, default=5)
+        parser.add_argument("--dashboard-mode", choices=["poll", "stream"], default="poll")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Secunde între cererile unui dashboard")
+        parser.add_argument("--command-rate", type=float, default=1.0, help="Comenzi de ușă/s (0 = fără)")
+        parser.add_argument("--duration", type=float, default=10.0, help="Secunde")
+        parser.add_argument("--state-store", default="pi_listener.state_store.LocalStateStore")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", dest="json_path", help="Scrie rezultatele în acest fișier JSON")
+        parser.add_argument("--compare", help="Compară cu rezultatele dintr-un JSON anterior")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = run_benchmark(
+                pis=options["pis"], rate=options["rate"], duration=options["duration"],
+                dashboards=options["dashboards"], dashboard_mode=options["dashboard_mode"],
+                poll_interval=options["poll_interval"], command_rate=options["command_rate"],
+                bulk_size=options["bulk_size"], state_store=options["state_store"], seed=options["seed"],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'operation':<14}{'count':>8}{'errors':>8}{'req/s':>10}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, ops in results["operations"].items():
+            self.stdout.write(f"{name:<14}{ops['count']:>8}{ops['errors']:>8}{ops['throughput']:>10.1f}"
+                              + "".join(f"{ops[m]:>10.2f}" if ops[m] is not None else f"{'-':>10}"
+                                        for m in ("p50_ms", "p95_ms", "p99_ms")))
+        ops = results["operations"]
+        self.stdout.write(f"statuses applied: {ops['status_post'].get('statuses', 0)}, "
+                          f"access events written: {ops['status_post']['access_events_written']}, "
+                          f"304 responses: {ops['dashboard'].get('not_modified', 0)}, "
+                          f"commands delivered to broker: {ops['door_command']['delivered']}")
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            self.stdout.write("\nvs. baseline:")
+            for name, metric, old, new, ratio in compare_results(baseline, results):
+                self.stdout.write(f"  {name:<14}{metric:<12}{old:>10.2f} -> {new:>10.2f}  ({ratio:.2f}x)")
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
@@ -0,0 +1,41 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pi_listener.mqtt_subscriber import MQTTStatusSubscriber
+from pi_listener.status import get_state_store
+
+
+class Command(BaseCommand):
+    help = "Primește statusurile ușilor prin MQTT și actualizează starea (aceeași logică ca update_status/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default=getattr(settings, 'MQTT_BROKER_HOST', "broker.hivemq.com"))
+        parser.add_argument("--port", type=int, default=getattr(settings, 'MQTT_BROKER_PORT', 1883))
+        parser.add_argument("--topic", default=getattr(settings, 'MQTT_STATUS_TOPIC', "usa/inteligenta/status"),
+                            help="Topicul de bază; se ascultă pe <topic>/<device_id>")
+        parser.add_argument("--batch-interval", type=float, default=0.2,
+                            help="Secunde între aplicările statusurilor adunate")
+
+    def handle(self, *args, **options):
+        # Rulează în alt proces decât dashboard-ul: un store în memorie nu ar fi văzut de acesta
+        store = get_state_store()
+        if not getattr(store, "shared", False):
+            raise CommandError(f"PI_STATE_STORE is {type(store).__name__}, which is private to this process, so the "
+                               "dashboard would never see statuses received over MQTT. Set PI_STATE_STORE = "
+                               "\"pi_listener.state_store.DatabaseStateStore\" for both Django and this command.")
+        stop_event = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop_event.set())
+
+        subscriber = MQTTStatusSubscriber(options["host"], options["port"], options["topic"],
+                                          batch_interval=options["batch_interval"]).start()
+        self.stdout.write(f"Listening for statuses on {options['topic']}/+ at {options['host']}:{options['port']}")
+        try:
+            subscriber.run_forever(stop_event)
+        finally:
+            subscriber.stop()
+            self.stdout.write(f"Stopped. Received {subscriber.received}, applied {subscriber.applied}, "
+                              f"rejected {subscriber.rejected}.")
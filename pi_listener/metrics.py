@@ -0,0 +1,238 @@
+# pi_listener/metrics.py
+"""Metrici de proces (contoare, gauge-uri, histograme cu bucket-uri fixe).
+
+Metricile sunt definite o singură dată, la importul modulelor, în ``registry``
+și expuse în format text Prometheus de ``metrics_view`` (``/pi/metrics/``).
+Cu ``settings.PI_METRICS_ENABLED = False`` fiecare ``inc``/``set``/``observe``
+se oprește la verificarea unui bool, iar endpoint-ul răspunde 404.
+
+Fiecare proces (worker gunicorn, ``mqtt_status_subscriber``) are propriile
+valori; Prometheus le adună pe instanțe.
+"""
+import bisect
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Timer:
+    __slots__ = ("_metric", "_labels", "_started")
+
+    def __init__(self, metric, labels):
+        self._metric = metric
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metric.observe(time.perf_counter() - self._started, *self._labels)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, *labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    """Valoare setată explicit sau, cu ``callback``, citită la fiecare export."""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, help_text, labelnames=(), callback=None):
+        super().__init__(registry, name, help_text, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels))
+
+    def render(self):
+        if self.callback is not None:
+            return [f"{self.name} {_format_value(self.callback())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Numărători per bucket (necumulative), plus sumă și total
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """``with histogram.time(...):`` măsoară blocul (nimic dacă metricile sunt oprite)."""
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, ([*series[0]], series[1], series[2])) for key, series in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), callback=None):
+        return self._register(Gauge(self, name, help_text, labelnames, callback))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self):
+        """Toate metricile, în formatul text Prometheus 0.0.4."""
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(enabled=getattr(settings, "PI_METRICS_ENABLED", True))
+
+
+@receiver(setting_changed)
+def _update_enabled(setting, value, enter, **kwargs):
+    if setting == "PI_METRICS_ENABLED":
+        registry.enabled = True if value is None else bool(value)
+
+
+# --- Metricile serverului ---
+STATUS_INGEST_SECONDS = registry.histogram(
+    "pi_status_ingest_seconds", "Time to apply statuses to the state store", ("source",))
+STATUS_EVENTS = registry.counter("pi_status_events_total", "Statuses accepted from doors", ("source",))
+STATUS_STALE = registry.counter("pi_status_stale_total", "Statuses ignored as older than the current state")
+STATUS_REJECTED = registry.counter("pi_status_rejected_total", "Invalid statuses rejected", ("source",))
+RENDER_SECONDS = registry.histogram("pi_render_seconds", "Time to build dashboard responses", ("view", "code"))
+MQTT_PUBLISH_SECONDS = registry.histogram("pi_mqtt_publish_seconds", "Time to publish a door command over MQTT")
+MQTT_PUBLISH_FAILURES = registry.counter("pi_mqtt_publish_failures_total", "Door commands that failed to publish")
+ACCESS_LOG_FLUSH_SECONDS = registry.histogram("pi_access_log_flush_seconds", "Time to write a batch of access events")
+ACCESS_LOG_WRITTEN = registry.counter("pi_access_log_written_total", "Access events written to the database")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=64)),
+                ('person_name', models.CharField(blank=True, default='', max_length=128)),
+                ('status', models.CharField(max_length=32)),
+                ('timestamp', models.DateTimeField()),
+                ('pi_timestamp', models.CharField(blank=True, default='', max_length=64)),
+                ('event_time', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event_time'], name='accessevent_event_time'), models.Index(fields=['device_id', 'event_time'], name='accessevent_device_et'), models.Index(fields=['person_name', 'event_time'], name='accessevent_person_et'), models.Index(fields=['status', 'event_time'], name='accessevent_status_et')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pi_listener', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceState',
+            fields=[
+                ('device_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('state', models.JSONField(default=dict)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
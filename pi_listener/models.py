@@ -1,3 +1,50 @@
 from django.db import models
 
-# Create your models here.
+
+class AccessEvent(models.Model):
+    """Un status raportat de o ușă (Pi), păstrat pentru istoric."""
+
+    device_id = models.CharField(max_length=64)
+    person_name = models.CharField(max_length=128, blank=True, default="")
+    status = models.CharField(max_length=32)
+    # Momentul primirii pe server
+    timestamp = models.DateTimeField()
+    pi_timestamp = models.CharField(max_length=64, blank=True, default="")
+    # Momentul producerii pe Pi (din pi_timestamp; momentul primirii dacă nu poate fi citit).
+    # Cheia de ordonare pentru paginarea keyset (event_time, id): statusurile golite din
+    # spool după o pană își păstrează momentul real, nu pe cel al golirii.
+    event_time = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["event_time"], name="accessevent_event_time"),
+            models.Index(fields=["device_id", "event_time"], name="accessevent_device_et"),
+            models.Index(fields=["person_name", "event_time"], name="accessevent_person_et"),
+            models.Index(fields=["status", "event_time"], name="accessevent_status_et"),
+        ]
+
+    def __str__(self):
+        return f"[{self.event_time:%Y-%m-%d %H:%M:%S}] {self.device_id}: {self.status} ({self.person_name})"
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "person_name": self.person_name,
+            "status": self.status,
+            "timestamp": self.timestamp.isoformat(),
+            "pi_timestamp": self.pi_timestamp,
+            "event_time": self.event_time.isoformat(),
+        }
+
+
+class DeviceState(models.Model):
+    """Starea curentă a unei uși, folosită de DatabaseStateStore (comună tuturor workerilor)."""
+
+    device_id = models.CharField(max_length=64, primary_key=True)
+    state = models.JSONField(default=dict)
+    # Crește la fiecare schimbare; actualizările fac compare-and-swap pe ea
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.device_id} (v{self.version})"
@@ -0,0 +1,183 @@
+# pi_listener/mqtt_publisher.py
+"""Conexiune MQTT unică per proces, folosită de view-uri pentru comenzi.
+
+În loc să creăm un client nou (connect + loop_start + disconnect) la fiecare
+apăsare de buton, procesul Django păstrează o singură conexiune, pornită
+leneș la prima comandă. Reconectarea este automată (paho, cu backoff), iar
+mesajele QoS 1 aflate încă în zbor sunt urmărite pentru raportul de sănătate.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+import paho.mqtt.client as mqtt
+from django.conf import settings
+
+from .metrics import MQTT_PUBLISH_FAILURES, MQTT_PUBLISH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class MQTTConnectionManager:
+    def __init__(self, host, port=1883, keepalive=60, client_id=None, connect_timeout=3.0,
+                 publish_timeout=3.0, min_reconnect_delay=1, max_reconnect_delay=30):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        # Un id stabil per proces, nu unul nou la fiecare secundă
+        self.client_id = client_id or f"django_cmd_sender_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        self.connect_timeout = connect_timeout
+        self.publish_timeout = publish_timeout
+        self.min_reconnect_delay = min_reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._client = None
+        self._in_flight = {}
+        self.published = 0
+        self.failed = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.last_error = None
+        self.last_connected_at = None
+        self.last_disconnected_at = None
+
+    # --- Ciclul de viață ---
+    def start(self):
+        """Pornește conexiunea (o singură dată, thread-safe)."""
+        with self._lock:
+            if self._client is not None:
+                return self._client
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+            client.on_connect = self._on_connect
+            client.on_disconnect = self._on_disconnect
+            client.on_publish = self._on_publish
+            client.reconnect_delay_set(self.min_reconnect_delay, self.max_reconnect_delay)
+            client.connect_async(self.host, self.port, self.keepalive)
+            client.loop_start()
+            self._client = client
+            return client
+
+    def stop(self):
+        with self._lock:
+            client, self._client = self._client, None
+        # Deconectare voită: nu o raportăm ca pierdere a conexiunii
+        self._connected.clear()
+        if client is not None:
+            client.disconnect()
+            client.loop_stop()
+
+    # --- Callback-uri paho (rulează pe thread-ul de rețea) ---
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code == 0:
+            self.connects += 1
+            self.last_connected_at = time.time()
+            self._connected.set()
+            logger.info("Connected to broker %s:%s as %s", self.host, self.port, self.client_id)
+        else:
+            self.last_error = f"Connect refused: {reason_code}"
+            logger.error("MQTT connect refused: %s", reason_code)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        if self._connected.is_set():
+            self.disconnects += 1
+            self.last_disconnected_at = time.time()
+            logger.warning("Disconnected from broker (%s), reconnecting in background.", reason_code)
+        self._connected.clear()
+
+    def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        with self._lock:
+            self._in_flight.pop(mid, None)
+
+    # --- Publicare ---
+    def publish(self, topic, payload, qos=1, retain=False, timeout=None):
+        """Publică un mesaj și așteaptă confirmarea (pentru QoS 1).
+
+        Returnează ``None`` la succes sau un mesaj de eroare.
+        """
+        with MQTT_PUBLISH_SECONDS.time():
+            error = self._publish(topic, payload, qos, retain, timeout)
+        if error:
+            MQTT_PUBLISH_FAILURES.inc()
+        return error
+
+    def _publish(self, topic, payload, qos, retain, timeout):
+        timeout = self.publish_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        client = self.start()
+        if not self._connected.wait(min(timeout, self.connect_timeout)):
+            self.failed += 1
+            self.last_error = f"Not connected to MQTT broker {self.host}:{self.port}"
+            return self.last_error
+
+        info = client.publish(topic, payload, qos=qos, retain=retain)
+        try:
+            if qos > 0:
+                with self._lock:
+                    self._in_flight[info.mid] = (topic, time.time())
+            info.wait_for_publish(timeout=max(0.0, deadline - time.monotonic()))
+        except (ValueError, RuntimeError) as e:
+            self.failed += 1
+            self.last_error = f"MQTT publish failed: {e}"
+            return self.last_error
+        finally:
+            if info.is_published():
+                with self._lock:
+                    self._in_flight.pop(info.mid, None)
+
+        if not info.is_published():
+            self.failed += 1
+            self.last_error = f"MQTT publish failed. RC: {info.rc}"
+            return self.last_error
+        self.published += 1
+        return None
+
+    def health(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+            oldest = min((sent for _, sent in self._in_flight.values()), default=None)
+            started = self._client is not None
+        return {
+            "broker": f"{self.host}:{self.port}",
+            "client_id": self.client_id,
+            "started": started,
+            "connected": self._connected.is_set(),
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "published": self.published,
+            "failed": self.failed,
+            "in_flight": in_flight,
+            "oldest_in_flight_age": (time.time() - oldest) if oldest else None,
+            "last_error": self.last_error,
+            "last_connected_at": self.last_connected_at,
+            "last_disconnected_at": self.last_disconnected_at,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_mqtt_manager():
+    """Managerul comun al procesului, construit din setările Django."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = MQTTConnectionManager(
+                    getattr(settings, 'MQTT_BROKER_HOST', "broker.hivemq.com"),
+                    getattr(settings, 'MQTT_BROKER_PORT', 1883),
+                )
+    return _manager
+
+
+def reset_mqtt_manager():
+    """Închide managerul curent (ex. după schimbarea setărilor în teste)."""
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.stop()
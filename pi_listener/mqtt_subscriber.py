@@ -0,0 +1,125 @@
+# pi_listener/mqtt_subscriber.py
+"""Primirea statusurilor de la uși prin MQTT (``<MQTT_STATUS_TOPIC>/<device_id>``).
+
+Folosit de comanda ``python manage.py mqtt_status_subscriber``. Mesajele
+sunt adunate de thread-ul de rețea paho și aplicate periodic, în lot, prin
+aceeași cale ca endpoint-ul HTTP (``parse_status_events`` + ``ingest_statuses``).
+Fiind "retained", ultimul status al fiecărei uși ajunge și la un subscriber
+pornit mai târziu; statusurile mai vechi decât cele deja aplicate sunt ignorate
+de ``ingest_statuses``.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+import paho.mqtt.client as mqtt
+from django.db import close_old_connections
+
+from .ingest import parse_status_events
+from .metrics import STATUS_REJECTED
+from .status import clean_device_id, ingest_statuses
+
+logger = logging.getLogger(__name__)
+
+
+class MQTTStatusSubscriber:
+    def __init__(self, host, port=1883, topic="usa/inteligenta/status", keepalive=60, client_id=None,
+                 batch_interval=0.2, min_reconnect_delay=1, max_reconnect_delay=30):
+        self.host = host
+        self.port = port
+        self.topic = topic.rstrip("/")
+        self.keepalive = keepalive
+        self.client_id = client_id or f"django_status_subscriber_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        self.batch_interval = batch_interval
+        self.min_reconnect_delay = min_reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._connected = threading.Event()
+        self._client = None
+        self.received = 0
+        self.applied = 0
+        self.rejected = 0
+
+    def start(self):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.reconnect_delay_set(self.min_reconnect_delay, self.max_reconnect_delay)
+        client.connect_async(self.host, self.port, self.keepalive)
+        client.loop_start()
+        self._client = client
+        return self
+
+    def stop(self):
+        client, self._client = self._client, None
+        self._connected.clear()
+        if client is not None:
+            client.disconnect()
+            client.loop_stop()
+        self.drain()
+
+    def wait_connected(self, timeout=None):
+        return self._connected.wait(timeout)
+
+    # --- Callback-uri paho (rulează pe thread-ul de rețea) ---
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code == 0:
+            # Abonarea se refă la fiecare reconectare; brokerul retrimite statusurile "retained"
+            client.subscribe(f"{self.topic}/+", qos=1)
+            self._connected.set()
+            logger.info("Status subscriber connected to %s:%s, topic %s/+", self.host, self.port, self.topic)
+        else:
+            logger.error("Status subscriber connect refused: %s", reason_code)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        if self._connected.is_set():
+            logger.warning("Status subscriber disconnected (%s), reconnecting in background.", reason_code)
+        self._connected.clear()
+
+    def _on_message(self, client, userdata, msg):
+        if not msg.payload:
+            return # Ștergerea unui mesaj "retained"
+        with self._lock:
+            self._pending.append((msg.topic, msg.payload))
+            self.received += 1
+
+    # --- Aplicarea statusurilor ---
+    def drain(self):
+        """Aplică statusurile primite de la ultimul apel. Returnează câte au fost acceptate."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        events = []
+        for topic, payload in pending:
+            try:
+                device_id = clean_device_id(topic.rsplit("/", 1)[-1])
+                device_events, errors = parse_status_events(payload, max_events=1000, device_id=device_id)
+            except ValueError as e:
+                device_events, errors = [], [{"error": str(e)}]
+            events.extend(device_events)
+            if errors:
+                self.rejected += len(errors)
+                STATUS_REJECTED.inc(len(errors), "mqtt")
+                logger.warning("Invalid MQTT status: %s", errors[0]["error"], extra={"topic": topic})
+        if events:
+            ingest_statuses(events, source="mqtt")
+            self.applied += len(events)
+        return len(events)
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.drain()
+            except Exception as e:
+                logger.exception("Failed to apply MQTT statuses: %s", e)
+            finally:
+                close_old_connections()
+            stop_event.wait(max(0.0, self.batch_interval - (time.monotonic() - started)))
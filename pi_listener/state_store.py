@@ -0,0 +1,105 @@
+# pi_listener/state_store.py
+"""Starea curentă a fiecărei uși (device), cu backend configurabil.
+
+``settings.PI_STATE_STORE`` alege implementarea:
+
+* ``LocalStateStore`` - dict în memorie, protejat de un lock. Suficient pentru
+  un singur proces (``runserver``, un worker uvicorn).
+* ``DatabaseStateStore`` - un rând per ușă în baza de date, actualizat cu
+  compare-and-swap pe coloana ``version``. Toate procesele (ex. mai mulți
+  workeri gunicorn) văd aceeași stare.
+
+``shared`` spune dacă starea este vizibilă și altor procese; procesele separate
+care aplică statusuri (ex. ``mqtt_status_subscriber``) au nevoie de un store comun.
+
+Ambele oferă ``get(device_id)`` și ``update(device_id, fn)``: ``fn`` primește o
+copie a stării și întoarce starea nouă; actualizarea este atomică, iar
+``version`` (și ``updated_at``) se schimbă doar când starea chiar se schimbă.
+"""
+import threading
+import time
+
+from django.db import IntegrityError, transaction
+
+from .models import DeviceState
+
+
+def default_state():
+    return {
+        "message": "No data received yet from Raspberry Pi.",
+        "person_name": None,
+        "status": None,
+        "received_at": None,
+        "pi_timestamp": None,
+        "show_buttons": False, # Butoanele sunt ascunse implicit
+        "buttons_visible_since": 0, # Timpul când butoanele au devenit vizibile (după o acțiune autorizată sau manuală)
+        "version": 0,
+        "updated_at": None, # time.time() la ultima schimbare (pentru Last-Modified)
+    }
+
+
+class StateConflict(RuntimeError):
+    """Actualizarea nu a reușit după prea multe scrieri concurente."""
+
+
+class LocalStateStore:
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def get(self, device_id):
+        with self._lock:
+            return dict(self._states.get(device_id) or default_state())
+
+    def update(self, device_id, fn):
+        with self._lock:
+            current = self._states.get(device_id) or default_state()
+            new_state = fn(dict(current))
+            if new_state == current:
+                return dict(current)
+            new_state["version"] = current["version"] + 1
+            new_state["updated_at"] = time.time()
+            self._states[device_id] = new_state
+            return dict(new_state)
+
+    def devices(self):
+        with self._lock:
+            return sorted(self._states)
+
+
+class DatabaseStateStore:
+    shared = True
+
+    def __init__(self, max_retries=20):
+        self.max_retries = max_retries
+
+    def get(self, device_id):
+        row = DeviceState.objects.filter(pk=device_id).values_list("state", flat=True).first()
+        return dict(row) if row is not None else default_state()
+
+    def update(self, device_id, fn):
+        for _ in range(self.max_retries):
+            current = self.get(device_id)
+            version = current["version"]
+            new_state = fn(dict(current))
+            if new_state == current:
+                return current
+            new_state["version"] = version + 1
+            new_state["updated_at"] = time.time()
+            if version == 0:
+                try:
+                    with transaction.atomic():
+                        DeviceState.objects.create(device_id=device_id, state=new_state, version=1)
+                    return new_state
+                except IntegrityError:
+                    continue # Alt proces a creat rândul între timp
+            # Scriem doar dacă nimeni nu a modificat rândul de la citire
+            if DeviceState.objects.filter(pk=device_id, version=version).update(state=new_state,
+                                                                                 version=version + 1):
+                return new_state
+        raise StateConflict(f"Could not update state of device '{device_id}' after {self.max_retries} attempts")
+
+    def devices(self):
+        return list(DeviceState.objects.order_by("device_id").values_list("device_id", flat=True))
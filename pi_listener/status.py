@@ -0,0 +1,251 @@
+# pi_listener/status.py
+"""Logica statusului unei uși, comună view-urilor și altor surse de statusuri.
+
+Tranzițiile (``apply_status``, ``apply_command``, ``expire_buttons``) sunt
+funcții pure peste dict-ul de stare; ``ingest_status`` / ``apply_door_command``
+/ ``refresh_status`` le aplică atomic prin state store, apoi anunță
+dashboard-urile și jurnalul de acces.
+
+Butoanele expiră și fără statusuri noi: ``ButtonExpiryTimer`` (un singur
+thread per proces) apelează ``refresh_status`` o dată pe secundă pentru
+fiecare ușă cu un dashboard conectat, indiferent câte stream-uri sunt deschise.
+"""
+import collections
+import datetime
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .broadcast import get_broadcaster, subscribed_devices
+from .event_log import access_event_writer
+from .metrics import STATUS_EVENTS, STATUS_INGEST_SECONDS, STATUS_STALE
+
+logger = logging.getLogger(__name__)
+
+BUTTON_VISIBILITY_DURATION = 10 # Secunde cât rămân butoanele vizibile
+BUTTON_EXPIRY_INTERVAL = 1.0 # Secunde între verificările făcute de ButtonExpiryTimer
+
+DEVICE_ID_RE = re.compile(r"^[\w.-]{1,64}$")
+
+StatusEvent = collections.namedtuple("StatusEvent", "device_id person_name status pi_timestamp")
+
+_store = None
+_store_lock = threading.Lock()
+_expiry_timer = None
+
+
+def get_state_store():
+    """State store-ul procesului, ales prin settings.PI_STATE_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, 'PI_STATE_STORE', "pi_listener.state_store.LocalStateStore")
+                _store = import_string(path)()
+    return _store
+
+
+def reset_state_store():
+    """Uită store-ul curent (ex. după schimbarea setărilor în teste)."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def clean_device_id(device_id):
+    if not device_id:
+        return settings.PI_DEFAULT_DEVICE_ID
+    if not DEVICE_ID_RE.match(device_id):
+        raise ValueError(f"Invalid device id: {device_id!r}")
+    return device_id
+
+
+def command_topic(device_id):
+    """Ușa implicită ascultă pe topicul de bază, celelalte pe <topic>/<device_id>."""
+    mqtt_topic = getattr(settings, 'MQTT_COMMAND_TOPIC', "usa/inteligenta/comanda")
+    if device_id == settings.PI_DEFAULT_DEVICE_ID:
+        return mqtt_topic
+    return f"{mqtt_topic}/{device_id}"
+
+
+# --- Tranziții ---
+def apply_status(state, person_name, status_msg, pi_timestamp, received_at, now):
+    # Logica pentru vizibilitatea butoanelor:
+    show_buttons = state.get("show_buttons", False)
+    buttons_visible_since = state.get("buttons_visible_since", 0)
+
+    if status_msg == "authorized":
+        show_buttons = True
+        buttons_visible_since = now # Resetăm timer-ul la fiecare detecție autorizată
+    elif status_msg == "unknown" or status_msg == "unauthorized":
+        show_buttons = False # Ascundem butoanele explicit
+        buttons_visible_since = 0
+    elif status_msg == "no_face":
+        # Dacă statusul devine "no_face", verificăm dacă butoanele erau vizibile
+        # (de la o detecție autorizată anterioară sau o deschidere manuală)
+        # și dacă a trecut timpul de vizibilitate.
+        if state.get("show_buttons") and (now - state.get("buttons_visible_since", 0) > BUTTON_VISIBILITY_DURATION):
+            show_buttons = False
+            buttons_visible_since = 0
+
+    state.update({
+        "person_name": person_name,
+        "status": status_msg,
+        "received_at": received_at,
+        "pi_timestamp": pi_timestamp,
+        "show_buttons": show_buttons,
+        "buttons_visible_since": buttons_visible_since,
+        "message": None
+    })
+    return state
+
+
+def apply_command(state, command, now):
+    if command == "deschide":
+        # Când se deschide manual, vrem ca butoanele să apară/rămână vizibile pentru durata setată
+        state["show_buttons"] = True
+        state["buttons_visible_since"] = now # Resetăm timer-ul
+    elif command == "inchide":
+        # Ascundem butoanele imediat după ce se apasă "inchide"
+        state["show_buttons"] = False
+        state["buttons_visible_since"] = 0
+    return state
+
+
+def expire_buttons(state, now):
+    """Ascunde butoanele dacă a trecut BUTTON_VISIBILITY_DURATION."""
+    if state.get("show_buttons"): # Doar dacă sunt setate să fie vizibile
+        # Verificăm dacă a trecut timpul de vizibilitate de la ultima acțiune care le-a făcut vizibile
+        if now - state.get("buttons_visible_since", 0) > BUTTON_VISIBILITY_DURATION:
+            # Și dacă statusul curent NU este "authorized" (caz în care timer-ul s-ar fi resetat oricum)
+            if state.get("status") != "authorized":
+                state["show_buttons"] = False
+                state["buttons_visible_since"] = 0
+    return state
+
+
+# --- Operații pe store ---
+def _is_stale(pi_timestamp, current_pi_timestamp):
+    """True dacă statusul a fost produs pe Pi înaintea celui deja aplicat."""
+    if not pi_timestamp or not current_pi_timestamp:
+        return False
+    try:
+        return datetime.datetime.fromisoformat(pi_timestamp) < datetime.datetime.fromisoformat(current_pi_timestamp)
+    except (TypeError, ValueError):
+        return False
+
+
+def ingest_statuses(events, now=None, source="bulk"):
+    """Aplică statusurile (``StatusEvent``) în ordine, cu o singură actualizare
+    a store-ului per ușă.
+
+    Last-writer-wins după ``pi_timestamp``: un status mai vechi decât cel deja
+    aplicat (ex. golirea spool-ului după o pană) nu mai schimbă starea, dar
+    ajunge în jurnalul de acces. Returnează un rezumat per ușă. ``source``
+    ("http", "bulk", "mqtt") etichetează doar metricile.
+    """
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    received_at = datetime.datetime.fromtimestamp(now).isoformat()
+    by_device = {}
+    for event in events:
+        by_device.setdefault(event.device_id, []).append(event)
+
+    summary = {}
+    store = get_state_store()
+    for device_id, device_events in by_device.items():
+        counts = {}
+
+        def apply_all(state):
+            # Poate fi apelată de mai multe ori (reîncercări la un store comun)
+            counts.update(applied=0, stale=0)
+            for event in device_events:
+                if _is_stale(event.pi_timestamp, state.get("pi_timestamp")):
+                    counts["stale"] += 1
+                    continue
+                state = apply_status(state, event.person_name, event.status, event.pi_timestamp, received_at, now)
+                counts["applied"] += 1
+            return state
+
+        state = store.update(device_id, apply_all)
+        get_broadcaster(device_id).publish(state)
+        timestamp = timezone.now()
+        for event in device_events:
+            # Scrierea în baza de date se face în loturi, pe thread-ul jurnalului
+            access_event_writer.record(device_id, event.person_name, event.status, timestamp, event.pi_timestamp)
+        summary[device_id] = dict(counts, status=state["status"], version=state["version"])
+        STATUS_STALE.inc(counts["stale"])
+    STATUS_EVENTS.inc(len(events), source)
+    STATUS_INGEST_SECONDS.observe(time.perf_counter() - started, source)
+    return summary
+
+
+def ingest_status(device_id, person_name, status_msg, pi_timestamp=None, now=None, source="http"):
+    """Aplică un status primit de la o ușă și returnează starea nouă."""
+    ingest_statuses([StatusEvent(device_id, person_name, status_msg, pi_timestamp)], now, source)
+    return get_state_store().get(device_id)
+
+
+def apply_door_command(device_id, command, now=None):
+    now = time.time() if now is None else now
+    state = get_state_store().update(device_id, lambda s: apply_command(s, command, now))
+    get_broadcaster(device_id).publish(state)
+    return state
+
+
+def refresh_status(device_id, now=None):
+    """Starea curentă a ușii, după expirarea butoanelor; o difuzează dacă s-a schimbat
+    (inclusiv schimbările făcute de alte procese, la un store comun)."""
+    now = time.time() if now is None else now
+    state = get_state_store().update(device_id, lambda s: expire_buttons(s, now))
+    get_broadcaster(device_id).publish(state)
+    return state
+
+
+class ButtonExpiryTimer(threading.Thread):
+    """Expiră butoanele ușilor urmărite de dashboard-uri, de pe un singur thread.
+
+    Prin ``refresh_status`` ajung în stream-uri și schimbările făcute de alți
+    workeri (store comun), fără ca fiecare conexiune să interogheze store-ul.
+    """
+
+    def __init__(self, interval=BUTTON_EXPIRY_INTERVAL, refresh=None, devices=subscribed_devices):
+        super().__init__(name="button-expiry", daemon=True)
+        self.interval = interval
+        self.refresh = refresh or refresh_status
+        self.devices = devices
+        self._stop_event = threading.Event()
+
+    def tick(self):
+        try:
+            for device_id in self.devices():
+                try:
+                    self.refresh(device_id)
+                except Exception:
+                    logger.exception("Button expiry failed", extra={"device": device_id})
+        finally:
+            close_old_connections()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.tick()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def ensure_button_expiry_timer():
+    """Pornește (o singură dată per proces) timer-ul de expirare a butoanelor."""
+    global _expiry_timer
+    if _expiry_timer is None:
+        with _store_lock:
+            if _expiry_timer is None:
+                _expiry_timer = ButtonExpiryTimer()
+                _expiry_timer.start()
+    return _expiry_timer
@@ -1,3 +1,618 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import io
+import json
+import logging
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import paho.mqtt.client as mqtt
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import CommandError, call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmark import percentile, run_benchmark
+from .broadcast import StatusBroadcaster, get_broadcaster
+from .event_log import AccessEventWriter, access_event_writer, query_events
+from .metrics import MetricsRegistry, registry
+from .local_broker import LocalBroker
+from .models import AccessEvent
+from .mqtt_publisher import MQTTConnectionManager, get_mqtt_manager, reset_mqtt_manager
+from .mqtt_subscriber import MQTTStatusSubscriber
+from .state_store import DatabaseStateStore, LocalStateStore
+from .status import (BUTTON_VISIBILITY_DURATION, ButtonExpiryTimer, apply_door_command, get_state_store,
+                     ingest_status, refresh_status, reset_state_store)
+
+COMMAND_TOPIC = "test/usa/comanda"
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class LocalBrokerTestCase(SimpleTestCase):
+    """Pornește un broker MQTT local și îndreaptă setările Django către el."""
+
+    def setUp(self):
+        self.broker = LocalBroker().start()
+        self.addCleanup(self.broker.stop)
+        overrides = override_settings(MQTT_BROKER_HOST=self.broker.host, MQTT_BROKER_PORT=self.broker.port,
+                                      MQTT_COMMAND_TOPIC=COMMAND_TOPIC)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_mqtt_manager()
+        self.addCleanup(reset_mqtt_manager)
+
+    def subscribe(self, topic):
+        received = []
+        subscribed = threading.Event()
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        client.on_message = lambda c, u, msg: received.append(msg)
+        client.on_subscribe = lambda *args: subscribed.set()
+        client.on_connect = lambda c, *args: c.subscribe(topic, qos=1)
+        client.connect(self.broker.host, self.broker.port)
+        client.loop_start()
+        self.addCleanup(client.loop_stop)
+        self.addCleanup(client.disconnect)
+        self.assertTrue(subscribed.wait(3))
+        return received
+
+
+class MQTTConnectionManagerTests(LocalBrokerTestCase):
+    def test_publish_reuses_one_connection(self):
+        received = self.subscribe(COMMAND_TOPIC)
+        manager = get_mqtt_manager()
+        for command in ["deschide", "inchide", "deschide"]:
+            self.assertIsNone(manager.publish(COMMAND_TOPIC, command))
+        self.assertTrue(wait_for(lambda: len(received) == 3))
+        self.assertEqual([m.payload for m in received], [b"deschide", b"inchide", b"deschide"])
+        health = manager.health()
+        self.assertTrue(health["connected"])
+        self.assertEqual(health["connects"], 1)
+        self.assertEqual(health["published"], 3)
+        self.assertEqual(health["in_flight"], 0)
+
+    def test_concurrent_publishes(self):
+        manager = get_mqtt_manager()
+        errors = []
+        threads = [threading.Thread(target=lambda: errors.append(manager.publish(COMMAND_TOPIC, "deschide")))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [None] * 20)
+        self.assertEqual(len(self.broker.messages_on(COMMAND_TOPIC)), 20)
+        self.assertEqual(manager.health()["connects"], 1)
+
+    def test_reconnects_after_broker_restart(self):
+        manager = MQTTConnectionManager(self.broker.host, self.broker.port, min_reconnect_delay=0.1,
+                                        max_reconnect_delay=0.2)
+        self.addCleanup(manager.stop)
+        self.assertIsNone(manager.publish(COMMAND_TOPIC, "deschide"))
+        port = self.broker.port
+        self.broker.stop()
+        self.assertTrue(wait_for(lambda: not manager.health()["connected"]))
+        self.broker = LocalBroker(port=port).start()
+        self.addCleanup(self.broker.stop)
+        self.assertTrue(wait_for(lambda: manager.health()["connected"], timeout=5))
+        self.assertIsNone(manager.publish(COMMAND_TOPIC, "inchide"))
+        self.assertEqual(manager.health()["connects"], 2)
+
+    def test_unreachable_broker_reports_error(self):
+        self.broker.stop()
+        manager = MQTTConnectionManager(self.broker.host, self.broker.port, connect_timeout=0.2,
+                                        publish_timeout=0.2)
+        self.addCleanup(manager.stop)
+        self.assertIn("Not connected", manager.publish(COMMAND_TOPIC, "deschide"))
+        self.assertFalse(manager.health()["connected"])
+
+
+class SendDoorCommandViewTests(LocalBrokerTestCase):
+    def test_command_is_published_and_redirects(self):
+        response = self.client.get(reverse('pi_listener:send_door_command'), {"command": "deschide"})
+        self.assertRedirects(response, reverse('pi_listener:status_display'), fetch_redirect_response=False)
+        self.assertEqual(self.broker.messages_on(COMMAND_TOPIC), [b"deschide"])
+
+    def test_command_for_other_device_uses_device_topic(self):
+        response = self.client.get(reverse('pi_listener:send_door_command'), {"command": "deschide", "device": "door-2"})
+        self.assertEqual(response["Location"], reverse('pi_listener:status_display') + "?device=door-2")
+        self.assertEqual(self.broker.messages_on(f"{COMMAND_TOPIC}/door-2"), [b"deschide"])
+        self.assertEqual(self.broker.messages_on(COMMAND_TOPIC), [])
+
+    def test_invalid_command(self):
+        response = self.client.get(reverse('pi_listener:send_door_command'), {"command": "explodeaza"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.broker.messages_on(COMMAND_TOPIC), [])
+
+    def test_mqtt_health_view(self):
+        self.client.get(reverse('pi_listener:send_door_command'), {"command": "inchide"})
+        response = self.client.get(reverse('pi_listener:mqtt_health'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["connected"])
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+@override_settings(PI_STATE_STORE="pi_listener.state_store.DatabaseStateStore", ACCESS_LOG_BACKGROUND_FLUSH=False)
+class MQTTStatusSubscriberTests(LocalBrokerTestCase, TestCase):
+    STATUS_TOPIC = "test/usa/status"
+
+    def setUp(self):
+        super().setUp()
+        # Store-ul procesului web; subscriber-ul scrie prin propria instanță (get_state_store)
+        self.dashboard_store = DatabaseStateStore()
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+
+    def test_retained_and_live_statuses_update_state(self):
+        # Publicat înainte ca subscriber-ul să pornească: îl primește fiind "retained"
+        self.broker.publish(f"{self.STATUS_TOPIC}/door-4", json.dumps(
+            {"person_name": "Abel Caluseri", "status": "authorized", "pi_timestamp": "2025-05-01T10:00:00"}).encode(),
+            retain=True)
+        subscriber = MQTTStatusSubscriber(self.broker.host, self.broker.port, self.STATUS_TOPIC).start()
+        self.addCleanup(subscriber.stop)
+        self.assertTrue(subscriber.wait_connected(3))
+        self.assertTrue(wait_for(lambda: subscriber.received == 1))
+        self.assertEqual(subscriber.drain(), 1)
+        self.assertTrue(self.dashboard_store.get("door-4")["show_buttons"])
+
+        pi = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        pi.connect(self.broker.host, self.broker.port)
+        pi.loop_start()
+        self.addCleanup(pi.loop_stop)
+        self.addCleanup(pi.disconnect)
+        pi.publish(f"{self.STATUS_TOPIC}/door-4", json.dumps(
+            {"person_name": "Unknown", "status": "unknown", "pi_timestamp": "2025-05-01T10:00:05"}), qos=1, retain=True)
+        pi.publish(f"{self.STATUS_TOPIC}/door-5", b"not json", qos=1)
+        self.assertTrue(wait_for(lambda: subscriber.received == 3))
+        self.assertEqual(subscriber.drain(), 1)
+        self.assertEqual(subscriber.rejected, 1)
+        state = self.dashboard_store.get("door-4")
+        self.assertEqual(state["status"], "unknown")
+        self.assertFalse(state["show_buttons"])
+        # În procesul web, ButtonExpiryTimer trece schimbarea spre dashboard-uri prin refresh_status
+        reset_state_store()
+        refresh_status("door-4")
+        self.assertEqual(get_broadcaster("door-4").snapshot()["status"], "unknown")
+
+    @override_settings(PI_STATE_STORE="pi_listener.state_store.LocalStateStore")
+    def test_command_refuses_a_process_local_store(self):
+        reset_state_store()
+        with self.assertRaisesRegex(CommandError, "DatabaseStateStore"):
+            call_command("mqtt_status_subscriber", stdout=io.StringIO())
+
+
+class StatusBroadcasterTests(SimpleTestCase):
+    async def test_publish_sends_only_changed_fields(self):
+        broadcaster = StatusBroadcaster()
+        broadcaster.publish({"status": "no_face", "person_name": "N/A", "show_buttons": False})
+        subscription = broadcaster.subscribe()
+        self.assertIsNone(broadcaster.publish({"status": "no_face", "person_name": "N/A", "show_buttons": False}))
+        broadcaster.publish({"status": "authorized", "person_name": "Abel Caluseri", "show_buttons": False})
+        delta = await subscription.get(timeout=1)
+        self.assertEqual(delta, {"status": "authorized", "person_name": "Abel Caluseri"})
+        subscription.close()
+        self.assertEqual(broadcaster.subscriber_count, 0)
+
+    async def test_slow_subscriber_gets_full_state(self):
+        broadcaster = StatusBroadcaster(queue_size=2)
+        subscription = broadcaster.subscribe()
+        for i in range(5):
+            broadcaster.publish({"status": "unknown", "received_at": str(i)})
+        await asyncio.sleep(0)
+        state = await subscription.get(timeout=1)
+        self.assertEqual(state["received_at"], "4")
+        self.assertIn("show_buttons", state)
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+class StatusStreamViewTests(SimpleTestCase):
+    def setUp(self):
+        reset_state_store()
+        # Evenimentele POST-urilor de aici nu trebuie să ajungă în baza de date
+        self.addCleanup(access_event_writer.clear)
+
+    async def test_stream_pushes_snapshot_then_deltas(self):
+        response = await self.async_client.get(reverse('pi_listener:status_stream'))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        first = await anext(stream)
+        self.assertIn(b"event: snapshot", first)
+
+        payload = {"person_name": "Alexandra Anghel", "status": "authorized", "pi_timestamp": "t"}
+        await sync_to_async(self.client.post)(reverse('pi_listener:update_status'), json.dumps(payload),
+                                              content_type="application/json")
+        second = await asyncio.wait_for(anext(stream), 3)
+        self.assertIn(b"event: delta", second)
+        delta = json.loads(second.decode().split("data: ", 1)[1])
+        self.assertEqual(delta["person_name"], "Alexandra Anghel")
+        self.assertEqual(delta["status"], "authorized")
+        await stream.aclose()
+
+    async def test_buttons_expire_on_the_stream_without_new_statuses(self):
+        response = await self.async_client.get(reverse('pi_listener:status_stream') + "?device=door-sse")
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        # Butoane deschise "acum 11 secunde": timer-ul comun le ascunde
+        await sync_to_async(apply_door_command)("door-sse", "deschide", time.time() - BUTTON_VISIBILITY_DURATION - 1)
+        opened = await asyncio.wait_for(anext(stream), 3)
+        self.assertIn(b'"show_buttons": true', opened)
+        expired = await asyncio.wait_for(anext(stream), 3)
+        self.assertIn(b'"show_buttons": false', expired)
+        await stream.aclose()
+
+    async def test_one_refresh_per_device_regardless_of_subscribers(self):
+        subscriptions = [get_broadcaster("door-many").subscribe() for _ in range(5)]
+        refreshed = []
+        timer = ButtonExpiryTimer(refresh=refreshed.append)
+        await sync_to_async(timer.tick)()
+        self.assertEqual(refreshed.count("door-many"), 1)
+        for subscription in subscriptions:
+            subscription.close()
+        refreshed.clear()
+        await sync_to_async(timer.tick)()
+        self.assertNotIn("door-many", refreshed)
+
+    def test_wsgi_fallback_returns_single_snapshot(self):
+        response = self.client.get(reverse('pi_listener:status_stream'))
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertEqual(body.count("event: snapshot"), 1)
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+class AccessEventLogTests(TestCase):
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0)
+
+    def test_writer_skips_repeated_status_and_flushes_in_bulk(self):
+        writer = AccessEventWriter(batch_size=3)
+        self.assertTrue(writer.record("door-1", "N/A", "no_face", self.start))
+        self.assertFalse(writer.record("door-1", "N/A", "no_face", self.start))
+        self.assertTrue(writer.record("door-2", "N/A", "no_face", self.start))
+        self.assertEqual(AccessEvent.objects.count(), 0)
+        # Al treilea eveniment umple lotul -> o singură scriere
+        self.assertTrue(writer.record("door-1", "Abel Caluseri", "authorized", self.start))
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(writer.flushes, 1)
+        self.assertEqual(AccessEvent.objects.count(), 3)
+
+    def test_dropped_event_is_not_a_duplicate(self):
+        writer = AccessEventWriter(batch_size=10, max_buffer=1)
+        self.assertTrue(writer.record("door-1", "N/A", "no_face", self.start))
+        self.assertFalse(writer.record("door-2", "Unknown", "unknown", self.start))
+        self.assertEqual(writer.dropped, 1)
+        writer.flush()
+        self.assertTrue(writer.record("door-2", "Unknown", "unknown", self.start))
+
+    def test_failed_flush_keeps_batch(self):
+        writer = AccessEventWriter(batch_size=10, max_buffer=3)
+        writer.record("door-1", "N/A", "no_face", self.start)
+        writer.record("door-2", "N/A", "no_face", self.start)
+        with mock.patch.object(AccessEvent.objects, "bulk_create", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("pi_listener.event_log", "ERROR"):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.pending(), 2)
+        # Lotul nescris are prioritate; ce nu mai încape în buffer este numărat ca pierdut
+        writer.record("door-3", "N/A", "no_face", self.start)
+        writer.record("door-4", "N/A", "no_face", self.start)
+        self.assertEqual(writer.dropped, 1)
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(sorted(AccessEvent.objects.values_list("device_id", flat=True)),
+                         ["door-1", "door-2", "door-3"])
+
+    def test_keyset_pagination(self):
+        AccessEvent.objects.bulk_create([
+            AccessEvent(device_id="door-1", person_name="Abel Caluseri" if i % 2 else "Unknown",
+                        status="authorized" if i % 2 else "unknown",
+                        timestamp=self.start,
+                        event_time=self.start + datetime.timedelta(seconds=i // 2))
+            for i in range(10)
+        ])
+        seen = []
+        cursor = None
+        while True:
+            events, cursor = query_events(person_name="Abel Caluseri", cursor=cursor, limit=2)
+            seen.extend(events)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual([e.event_time for e in seen], sorted(e.event_time for e in seen))
+
+        end = self.start + datetime.timedelta(seconds=2)
+        events, cursor = query_events(start=self.start, end=end, limit=10)
+        self.assertEqual(len(events), 4)
+        self.assertIsNone(cursor)
+
+    def test_events_are_ordered_by_pi_time(self):
+        # Statusuri trimise în lot după o pană: ajung acum, dar au fost produse acum o oră
+        writer = AccessEventWriter(batch_size=10)
+        produced = self.start - datetime.timedelta(hours=1)
+        writer.record("door-1", "Abel Caluseri", "authorized", self.start,
+                      (produced + datetime.timedelta(seconds=5)).isoformat())
+        writer.record("door-1", "Unknown", "unknown", self.start, produced.isoformat())
+        writer.record("door-1", "N/A", "no_face", self.start, "t")
+        writer.flush()
+        events, _ = query_events(start=produced, end=produced + datetime.timedelta(minutes=1))
+        self.assertEqual([e.status for e in events], ["unknown", "authorized"])
+        self.assertEqual(events[0].event_time, produced)
+        # "t" nu poate fi citit -> rămâne momentul primirii
+        events, _ = query_events(start=self.start)
+        self.assertEqual([(e.status, e.event_time) for e in events], [("no_face", self.start)])
+
+    def test_update_status_records_event(self):
+        self.addCleanup(access_event_writer.clear)
+        payload = {"device_id": "door-7", "person_name": "Unknown", "status": "unknown",
+                   "pi_timestamp": "t"}
+        self.client.post(reverse('pi_listener:update_status'), json.dumps(payload), content_type="application/json")
+        access_event_writer.flush()
+        response = self.client.get(reverse('pi_listener:access_events'), {"device": "door-7"})
+        events = response.json()["events"]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["status"], "unknown")
+        self.assertEqual(self.client.get(reverse('pi_listener:access_events'), {"cursor": "x"}).status_code, 400)
+
+
+class StateStoreTests(SimpleTestCase):
+    def test_local_store_updates_are_atomic(self):
+        store = LocalStateStore()
+
+        def increment(state):
+            state["count"] = state.get("count", 0) + 1
+            return state
+
+        threads = [threading.Thread(target=lambda: [store.update("door-1", increment) for _ in range(200)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        state = store.get("door-1")
+        self.assertEqual(state["count"], 1600)
+        self.assertEqual(state["version"], 1600)
+        self.assertEqual(store.get("door-2")["version"], 0)
+
+    def test_buttons_are_tracked_per_device(self):
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+        with override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False):
+            ingest_status("door-2", "Abel Caluseri", "authorized", now=1000.0)
+            ingest_status("door-3", "Unknown", "unknown", now=1000.0)
+        self.assertTrue(refresh_status("door-2", now=1000.0 + BUTTON_VISIBILITY_DURATION)["show_buttons"])
+        self.assertFalse(refresh_status("door-3", now=1000.0)["show_buttons"])
+        self.assertIsNone(refresh_status("door-1")["status"])
+
+
+class DatabaseStateStoreTests(TestCase):
+    def test_state_is_shared_between_store_instances(self):
+        worker_a, worker_b = DatabaseStateStore(), DatabaseStateStore()
+        worker_a.update("door-1", lambda s: {**s, "status": "authorized"})
+        self.assertEqual(worker_b.get("door-1")["status"], "authorized")
+        self.assertEqual(worker_b.devices(), ["door-1"])
+
+    def test_concurrent_write_is_retried(self):
+        store, other = DatabaseStateStore(), DatabaseStateStore()
+        store.update("door-1", lambda s: {**s, "count": 0})
+        calls = []
+
+        def increment(state):
+            calls.append(state["version"])
+            if len(calls) == 1:
+                # Alt worker scrie între citire și scriere
+                other.update("door-1", lambda s: {**s, "count": s["count"] + 1})
+            state["count"] += 1
+            return state
+
+        state = store.update("door-1", increment)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(state["count"], 2)
+        self.assertEqual(store.get("door-1")["version"], 3)
+
+    @override_settings(PI_STATE_STORE="pi_listener.state_store.DatabaseStateStore", ACCESS_LOG_BACKGROUND_FLUSH=False)
+    def test_views_with_database_store(self):
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+        payload = {"device_id": "door-9", "person_name": "Abel Caluseri", "status": "authorized"}
+        self.client.post(reverse('pi_listener:update_status'), json.dumps(payload), content_type="application/json")
+        response = self.client.get(reverse('pi_listener:status_display'), {"device": "door-9"})
+        self.assertTrue(response.context["status_info"]["show_buttons"])
+        self.assertEqual(self.client.get(reverse('pi_listener:status_display'), {"device": "../x"}).status_code, 400)
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+class BulkStatusViewTests(TestCase):
+    def setUp(self):
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+
+    def post_bulk(self, body, **headers):
+        return self.client.post(reverse('pi_listener:update_status_bulk'), body,
+                                content_type="application/x-ndjson", headers=headers)
+
+    def test_gzip_ndjson_from_several_devices(self):
+        events = [
+            {"device_id": "door-1", "person_name": "Unknown", "status": "unknown", "pi_timestamp": "2025-05-01T10:00:00"},
+            {"device_id": "door-2", "person_name": "Abel Caluseri", "status": "authorized",
+             "pi_timestamp": "2025-05-01T10:00:01"},
+            {"device_id": "door-1", "person_name": "Alexandra Anghel", "status": "authorized",
+             "pi_timestamp": "2025-05-01T10:00:02"},
+            # Mai vechi decât ultimul status aplicat pentru door-1
+            {"device_id": "door-1", "person_name": "N/A", "status": "no_face", "pi_timestamp": "2025-05-01T09:59:59"},
+        ]
+        lines = [json.dumps(e) for e in events] + ["{not json", json.dumps({"device_id": "door-2"})]
+        response = self.post_bulk(gzip.compress("\n".join(lines).encode()), content_encoding="gzip")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["accepted"], result["rejected"], result["stale"]), (4, 2, 1))
+        self.assertEqual([e["index"] for e in result["errors"]], [4, 5])
+        self.assertEqual(result["devices"]["door-1"], {"applied": 2, "stale": 1, "status": "authorized", "version": 1})
+
+        display = self.client.get(reverse('pi_listener:status_display'), {"device": "door-1"})
+        self.assertEqual(display.context["status_info"]["person_name"], "Alexandra Anghel")
+        access_event_writer.flush()
+        self.assertEqual(AccessEvent.objects.filter(device_id="door-1").count(), 3)
+
+    def test_json_array(self):
+        events = [{"person_name": "N/A", "status": "no_face"}, {"person_name": "Unknown", "status": "unknown"}]
+        response = self.post_bulk(json.dumps(events))
+        self.assertEqual(response.json()["devices"]["door-1"]["applied"], 2)
+        self.assertEqual(self.post_bulk("[1, 2").status_code, 400)
+
+    def test_single_status_is_validated_like_bulk(self):
+        url = reverse('pi_listener:update_status')
+        invalid = ['[{"person_name": "N/A", "status": "no_face"}]', '"no_face"',
+                   json.dumps({"device_id": 7, "person_name": "N/A", "status": "no_face"}),
+                   json.dumps({"person_name": "x" * 200, "status": "unknown"})]
+        for body in invalid:
+            with self.subTest(body=body[:40]), self.assertLogs("pi_listener.views", "WARNING"):
+                self.assertEqual(self.client.post(url, body, content_type="application/json").status_code, 400)
+            self.assertEqual(self.post_bulk(body if body.startswith("{") else f"[{body}]").json()["rejected"], 1)
+        response = self.client.post(url, json.dumps({"device_id": "door-4", "person_name": "N/A", "status": "no_face"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_state_store().get("door-4")["status"], "no_face")
+
+    @override_settings(PI_BULK_MAX_EVENTS=2)
+    def test_too_many_events(self):
+        body = "\n".join(json.dumps({"person_name": "N/A", "status": "no_face"}) for _ in range(3))
+        self.assertEqual(self.post_bulk(body).status_code, 413)
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+class ConditionalStatusViewTests(SimpleTestCase):
+    def setUp(self):
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+
+    def test_json_status_supports_etag_and_last_modified(self):
+        ingest_status("door-1", "Abel Caluseri", "authorized")
+        url = reverse('pi_listener:status_json')
+        response = self.client.get(url)
+        self.assertEqual(response.json()["person_name"], "Abel Caluseri")
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={"if-modified-since": last_modified}).status_code, 304)
+
+        ingest_status("door-1", "Unknown", "unknown")
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "unknown")
+
+    def test_status_page_caches_fragment_by_version(self):
+        state = ingest_status("door-1", "Alexandra Anghel", "authorized")
+        url = reverse('pi_listener:status_display')
+        response = self.client.get(url)
+        self.assertContains(response, "Alexandra Anghel")
+        key = make_template_fragment_key("status_fragment", ["door-1", state["version"], state["updated_at"]])
+        self.assertIn("Alexandra Anghel", cache.get(key))
+        self.assertEqual(self.client.get(url, headers={"if-none-match": response["ETag"]}).status_code, 304)
+        # O ușă nouă schimbă lista din pagină, deci și ETag-ul
+        ingest_status("door-2", "N/A", "no_face")
+        self.assertEqual(self.client.get(url, headers={"if-none-match": response["ETag"]}).status_code, 200)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        metrics = MetricsRegistry()
+        latency = metrics.histogram("test_seconds", "Test latency", ("view",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value, "status")
+        metrics.counter("test_total", "Test counter").inc(2)
+        text = metrics.render()
+        self.assertIn('test_seconds_bucket{view="status",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="status",le="1"} 3', text)
+        self.assertIn('test_seconds_bucket{view="status",le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count{view="status"} 4', text)
+        self.assertIn("# TYPE test_total counter\ntest_total 2", text)
+
+    def test_disabled_registry_records_nothing(self):
+        metrics = MetricsRegistry(enabled=False)
+        latency = metrics.histogram("test_seconds", "Test latency")
+        with latency.time():
+            pass
+        latency.observe(1.0)
+        self.assertEqual(latency.count(), 0)
+
+
+@override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False)
+class MetricsViewTests(SimpleTestCase):
+    def setUp(self):
+        reset_state_store()
+        self.addCleanup(reset_state_store)
+        self.addCleanup(access_event_writer.clear)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_ingest_and_render_are_exported(self):
+        self.client.post(reverse('pi_listener:update_status'), json.dumps({"person_name": "N/A", "status": "no_face"}),
+                         content_type="application/json")
+        self.client.get(reverse('pi_listener:status_json'))
+        response = self.client.get(reverse('pi_listener:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn('pi_status_events_total{source="http"} 1', text)
+        self.assertIn('pi_status_ingest_seconds_count{source="http"} 1', text)
+        self.assertIn('pi_render_seconds_count{view="status_json",code="200"} 1', text)
+        self.assertIn("pi_access_log_pending 1", text)
+
+    def test_disabled_metrics(self):
+        with override_settings(PI_METRICS_ENABLED=False):
+            ingest_status("door-1", "Unknown", "unknown")
+            self.assertEqual(self.client.get(reverse('pi_listener:metrics')).status_code, 404)
+        self.assertNotIn("pi_status_events_total{", registry.render())
+
+
+class LogUtilsTests(SimpleTestCase):
+    """Clasele din ``Raspberry_code/log_utils.py`` au testele lor acolo; aici doar configurarea serverului."""
+
+    def test_pi_listener_logs_through_the_shared_queue_handler(self):
+        [handler] = logging.getLogger("pi_listener").handlers
+        self.assertEqual(type(handler).__module__, "Raspberry_code.log_utils")
+        self.assertEqual([type(f).__name__ for f in handler.filters], ["RateLimitFilter"])
+
+    def test_status_payload_is_not_logged_at_info(self):
+        with self.assertLogs("pi_listener.views", level="INFO") as logs:
+            with override_settings(ACCESS_LOG_BACKGROUND_FLUSH=False):
+                self.client.post(reverse('pi_listener:update_status'), "not json", content_type="application/json")
+                reset_state_store()
+                self.addCleanup(reset_state_store)
+                self.addCleanup(access_event_writer.clear)
+                self.client.post(reverse('pi_listener:update_status'),
+                                 json.dumps({"person_name": "N/A", "status": "no_face"}),
+                                 content_type="application/json")
+        self.assertEqual(logs.output, ["WARNING:pi_listener.views:Invalid JSON received in HTTP POST"])
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(percentile([], 50))
+
+    def test_short_run_reports_every_operation(self):
+        results = run_benchmark(pis=2, rate=20, duration=0.5, dashboards=2, poll_interval=0.1, command_rate=4)
+        ops = results["operations"]
+        self.assertGreater(ops["status_post"]["count"], 0)
+        self.assertEqual(ops["status_post"]["errors"], 0)
+        self.assertGreater(ops["dashboard"]["count"], 0)
+        self.assertEqual(ops["door_command"]["delivered"], ops["door_command"]["count"])
+        self.assertIsNotNone(ops["status_post"]["p99_ms"])
+        json.dumps(results)
@@ -6,8 +6,14 @@ app_name = 'pi_listener'
 
 urlpatterns = [
     path('update_status/', views.update_status_view, name='update_status'),
+    path('update_status/bulk/', views.update_status_bulk_view, name='update_status_bulk'),
     #path('get_last_status/', views.get_last_status_view, name='get_last_status'),
     # --- ADAUGĂ ACEASTĂ LINIE ---
     path('status/', views.status_display_view, name='status_display'), # URL pentru pagina HTML
+    path('status/json/', views.status_json_view, name='status_json'),
+    path('status/stream/', views.status_stream_view, name='status_stream'),
     path('send_command/', views.send_door_command_view, name='send_door_command'),
+    path('access_events/', views.access_events_view, name='access_events'),
+    path('mqtt_health/', views.mqtt_health_view, name='mqtt_health'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -1,152 +1,267 @@
 # pi_listener/views.py
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
 import json
-import datetime
-import paho.mqtt.client as mqtt
+import functools
+import logging
 import time
+import zlib
 
-# Variabilă globală pentru a stoca ultimul status și starea butoanelor
-latest_pi_status_data = {
-    "message": "No data received yet from Raspberry Pi.",
-    "person_name": None,
-    "status": None,
-    "received_at": None,
-    "pi_timestamp": None,
-    "show_buttons": False, # Butoanele sunt ascunse implicit
-    "buttons_visible_since": 0 # Timpul când butoanele au devenit vizibile (după o acțiune autorizată sau manuală)
-}
+from .broadcast import get_broadcaster, public_state
+from .event_log import query_events
+from .ingest import PayloadTooLarge, decode_body, parse_status_events, validate_status
+from .metrics import RENDER_SECONDS, STATUS_REJECTED, registry
+from .mqtt_publisher import get_mqtt_manager
+from .status import (apply_door_command, clean_device_id, command_topic, ensure_button_expiry_timer,
+                     get_state_store, ingest_statuses, refresh_status)
+
+logger = logging.getLogger(__name__)
+
+SSE_KEEPALIVE_INTERVAL = 15 # Secunde între mesajele "ping" pe stream-ul de status
+SSE_RETRY_MS = 3000 # Cât așteaptă browserul înainte să se reconecteze la stream
+
+
+def timed_view(name):
+    """Înregistrează durata view-ului în ``pi_render_seconds``, după codul răspunsului."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not registry.enabled:
+                return view(request, *args, **kwargs)
+            started = time.perf_counter()
+            response = view(request, *args, **kwargs)
+            RENDER_SECONDS.observe(time.perf_counter() - started, name, response.status_code)
+            return response
+        return wrapper
+    return decorator
 
-BUTTON_VISIBILITY_DURATION = 10 # Secunde cât rămân butoanele vizibile
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_status_view(request):
-    global latest_pi_status_data
     try:
         data = json.loads(request.body)
-        server_received_timestamp = datetime.datetime.now().isoformat()
-        current_time_epoch = time.time()
-
-        print(f"[{server_received_timestamp}] Received HTTP data from Pi: {data}")
-
-        person_name = data.get('person_name')
-        status_msg = data.get('status')
-        pi_timestamp_from_payload = data.get('pi_timestamp')
-
-        if person_name is None or status_msg is None:
-             raise ValueError("Missing 'person_name' or 'status' in JSON data from Pi")
-
-        # Logica pentru vizibilitatea butoanelor:
-        new_show_buttons_state = latest_pi_status_data.get("show_buttons", False)
-        new_buttons_visible_since = latest_pi_status_data.get("buttons_visible_since", 0)
-
-        if status_msg == "authorized":
-            new_show_buttons_state = True
-            new_buttons_visible_since = current_time_epoch # Resetăm timer-ul la fiecare detecție autorizată
-        elif status_msg == "unknown" or status_msg == "unauthorized":
-            new_show_buttons_state = False # Ascundem butoanele explicit
-            new_buttons_visible_since = 0
-        elif status_msg == "no_face":
-            # Dacă statusul devine "no_face", verificăm dacă butoanele erau vizibile
-            # (de la o detecție autorizată anterioară sau o deschidere manuală)
-            # și dacă a trecut timpul de vizibilitate.
-            if latest_pi_status_data.get("show_buttons") and \
-               (current_time_epoch - latest_pi_status_data.get("buttons_visible_since", 0) > BUTTON_VISIBILITY_DURATION):
-                new_show_buttons_state = False
-                new_buttons_visible_since = 0
-
-        latest_pi_status_data.update({
-            "person_name": person_name,
-            "status": status_msg,
-            "received_at": server_received_timestamp,
-            "pi_timestamp": pi_timestamp_from_payload,
-            "show_buttons": new_show_buttons_state,
-            "buttons_visible_since": new_buttons_visible_since,
-            "message": None
-        })
+        # Doar la PI_LOG_LEVEL = "DEBUG"; altfel nici nu se formatează
+        logger.debug("Received HTTP data from Pi: %s", data)
+
+        ingest_statuses([validate_status(data)], source="http")
 
         return JsonResponse({"message": "HTTP Data received by Django successfully"}, status=200)
     # ... (blocurile except rămân la fel) ...
     except json.JSONDecodeError:
-        print("[DJANGO_ERROR] Invalid JSON received in HTTP POST")
+        STATUS_REJECTED.inc(1, "http")
+        logger.warning("Invalid JSON received in HTTP POST")
         return JsonResponse({"error": "Invalid JSON format in HTTP POST"}, status=400)
     except ValueError as ve:
-         print(f"[DJANGO_ERROR] Invalid HTTP data: {ve}")
+         STATUS_REJECTED.inc(1, "http")
+         logger.warning("Invalid HTTP data: %s", ve)
          return JsonResponse({"error": str(ve)}, status=400)
     except Exception as e:
-         print(f"[DJANGO_ERROR] Unexpected error in update_status_view: {e}")
+         logger.exception("Unexpected error in update_status_view: %s", e)
          return JsonResponse({"error": "Internal server error processing HTTP POST"}, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def update_status_bulk_view(request):
+    """Un lot de statusuri (array JSON sau NDJSON, opțional gzip), de la una sau mai multe uși."""
+    try:
+        body = decode_body(request.body, request.headers.get('Content-Encoding'),
+                           getattr(settings, 'PI_BULK_MAX_BYTES', 1024 * 1024))
+        events, errors = parse_status_events(body, getattr(settings, 'PI_BULK_MAX_EVENTS', 5000))
+    except PayloadTooLarge as e:
+        logger.warning("Bulk status rejected: %s", e)
+        return JsonResponse({"error": str(e)}, status=413)
+    except ValueError as ve:
+        logger.warning("Invalid bulk HTTP data: %s", ve)
+        return JsonResponse({"error": str(ve)}, status=400)
+
+    STATUS_REJECTED.inc(len(errors), "bulk")
+    devices = ingest_statuses(events, source="bulk")
+    logger.debug("Received %d statuses for %d device(s), rejected %d.", len(events), len(devices), len(errors))
+    return JsonResponse({
+        "accepted": len(events),
+        "rejected": len(errors),
+        "stale": sum(d["stale"] for d in devices.values()),
+        "devices": devices,
+        "errors": errors[:50],
+    }, status=200 if events or not errors else 400)
+
+def _conditional_response(request, kind, device_id, state, extra=""):
+    """Răspuns 304 dacă clientul are deja versiunea curentă a stării, plus antetele de validare."""
+    # updated_at deosebește versiunile cu același număr de dinaintea și de după o repornire (store local)
+    etag = quote_etag(f"{kind}-{device_id}-{state['version']}-{state.get('updated_at') or 0}{extra}")
+    last_modified = int(state["updated_at"]) if state.get("updated_at") else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return response, headers
+
+
 @require_http_methods(["GET"])
+@timed_view("status_display")
 def status_display_view(request):
-    global latest_pi_status_data
-    current_time_epoch = time.time()
+    try:
+        device_id = clean_device_id(request.GET.get('device'))
+    except ValueError as ve:
+        return JsonResponse({"error": str(ve)}, status=400)
 
     # Verificăm din nou timeout-ul butoanelor la fiecare refresh al paginii
     # Aceasta este o măsură de siguranță, mai ales dacă Pi-ul nu mai trimite statusuri.
-    if latest_pi_status_data.get("show_buttons"): # Doar dacă sunt setate să fie vizibile
-        # Verificăm dacă a trecut timpul de vizibilitate de la ultima acțiune care le-a făcut vizibile
-        if (current_time_epoch - latest_pi_status_data.get("buttons_visible_since", 0) > BUTTON_VISIBILITY_DURATION):
-            # Și dacă statusul curent NU este "authorized" (caz în care timer-ul s-ar fi resetat oricum)
-            # Sau dacă statusul este "no_face" (caz în care vrem să expire)
-            if latest_pi_status_data.get("status") != "authorized" or latest_pi_status_data.get("status") == "no_face":
-                print("[DJANGO_VIEW_REFRESH] Button visibility timeout reached. Hiding buttons.")
-                latest_pi_status_data["show_buttons"] = False
-                latest_pi_status_data["buttons_visible_since"] = 0
-
-    context = {
-        'status_info': latest_pi_status_data
-    }
-    return render(request, 'status_display.html', context)
+    status_info = refresh_status(device_id)
+    devices = get_state_store().devices()
+    # Lista de uși apare în pagină, deci face parte din ETag
+    not_modified, headers = _conditional_response(request, "html", device_id, status_info,
+                                                  f"-{len(devices)}-{zlib.crc32(' '.join(devices).encode())}")
+    if not_modified is not None:
+        response = not_modified
+    else:
+        # Secțiunea de status este cache-uită în template, după (device_id, version)
+        context = {
+            'status_info': status_info,
+            'device_id': device_id,
+            'devices': devices,
+        }
+        response = render(request, 'status_display.html', context)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@require_http_methods(["GET"])
+@timed_view("status_json")
+def status_json_view(request):
+    """Starea unei uși ca JSON, pentru clienții care fac polling (cu ETag / 304)."""
+    try:
+        device_id = clean_device_id(request.GET.get('device'))
+    except ValueError as ve:
+        return JsonResponse({"error": str(ve)}, status=400)
+    state = refresh_status(device_id)
+    response, headers = _conditional_response(request, "json", device_id, state)
+    if response is None:
+        response = JsonResponse(dict(public_state(state), device_id=device_id, version=state["version"]))
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _status_event_stream(device_id):
+    broadcaster = get_broadcaster(device_id)
+    subscription = broadcaster.subscribe()
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n" + _sse_event("snapshot", broadcaster.snapshot())
+        # Expirarea butoanelor (și schimbările altor workeri) vin tot ca delta-uri, de la un singur timer
+        ensure_button_expiry_timer()
+        while True:
+            delta = await subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
+            if delta is None:
+                yield ": ping\n\n"
+                continue
+            yield _sse_event("delta", delta)
+    finally:
+        subscription.close()
+
+
+@require_http_methods(["GET"])
+async def status_stream_view(request):
+    """Stream Server-Sent Events cu schimbările de status ale unei uși (necesită ASGI)."""
+    try:
+        device_id = clean_device_id(request.GET.get('device'))
+    except ValueError as ve:
+        return JsonResponse({"error": str(ve)}, status=400)
+    await sync_to_async(refresh_status)(device_id)
+    if "wsgi.version" in request.META:
+        # Sub WSGI un stream infinit ar bloca un worker: trimitem doar starea curentă,
+        # iar EventSource se reconectează singur după SSE_RETRY_MS.
+        content = [f"retry: {SSE_RETRY_MS}\n" + _sse_event("snapshot", get_broadcaster(device_id).snapshot())]
+    else:
+        content = _status_event_stream(device_id)
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 @require_http_methods(["GET"])
 def send_door_command_view(request):
-    global latest_pi_status_data
     command_to_send = request.GET.get('command', None)
 
     if command_to_send not in ["deschide", "inchide"]:
         return JsonResponse({"error": "Invalid command."}, status=400)
-
-    # ... (codul MQTT pentru trimiterea comenzii rămâne la fel) ...
-    mqtt_broker = getattr(settings, 'MQTT_BROKER_HOST', "broker.hivemq.com")
-    mqtt_port = getattr(settings, 'MQTT_BROKER_PORT', 1883)
-    mqtt_topic = getattr(settings, 'MQTT_COMMAND_TOPIC', "usa/inteligenta/comanda")
-    client_id = f"django_cmd_sender_{int(time.time())}"
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
-    error_message = None # Inițializăm cu None
     try:
-        client.connect(mqtt_broker, mqtt_port, 60)
-        client.loop_start()
-        result = client.publish(mqtt_topic, command_to_send.lower(), qos=1)
-        result.wait_for_publish(timeout=3)
-        if not result.is_published():
-            error_message = f"MQTT publish failed. RC: {result.rc}" # Setăm mesajul de eroare
-        client.loop_stop()
-        client.disconnect()
-    except Exception as e:
-        error_message = f"MQTT error: {e}" # Setăm mesajul de eroare
-        print(f"[DJANGO_MQTT_PUB_ERROR] {error_message}")
-
-
-    if command_to_send == "deschide":
-        # Când se deschide manual, vrem ca butoanele să apară/rămână vizibile pentru durata setată
-        latest_pi_status_data["show_buttons"] = True
-        latest_pi_status_data["buttons_visible_since"] = time.time() # Resetăm timer-ul
-        print("[DJANGO_VIEW] 'deschide' command sent, ensuring buttons are visible.")
-    elif command_to_send == "inchide":
-        # Ascundem butoanele imediat după ce se apasă "inchide"
-        latest_pi_status_data["show_buttons"] = False
-        latest_pi_status_data["buttons_visible_since"] = 0 # Resetăm timer-ul
-        print("[DJANGO_VIEW] 'inchide' command sent, hiding buttons.")
+        device_id = clean_device_id(request.GET.get('device'))
+    except ValueError as ve:
+        return JsonResponse({"error": str(ve)}, status=400)
 
+    # Comanda pleacă prin conexiunea MQTT comună a procesului (fără handshake nou la fiecare apăsare)
+    error_message = get_mqtt_manager().publish(command_topic(device_id), command_to_send.lower(), qos=1)
     if error_message:
         # Aici ai putea folosi django.contrib.messages pentru a afișa eroarea utilizatorului
         # messages.error(request, f"Failed to send command: {error_message}")
-        print(f"Error to potentially display to user: {error_message}")
+        logger.error("Failed to publish door command: %s", error_message, extra={"device": device_id})
+
+    apply_door_command(device_id, command_to_send)
+    logger.info("'%s' command sent, buttons %s.", command_to_send,
+                'visible' if command_to_send == 'deschide' else 'hidden', extra={"device": device_id})
+
 
+    display_url = reverse('pi_listener:status_display')
+    if device_id != settings.PI_DEFAULT_DEVICE_ID:
+        display_url += f"?device={device_id}"
+    return redirect(display_url)
 
-    return redirect('pi_listener:status_display')
\ No newline at end of file
+
+def _parse_query_datetime(value, name):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid '{name}' datetime: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+@require_http_methods(["GET"])
+@timed_view("access_events")
+def access_events_view(request):
+    """Cine a intrat între X și Y: ?start=&end=&person=&device=&status=&cursor=&limit="""
+    try:
+        events, next_cursor = query_events(
+            start=_parse_query_datetime(request.GET.get('start'), 'start'),
+            end=_parse_query_datetime(request.GET.get('end'), 'end'),
+            person_name=request.GET.get('person'),
+            device_id=request.GET.get('device'),
+            status=request.GET.get('status'),
+            cursor=request.GET.get('cursor'),
+            limit=request.GET.get('limit', 100),
+        )
+    except ValueError as ve:
+        return JsonResponse({"error": str(ve)}, status=400)
+    return JsonResponse({"events": [event.as_dict() for event in events], "next_cursor": next_cursor})
+
+
+@require_http_methods(["GET"])
+def mqtt_health_view(request):
+    health = get_mqtt_manager().health()
+    return JsonResponse(health, status=200 if health["connected"] or not health["started"] else 503)
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Metricile procesului în format text Prometheus (404 dacă PI_METRICS_ENABLED = False)."""
+    if not registry.enabled:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")